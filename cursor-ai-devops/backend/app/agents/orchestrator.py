@@ -1,37 +1,213 @@
 import asyncio
-from typing import Optional, Dict, Any
+import os
+import time
+from contextlib import aclosing
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
 
+from app.context.context_service import ProjectContextService
+from app.context.conversation import ContextBuilder, estimate_tokens
+from app.context.workspace_index import WorkspaceIndex
+from app.models.prompt import Prompt
 from app.models.router import ModelRouter
+from app.models.scheduler import Priority, QueueFullError
+from app.observability.timing import span
+from app.rag.vectorstore import VectorStore
+from app.storage.history import ChatHistory
+
+CHAT_FALLBACK = "Acknowledged. I will help with DevOps tasks once models are configured."
+SUGGEST_FALLBACK = "// Suggestion unavailable until AI providers are configured."
+SUGGEST_SYSTEM_PROMPT = (
+    "You are a DevOps-focused code assistant. Improve the snippet using best practices,"
+    " security-first principles, and performance considerations."
+)
 
 
 class AgentsOrchestrator:
-    def __init__(self) -> None:
+    """Chat and code suggestions on top of the model router and workspace context.
+
+    When ``retrieval`` is set, the best hybrid (BM25 + vector) matches for
+    the chat message or the code being edited go into the per-request part
+    of the prompt, never into the cached prefix.
+
+    Configuration via env:
+      RAG_PROMPT_CHUNKS (retrieved chunks per prompt, default 4; 0 disables)
+      RAG_PROMPT_TOKENS (budget for retrieved chunks, default 800)
+    """
+
+    def __init__(self, history: Optional[ChatHistory] = None) -> None:
         self.model_router = ModelRouter()
+        self.vector_store = VectorStore()
+        self.history = history or ChatHistory()
+        self.context = ContextBuilder(self.history, self.model_router)
+        # Set at startup when WORKSPACE_DIR points at a checkout
+        self.project_context: Optional[ProjectContextService] = None
+        self.workspace_index: Optional[WorkspaceIndex] = None
+        # The store prompts retrieve from, once something feeds it
+        self.retrieval: Optional[VectorStore] = None
+        self.retrieval_chunks = int(os.getenv("RAG_PROMPT_CHUNKS", "4"))
+        self.retrieval_tokens = int(os.getenv("RAG_PROMPT_TOKENS", "800"))
+
+    async def aclose(self) -> None:
+        await self.context.aclose()
+        await self.model_router.aclose()
+
+    async def warmup(self) -> Dict[str, Dict[str, Any]]:
+        """Load models, the RAG index and the git summary ahead of the first request.
+
+        The RAG index and its embedding model are only loaded when
+        ``retrieval`` is set; otherwise nothing would ever use them.
+
+        Returns per-step ``{"ok", "seconds"[, "error"]}``; nothing is raised.
+        """
 
-    async def handle_chat_message(self, content: str) -> str:
-        prompt = (
-            "You are a DevOps Engineering assistant. Be concise and provide actionable guidance.\n"
-            f"User: {content}\nAssistant:"
+        async def step(run: Any) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                await run()
+                result: Dict[str, Any] = {"ok": True}
+            except Exception as exc:
+                result = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            result["seconds"] = round(time.perf_counter() - started, 4)
+            return result
+
+        steps: Dict[str, Any] = {}
+        if self.retrieval is not None:
+            steps["retrieval"] = step(lambda: asyncio.to_thread(self.retrieval.warmup))
+        if self.project_context is not None:
+            steps["git"] = step(self.project_context.summarize)
+        providers, *results = await asyncio.gather(self.model_router.warmup(), *steps.values())
+        return {**providers, **dict(zip(steps, results))}
+
+    async def _chat_prompt(self, conversation_id: Optional[int], content: str) -> Prompt:
+        prompt, excerpts = await asyncio.gather(
+            self.context.build(conversation_id, content), self._retrieved_context(content)
         )
+        if not excerpts:
+            return prompt
+        *earlier, (role, text) = prompt.messages
+        return prompt._replace(messages=(*earlier, (role, f"Relevant workspace excerpts:\n{excerpts}\n\n{text}")))
+
+    async def handle_chat_message(self, content: str, conversation_id: Optional[int] = None) -> str:
+        with span("prompt"):
+            prompt = await self._chat_prompt(conversation_id, content)
+        await self.history.append(conversation_id, "user", content)
         try:
-            return await self.model_router.complete(prompt)
+            reply = await self.model_router.complete(prompt, priority=Priority.INTERACTIVE)
+        except QueueFullError:
+            raise
         except Exception:
             # Fallback minimal echo to ensure WS stays functional during early setup
             await asyncio.sleep(0)
-            return "Acknowledged. I will help with DevOps tasks once models are configured."
+            return CHAT_FALLBACK
+        await self.history.append(conversation_id, "assistant", reply)
+        return reply
+
+    async def stream_chat_message(self, content: str, conversation_id: Optional[int] = None) -> AsyncIterator[str]:
+        """Stream the assistant reply chunk by chunk.
+
+        The prompt carries earlier turns of ``conversation_id`` (see
+        ``ContextBuilder``); both sides of the exchange are persisted.
+        Falls back to the canned reply only if the provider fails before
+        producing any output; a mid-stream failure just ends the reply.
+        ``QueueFullError`` is re-raised so callers can report backpressure.
+        """
+        with span("prompt"):
+            prompt = await self._chat_prompt(conversation_id, content)
+        await self.history.append(conversation_id, "user", content)
+        reply: List[str] = []
+        try:
+            async with aclosing(self.model_router.stream(prompt, priority=Priority.INTERACTIVE)) as chunks:
+                async for chunk in chunks:
+                    reply.append(chunk)
+                    yield chunk
+        except QueueFullError:
+            raise
+        except Exception:
+            if not reply:
+                yield CHAT_FALLBACK
+        finally:
+            if reply:
+                await self.history.append(conversation_id, "assistant", "".join(reply))
+
+    async def _repo_context(self) -> Tuple[str, str]:
+        """``(checkout, changes)`` lines, see ``ProjectContextService.prompt_parts``."""
+        if self.project_context is None:
+            return "", ""
+        with span("repo"):
+            try:
+                return await self.project_context.prompt_parts()
+            except Exception:
+                return "", ""  # git trouble must not cost the suggestion
+
+    async def _related_definitions(self, code: str, file_path: Optional[str]) -> str:
+        if self.workspace_index is None:
+            return ""
+        with span("symbols"):
+            try:
+                return await asyncio.to_thread(self.workspace_index.prompt_context, code, file_path)
+            except Exception:
+                return ""
+
+    async def _retrieved_context(self, query: str) -> str:
+        """Best matching workspace chunks for ``query``, within RAG_PROMPT_TOKENS."""
+        if self.retrieval is None or self.retrieval_chunks <= 0 or not query.strip():
+            return ""
+        try:
+            texts = await asyncio.to_thread(self.retrieval.search, query, self.retrieval_chunks)
+        except Exception:
+            return ""  # retrieval trouble must not cost the answer
+        picked: List[str] = []
+        remaining = self.retrieval_tokens
+        for text in texts:
+            cost = estimate_tokens(text)
+            if text and cost <= remaining:
+                picked.append(text)
+                remaining -= cost
+        return "\n\n".join(picked)
+
+    async def _suggest_prompt(
+        self, language: str, code: str, file_path: Optional[str], context: Optional[Dict[str, Any]]
+    ) -> Prompt:
+        # Branch, HEAD and recent commits only change with a commit or
+        # checkout, so they join the system prompt in the cached prefix; the
+        # uncommitted-changes list changes on every save and goes with the
+        # rest of the per-request text
+        user_prompt = f"Language: {language}\nPath: {file_path}\nContext: {context}\nCode:\n{code}"
+        (checkout, changes), definitions, excerpts = await asyncio.gather(
+            self._repo_context(), self._related_definitions(code, file_path), self._retrieved_context(code[-1000:])
+        )
+        if definitions:
+            user_prompt = f"Related definitions from the workspace:\n{definitions}\n\n{user_prompt}"
+        if excerpts:
+            user_prompt = f"Relevant workspace excerpts:\n{excerpts}\n\n{user_prompt}"
+        if changes:
+            user_prompt = f"{changes}\n\n{user_prompt}"
+        return Prompt(SUGGEST_SYSTEM_PROMPT, checkout, (("user", user_prompt),))
 
     async def suggest_code(
         self, language: str, code: str, file_path: Optional[str] = None, context: Optional[Dict[str, Any]] = None
     ) -> str:
-        sys_prompt = (
-            "You are a DevOps-focused code assistant. Improve the snippet using best practices,"
-            " security-first principles, and performance considerations."
-        )
-        user_prompt = f"Language: {language}\nPath: {file_path}\nContext: {context}\nCode:\n{code}"
-        prompt = f"{sys_prompt}\n\n{user_prompt}\n\nAssistant:"
+        prompt = await self._suggest_prompt(language, code, file_path, context)
         try:
-            return await self.model_router.complete(prompt)
+            return await self.model_router.complete(prompt, priority=Priority.SUGGEST)
+        except QueueFullError:
+            raise
         except Exception:
-            return "// Suggestion unavailable until AI providers are configured."
-
+            return SUGGEST_FALLBACK
 
+    async def stream_suggestion(
+        self, language: str, code: str, file_path: Optional[str] = None, context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """``suggest_code`` as a stream; closing the iterator aborts the provider call."""
+        prompt = await self._suggest_prompt(language, code, file_path, context)
+        produced = False
+        try:
+            async with aclosing(self.model_router.stream(prompt, priority=Priority.SUGGEST)) as chunks:
+                async for chunk in chunks:
+                    produced = True
+                    yield chunk
+        except QueueFullError:
+            raise
+        except Exception:
+            if not produced:
+                yield SUGGEST_FALLBACK
@@ -0,0 +1,21 @@
+from starlette.requests import HTTPConnection
+
+from app.agents.orchestrator import AgentsOrchestrator
+from app.lsp.manager import LspManager
+from app.storage.history import ChatHistory
+
+
+# One instance of each per app, created in the lifespan (app.main) and kept on
+# app.state; works for HTTP routes and websockets alike.
+
+
+def get_orchestrator(conn: HTTPConnection) -> AgentsOrchestrator:
+    return conn.app.state.orchestrator
+
+
+def get_history(conn: HTTPConnection) -> ChatHistory:
+    return conn.app.state.history
+
+
+def get_lsp(conn: HTTPConnection) -> LspManager:
+    return conn.app.state.lsp
@@ -1,7 +1,20 @@
-from fastapi import APIRouter, Body
+import asyncio
+import json
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.api.schemas import (
     SuggestRequest,
     SuggestResponse,
+    CompleteRequest,
+    CompleteResponse,
+    BulkAnalyzeRequest,
     DeployRequest,
     GenericResponse,
     DriftCheckRequest,
@@ -10,10 +23,14 @@ from app.api.schemas import (
     RunbookResponse,
 )
 from app.agents.orchestrator import AgentsOrchestrator
-from app.integrations.k8s.analyzer import analyze_manifest
+from app.api.deps import get_history, get_lsp, get_orchestrator
+from app.integrations.k8s.analyzer import analyze_manifest, default_cache, iter_findings, iter_findings_cached
+from app.integrations.k8s.bulk import ArchiveTooLargeError, analyze_archive_bytes, analyze_target
+from app.lsp.manager import LspManager
+from app.observability.middleware import TimedRoute
+from app.storage.history import ChatHistory
 
-router = APIRouter()
-orchestrator = AgentsOrchestrator()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/info")
@@ -21,18 +38,82 @@ async def info():
     return {"name": "Cursor DevOps AI", "version": "0.1.0"}
 
 
+@router.get("/conversations/{conversation_id}/messages")
+async def conversation_messages(
+    conversation_id: int, limit: int = 50, history: ChatHistory = Depends(get_history)
+):
+    messages = await history.messages(conversation_id, limit)
+    return {"messages": [{"role": m.role, "content": m.content} for m in messages]}
+
+
 @router.post("/suggest", response_model=SuggestResponse)
-async def suggest(req: SuggestRequest) -> SuggestResponse:
-    suggestion = await orchestrator.suggest_code(
-        language=req.language, code=req.code, file_path=req.file_path, context=req.context
+async def suggest(
+    req: SuggestRequest,
+    orchestrator: AgentsOrchestrator = Depends(get_orchestrator),
+    lsp: LspManager = Depends(get_lsp),
+) -> SuggestResponse:
+    # Language server items arrive in milliseconds; fetched alongside the model, not before it.
+    # A cold server is left starting rather than waited for, so a fast model answer is not held back
+    suggestion, completions = await asyncio.gather(
+        orchestrator.suggest_code(language=req.language, code=req.code, file_path=req.file_path, context=req.context),
+        lsp.request_completion(req.language, req.code, req.file_path, wait_for_start=False),
     )
-    return SuggestResponse(suggestion=suggestion)
+    return SuggestResponse(suggestion=suggestion, completions=completions)
+
+
+@router.post("/complete", response_model=CompleteResponse)
+async def complete(req: CompleteRequest, lsp: LspManager = Depends(get_lsp)) -> CompleteResponse:
+    """Language server completions only: the fast path that skips the model."""
+    items = await lsp.request_completion(req.language, req.code, req.file_path, req.line, req.character)
+    return CompleteResponse(items=items)
 
 
 @router.post("/k8s/analyze")
-async def k8s_analyze(manifest: str = Body(..., media_type="text/plain")):
-    findings = analyze_manifest(manifest)
-    return {"findings": findings}
+async def k8s_analyze(manifest: str = Body(..., media_type="text/plain"), stream: bool = False):
+    # Parsing and rule checks are CPU-bound; keep them off the event loop
+    cache = default_cache()
+    if stream:
+        findings = iter_findings(manifest) if cache is None else iter_findings_cached(manifest, cache)
+        lines = (json.dumps(f._asdict()) + "\n" for f in findings)
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    stats: Dict[str, int] = {}
+    findings = await run_in_threadpool(analyze_manifest, manifest, None, None, cache, stats)
+    return {"findings": findings, "cache": stats}
+
+
+@router.post("/k8s/analyze/bulk")
+async def k8s_analyze_bulk(req: BulkAnalyzeRequest):
+    # Many manifests in one round trip: per-file findings plus a summary by rule/severity.
+    # Server paths are only readable under K8S_BULK_ROOT; otherwise upload an archive.
+    root = os.getenv("K8S_BULK_ROOT")
+    if not root:
+        raise HTTPException(
+            status_code=403, detail="Server-side targets are disabled; POST an archive to /api/k8s/analyze/archive"
+        )
+    try:
+        return await analyze_target(req.target, root=Path(root))
+    except PermissionError as exc:
+        raise HTTPException(status_code=403, detail=str(exc))
+
+
+@router.post("/k8s/analyze/archive")
+async def k8s_analyze_archive(request: Request):
+    # Upload capped by K8S_BULK_MAX_UPLOAD_BYTES (default 64 MiB); the contents by the bulk limits
+    limit = int(os.getenv("K8S_BULK_MAX_UPLOAD_BYTES", str(64 * 1024 * 1024)))
+    too_large = HTTPException(status_code=413, detail=f"Archive larger than {limit} bytes")
+    if int(request.headers.get("content-length") or 0) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    try:
+        return await analyze_archive_bytes(bytes(body))
+    except ArchiveTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except (tarfile.TarError, zipfile.BadZipFile) as exc:
+        raise HTTPException(status_code=400, detail=f"Unsupported or corrupt archive: {exc}")
 
 
 @router.post("/deploy", response_model=GenericResponse)
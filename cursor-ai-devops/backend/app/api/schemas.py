@@ -9,8 +9,32 @@ class SuggestRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+class CompletionItem(BaseModel):
+    label: str
+    kind: Optional[int] = None  # LSP CompletionItemKind
+    detail: Optional[str] = None
+    insert_text: str
+
+
 class SuggestResponse(BaseModel):
     suggestion: str
+    completions: List[CompletionItem] = []  # language server items for the end of ``code``
+
+
+class CompleteRequest(BaseModel):
+    language: str
+    code: str
+    file_path: Optional[str] = None
+    line: Optional[int] = None  # 0-based; line/character default to the end of ``code``
+    character: Optional[int] = None
+
+
+class CompleteResponse(BaseModel):
+    items: List[CompletionItem]
+
+
+class BulkAnalyzeRequest(BaseModel):
+    target: str  # directory, glob pattern or .zip/.tar(.gz) path, relative to K8S_BULK_ROOT
 
 
 class DeployRequest(BaseModel):
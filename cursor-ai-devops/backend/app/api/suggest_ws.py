@@ -0,0 +1,145 @@
+import asyncio
+import itertools
+import json
+import os
+from contextlib import aclosing
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+
+from app.agents.orchestrator import AgentsOrchestrator
+from app.api.deps import get_lsp, get_orchestrator
+from app.lsp.manager import LspManager
+from app.models.scheduler import QueueFullError
+from app.observability.metrics import suggest_requests_total, ws_connections
+
+ws_router = APIRouter()
+
+
+class SuggestionChannel:
+    """Inline suggestions over one WebSocket, at most one live request per document.
+
+    Client frames:
+      {"type": "suggest", "id"?, "document"?, "language", "code", "file_path"?, "context"?, "line"?, "character"?}
+      {"type": "cancel", "id"}
+    Server frames, all carrying the request ``id``:
+      {"type": "completions", "items"}   language server items, as soon as they are ready
+      {"type": "delta", "content"}*      model output
+      {"type": "end"} | {"type": "cancelled", "reason"} | {"type": "error", "status", "message"}
+
+    A request waits SUGGEST_DEBOUNCE_MS before touching the model; a newer
+    request for the same document (``document``, else ``file_path``)
+    cancels it, and cancelling an in-flight request closes the provider
+    stream, which frees its model slot. A frame that is not a JSON object
+    gets an error frame with a null ``id``; the socket stays open.
+
+    Configuration via env:
+      SUGGEST_DEBOUNCE_MS (default 150)
+    """
+
+    def __init__(self, websocket: WebSocket, orchestrator: AgentsOrchestrator, lsp: LspManager) -> None:
+        self.websocket = websocket
+        self.orchestrator = orchestrator
+        self.lsp = lsp
+        self.debounce = float(os.getenv("SUGGEST_DEBOUNCE_MS", "150")) / 1000
+        self.live: Dict[str, Tuple[str, asyncio.Task]] = {}  # document -> (request id, task)
+        self._ids = itertools.count(1)
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, frame: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(frame)
+
+    async def run(self) -> None:
+        try:
+            while True:
+                try:
+                    frame = json.loads(await self.websocket.receive_text())
+                except ValueError:
+                    frame = None
+                if not isinstance(frame, dict):
+                    await self.send({"type": "error", "id": None, "status": 400, "message": "invalid JSON frame"})
+                elif frame.get("type") == "cancel":
+                    await self.cancel(str(frame.get("id")), "cancelled")
+                elif frame.get("type") == "suggest":
+                    await self.submit(frame)
+                else:
+                    await self.send({"type": "error", "id": frame.get("id"), "status": 400, "message": "unknown frame type"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            tasks = [task for _, task in self.live.values()]
+            for request_id, _ in list(self.live.values()):
+                await self.cancel(request_id, "disconnected")
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, frame: Dict[str, Any]) -> None:
+        request_id = str(frame.get("id") or f"s{next(self._ids)}")
+        document = str(frame.get("document") or frame.get("file_path") or "")
+        previous = self.live.get(document)
+        if previous is not None:
+            await self.cancel(previous[0], "superseded")
+        task = asyncio.create_task(self._serve(request_id, document, frame))
+        self.live[document] = (request_id, task)
+
+    async def cancel(self, request_id: str, reason: str) -> None:
+        # Reported here rather than in the task: a request cancelled while
+        # still debouncing may never have started running
+        for document, (live_id, task) in list(self.live.items()):
+            if live_id == request_id:
+                task.cancel()
+                del self.live[document]
+                suggest_requests_total.labels(outcome=reason).inc()
+                if reason != "disconnected":
+                    await self.send({"type": "cancelled", "id": request_id, "reason": reason})
+
+    async def _completions(self, request_id: str, frame: Dict[str, Any]) -> None:
+        items = await self.lsp.request_completion(
+            frame.get("language", ""), frame.get("code", ""), frame.get("file_path"), frame.get("line"), frame.get("character")
+        )
+        if items:
+            await self.send({"type": "completions", "id": request_id, "items": items})
+
+    async def _serve(self, request_id: str, document: str, frame: Dict[str, Any]) -> None:
+        lsp_task: Optional[asyncio.Task] = None
+        outcome: Optional[str] = None
+        try:
+            await asyncio.sleep(self.debounce)
+            lsp_task = asyncio.create_task(self._completions(request_id, frame))
+            chunks = self.orchestrator.stream_suggestion(
+                frame.get("language", ""), frame.get("code", ""), frame.get("file_path"), frame.get("context")
+            )
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    await self.send({"type": "delta", "id": request_id, "content": chunk})
+            await lsp_task
+            await self.send({"type": "end", "id": request_id})
+            outcome = "completed"
+        except QueueFullError as exc:
+            outcome = "error"
+            await self.send({"type": "error", "id": request_id, "status": 429, "message": str(exc)})
+        except Exception as exc:
+            outcome = "error"
+            await self.send({"type": "error", "id": request_id, "status": 500, "message": str(exc)})
+        finally:
+            if lsp_task is not None and not lsp_task.done():
+                lsp_task.cancel()
+            if self.live.get(document, (None,))[0] == request_id:
+                del self.live[document]
+            if outcome is not None:
+                suggest_requests_total.labels(outcome=outcome).inc()
+
+
+@ws_router.websocket("/ws/suggest")
+async def suggest_ws(
+    websocket: WebSocket,
+    orchestrator: AgentsOrchestrator = Depends(get_orchestrator),
+    lsp: LspManager = Depends(get_lsp),
+) -> None:
+    await websocket.accept()
+    connections = ws_connections.labels(path="/ws/suggest")
+    connections.inc()
+    try:
+        await SuggestionChannel(websocket, orchestrator, lsp).run()
+    finally:
+        connections.dec()
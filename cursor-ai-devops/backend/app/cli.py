@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from app.integrations.k8s.analyzer import shutdown_pool
+from app.integrations.k8s.bulk import analyze_target
+
+SEVERITIES = ["low", "medium", "high", "critical"]
+
+
+def _print_text(result: Dict[str, Any]) -> None:
+    for entry in result["files"]:
+        if entry.get("error"):
+            print(f"{entry['file']}: ERROR {entry['error']}")
+            continue
+        print(f"{entry['file']}: {entry['count']} finding(s)")
+        for f in entry["findings"]:
+            print(f"  [{f['severity']}] {f['resource']} {f['rule']}: {f['message']}")
+    summary = result["summary"]
+    print(
+        f"\n{summary['files']} file(s), {summary['findings']} finding(s), "
+        f"{summary['errors']} error(s), {summary['cache_hits']} cached"
+    )
+    for severity, count in summary["by_severity"].items():
+        print(f"  {severity}: {count}")
+    for rule_id, count in summary["by_rule"].items():
+        print(f"  {rule_id}: {count}")
+
+
+def _should_fail(result: Dict[str, Any], fail_on: Optional[str]) -> bool:
+    if result["summary"]["errors"]:
+        return True
+    if fail_on is None:
+        return False
+    threshold = SEVERITIES.index(fail_on)
+    return any(
+        SEVERITIES.index(severity) >= threshold
+        for severity in result["summary"]["by_severity"]
+        if severity in SEVERITIES
+    )
+
+
+def k8s_analyze(args: argparse.Namespace) -> int:
+    try:
+        result = asyncio.run(analyze_target(args.target))
+    finally:
+        shutdown_pool()
+    if args.format == "json":
+        print(json.dumps(result, indent=2))
+    else:
+        _print_text(result)
+    return 1 if _should_fail(result, args.fail_on) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Cursor DevOps AI backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("k8s-analyze", help="Analyze a directory, glob or archive of K8s manifests")
+    analyze.add_argument("target", help="directory, glob pattern (quote it) or .zip/.tar(.gz) archive")
+    analyze.add_argument("--format", choices=["text", "json"], default="text")
+    analyze.add_argument(
+        "--fail-on", choices=SEVERITIES, default=None, help="exit 1 if any finding is at or above this severity"
+    )
+    analyze.set_defaults(func=k8s_analyze)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,258 @@
+import asyncio
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any
-from git import Repo, InvalidGitRepositoryError
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from git import InvalidGitRepositoryError, NoSuchPathError, Repo
+
+# Files under the git dir whose changes move HEAD, branch tips or remotes
+_HEAD_FILES = {"HEAD", "packed-refs", "config"}
+
+
+def parse_porcelain(output: str) -> Dict[str, str]:
+    """``git status --porcelain -z`` output as ``{path: XY status}``."""
+    changed: Dict[str, str] = {}
+    entries = iter(output.split("\0"))
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        status, path = entry[:2], entry[3:]
+        changed[path] = status.strip() or status
+        if status[0] in "RC":
+            next(entries, None)  # the rename/copy source follows as its own entry
+    return changed
 
 
 class ProjectContextService:
+    """Git summary of a workspace, cached and refreshed off the event loop.
+
+    The summary is kept between calls and only the parts that changed are
+    recomputed: writes to ``HEAD``/refs/config re-read the branch and recent
+    commits, a write to the index re-runs ``git status``, and edits in the
+    working tree re-check just the touched paths. Changes are learned from
+    watchdog events (``start_watching``); without a watcher the summary is
+    rebuilt once it is older than GIT_CONTEXT_TTL.
+
+    Configuration via env:
+      GIT_CONTEXT_COMMITS (recent commits listed, default 5)
+      GIT_CONTEXT_MAX_CHANGED (changed paths listed, default 50)
+      GIT_CONTEXT_MAX_PATHS (pending edited paths before a full status instead, default 200)
+      GIT_CONTEXT_TTL (seconds, used only when not watching, default 30)
+    """
+
     def __init__(self, workspace: str) -> None:
-        self.workspace = Path(workspace)
+        self.workspace = Path(workspace).resolve()
+        self.commits = int(os.getenv("GIT_CONTEXT_COMMITS", "5"))
+        self.max_changed = int(os.getenv("GIT_CONTEXT_MAX_CHANGED", "50"))
+        self.max_paths = int(os.getenv("GIT_CONTEXT_MAX_PATHS", "200"))
+        self.ttl = float(os.getenv("GIT_CONTEXT_TTL", "30"))
+        self._repo: Optional[Repo] = None
+        self._git_dir: Optional[Path] = None
+        self._is_repo = True
+        self._head: Dict[str, Any] = {}
+        self._changed: Dict[str, str] = {}
+        self._summary: Optional[Dict[str, Any]] = None
+        self._refreshed_at = 0.0
+        # Invalidation state, written by the watcher thread
+        self._state_lock = threading.Lock()
+        self._head_stale = True
+        self._status_stale = True
+        self._paths: Set[str] = set()
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._observer: Any = None
+        self.full_refreshes = 0
+        self.path_refreshes = 0
 
-    def summarize(self) -> Dict[str, Any]:
-        summary: Dict[str, Any] = {"workspace": str(self.workspace), "git": {}}
+    # Invalidation
+
+    def invalidate(self, head: bool = True, status: bool = True) -> None:
+        with self._state_lock:
+            self._head_stale = self._head_stale or head
+            self._status_stale = self._status_stale or status
+
+    def _on_path(self, raw: str) -> None:
+        if not raw:
+            return
+        path = Path(raw)
+        git_dir = self._git_dir or self.workspace / ".git"
+        if path == git_dir or git_dir in path.parents:
+            rel = path.relative_to(git_dir).as_posix()
+            if rel in _HEAD_FILES or rel.startswith("refs/"):
+                self.invalidate(head=True, status=False)
+            elif rel == "index":
+                self.invalidate(head=False, status=True)
+            return
+        try:
+            rel = path.relative_to(self.workspace).as_posix()
+        except ValueError:
+            return
+        with self._state_lock:
+            self._paths.add(rel)
+
+    def start_watching(self) -> bool:
         try:
-            repo = Repo(self.workspace)
-            summary["git"] = {
-                "active_branch": str(repo.active_branch) if not repo.head.is_detached else "detached",
-                "dirty": repo.is_dirty(),
-                "remotes": [str(r) for r in repo.remotes],
-            }
-        except InvalidGitRepositoryError:
-            summary["git"] = {"status": "not_a_git_repo"}
-        return summary
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except Exception:  # pragma: no cover - optional during bootstrap
+            return False
+        repo = self._open()
+        if repo is None:
+            return False
+
+        service = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event: Any) -> None:
+                if event.event_type in ("opened", "closed_no_write"):
+                    return
+                if event.is_directory and event.event_type == "modified":
+                    return  # a child changed; that child gets its own event
+                service._on_path(event.src_path)
+                service._on_path(getattr(event, "dest_path", ""))
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), str(self.workspace), recursive=True)
+        git_dir = self._git_dir
+        if git_dir is not None and self.workspace not in git_dir.parents:
+            # Worktrees and submodules keep their git dir elsewhere
+            self._observer.schedule(_Handler(), str(git_dir), recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def stop_watching(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    # Refresh (runs on a worker thread)
+
+    def _open(self) -> Optional[Repo]:
+        if self._repo is None and self._is_repo:
+            try:
+                self._repo = Repo(self.workspace)
+                self._git_dir = Path(self._repo.git_dir).resolve()
+                # Keep `git status` from rewriting the index, which the watcher would see as a change
+                self._repo.git.update_environment(GIT_OPTIONAL_LOCKS="0")
+            except (InvalidGitRepositoryError, NoSuchPathError):
+                self._is_repo = False
+        return self._repo
+
+    def _read_head(self, repo: Repo) -> Dict[str, Any]:
+        detached = repo.head.is_detached
+        head: Dict[str, Any] = {
+            "active_branch": "detached" if detached else str(repo.active_branch),
+            "head": None,
+            "remotes": [str(r) for r in repo.remotes],
+            "recent_commits": [],
+        }
+        if not repo.head.is_valid():
+            return head  # no commits yet
+        log = repo.git.log(f"-n{self.commits}", "--format=%h%x00%an%x00%ar%x00%s")
+        for line in log.splitlines():
+            sha, author, when, subject = (line.split("\0") + ["", "", ""])[:4]
+            head["recent_commits"].append({"sha": sha, "author": author, "when": when, "subject": subject})
+        head["head"] = head["recent_commits"][0]["sha"] if head["recent_commits"] else None
+        return head
+
+    def _status(self, repo: Repo, paths: Iterable[str] = ()) -> Dict[str, str]:
+        paths = list(paths)
+        args = ["--porcelain", "-z", "--untracked-files=all"]
+        if paths:
+            args += ["--", *(f":(literal){p}" for p in paths)]
+        return parse_porcelain(repo.git.status(*args))
+
+    def _refresh(self) -> None:
+        repo = self._open()
+        if repo is None:
+            self._summary = self._build()
+            return
+        with self._state_lock:
+            head_stale, status_stale, paths = self._head_stale, self._status_stale, self._paths
+            self._head_stale = self._status_stale = False
+            self._paths = set()
+        if self._observer is None and time.monotonic() - self._refreshed_at > self.ttl:
+            head_stale = status_stale = True
+        if status_stale or len(paths) > self.max_paths:
+            status_stale, paths = True, set()
+        try:
+            if head_stale:
+                self._head = self._read_head(repo)
+            if status_stale:
+                self._changed = self._status(repo)
+                self.full_refreshes += 1
+            elif paths:
+                fresh = self._status(repo, sorted(paths))
+                for path in paths:
+                    prefix = path + "/"
+                    for known in [p for p in self._changed if p == path or p.startswith(prefix)]:
+                        del self._changed[known]
+                self._changed.update(fresh)
+                self.path_refreshes += 1
+        except Exception:
+            # Retry everything next time rather than serve a half-updated summary
+            self.invalidate()
+            raise
+        self._summary = self._build()
+        self._refreshed_at = time.monotonic()
+
+    def _build(self) -> Dict[str, Any]:
+        if self._repo is None:
+            return {"workspace": str(self.workspace), "git": {"status": "not_a_git_repo"}}
+        changed = sorted(self._changed.items())
+        return {
+            "workspace": str(self.workspace),
+            "git": {
+                **self._head,
+                "dirty": bool(changed),
+                "changed_count": len(changed),
+                "changed_files": [{"path": p, "status": s} for p, s in changed[: self.max_changed]],
+            },
+        }
+
+    def _needs_refresh(self) -> bool:
+        if self._summary is None:
+            return True
+        if self._observer is None:
+            return time.monotonic() - self._refreshed_at > self.ttl
+        with self._state_lock:
+            return self._head_stale or self._status_stale or bool(self._paths)
+
+    async def summarize(self) -> Dict[str, Any]:
+        """Current summary; git only runs for what changed, on a worker thread."""
+        if not self._needs_refresh():
+            return self._summary  # type: ignore[return-value]
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Concurrent callers wait for one refresh instead of starting their own
+            if self._needs_refresh():
+                await asyncio.to_thread(self._refresh)
+        return self._summary  # type: ignore[return-value]
+
+    async def prompt_text(self, max_files: int = 10) -> str:
+        """A few lines of repo context for a model prompt ("" outside a git repo)."""
+        return "\n".join(part for part in await self.prompt_parts(max_files) if part)
 
+    async def prompt_parts(self, max_files: int = 10) -> Tuple[str, str]:
+        """``prompt_text`` split as ``(checkout, changes)``.
 
+        The first part (branch, HEAD, recent commits) only changes with a
+        commit or checkout and can sit in a cached prompt prefix; the
+        uncommitted-changes line changes on every save and cannot.
+        """
+        git = (await self.summarize())["git"]
+        if "active_branch" not in git:
+            return "", ""
+        lines = [f"Repository: branch {git['active_branch']} at {git['head'] or 'no commits'}"]
+        if git["recent_commits"]:
+            lines.append("Recent commits: " + "; ".join(c["subject"] for c in git["recent_commits"][:3]))
+        changes = ""
+        if git["changed_files"]:
+            files = ", ".join(f"{f['path']} ({f['status']})" for f in git["changed_files"][:max_files])
+            more = git["changed_count"] - min(max_files, len(git["changed_files"]))
+            changes = f"Uncommitted changes: {files}" + (f" and {more} more" if more > 0 else "")
+        return "\n".join(lines), changes
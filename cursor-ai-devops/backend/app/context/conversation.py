@@ -0,0 +1,136 @@
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.models.prompt import Prompt, format_turn
+from app.models.router import NOT_CONFIGURED, ModelRouter
+from app.models.scheduler import Priority
+from app.storage.db import Message
+from app.storage.history import ChatHistory
+
+SYSTEM_PROMPT = "You are a DevOps Engineering assistant. Be concise and provide actionable guidance."
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap BPE-like estimate with no tokenizer files to load.
+
+    Counts one token per symbol and per short word, plus one for every
+    further ~6 characters of a long word, which tracks GPT/Claude
+    tokenizers closely enough for budgeting.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECE.findall(text))
+
+
+class ContextBuilder:
+    """Assemble chat prompts from stored history under a token budget.
+
+    The newest turns that fit are sent verbatim. Turns that fall out of the
+    window are folded into a rolling per-conversation summary, which is
+    refreshed in the background once enough unsummarized text piles up, so
+    prompts stay bounded however long the conversation runs. The summary
+    sits in the prompt's cacheable prefix and earlier turns are sent as
+    chat messages, so each follow-up extends the previous prompt.
+
+    Configuration via env:
+      CHAT_CONTEXT_TOKENS (budget for summary + earlier turns, default 3000;
+        the system prompt and the new message come on top)
+      CHAT_SUMMARY_TOKENS (max summary size, default 400)
+      CHAT_SUMMARY_TRIGGER (unsummarized tokens before re-summarizing, default 800)
+      CHAT_HISTORY_WINDOW (messages loaded per prompt, default 200)
+    """
+
+    def __init__(self, history: ChatHistory, model_router: ModelRouter) -> None:
+        self.history = history
+        self.model_router = model_router
+        self.budget = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+        self.summary_budget = int(os.getenv("CHAT_SUMMARY_TOKENS", "400"))
+        self.summary_trigger = int(os.getenv("CHAT_SUMMARY_TRIGGER", "800"))
+        self.window = int(os.getenv("CHAT_HISTORY_WINDOW", "200"))
+        # conversation_id -> (summary, last message id folded into it)
+        self._summaries: Dict[int, Tuple[str, int]] = {}
+        self._summarizing: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _summary(self, conversation_id: int) -> Tuple[str, int]:
+        cached = self._summaries.get(conversation_id)
+        if cached is None:
+            row = await self.history.get_summary(conversation_id)
+            cached = (row.summary, row.until_message_id) if row is not None else ("", 0)
+            self._summaries[conversation_id] = cached
+        return cached
+
+    async def build(self, conversation_id: Optional[int], content: str) -> Prompt:
+        """Prompt for ``content`` with as much earlier context as the budget allows."""
+        if conversation_id is None:
+            return self.render("", [], content)
+        summary, until_id = await self._summary(conversation_id)
+        messages = [m for m in await self.history.messages(conversation_id, self.window) if m.id > until_id]
+
+        remaining = self.budget - (estimate_tokens(SUMMARY_HEADER + summary) if summary else 0)
+        recent: List[Message] = []
+        for message in reversed(messages):
+            cost = estimate_tokens(format_turn(message.role, message.content))
+            if cost > remaining:
+                break
+            recent.append(message)
+            remaining -= cost
+        recent.reverse()
+
+        overflow = messages[: len(messages) - len(recent)]
+        if overflow and sum(estimate_tokens(m.content) for m in overflow) >= self.summary_trigger:
+            self._schedule_summary(conversation_id, summary, overflow)
+        return self.render(summary, recent, content)
+
+    @staticmethod
+    def render(summary: str, recent: List[Message], content: str) -> Prompt:
+        turns = tuple((m.role, m.content) for m in recent) + (("user", content),)
+        return Prompt(SYSTEM_PROMPT, SUMMARY_HEADER + summary if summary else "", turns)
+
+    def _schedule_summary(self, conversation_id: int, summary: str, overflow: List[Message]) -> None:
+        if conversation_id in self._summarizing:
+            return
+        self._summarizing.add(conversation_id)
+        task = asyncio.create_task(self._summarize(conversation_id, summary, overflow))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, conversation_id: int, summary: str, overflow: List[Message]) -> None:
+        try:
+            transcript = "\n".join(format_turn(m.role, m.content) for m in overflow)
+            prompt = (
+                "Update the running summary of a DevOps assistant conversation. Keep decisions, facts,"
+                f" names and open questions; drop pleasantries. Use at most {self.summary_budget * 3 // 4} words.\n\n"
+                f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"
+            )
+            try:
+                updated = (await self.model_router.complete(prompt, priority=Priority.BACKGROUND)).strip()
+            except Exception:
+                updated = ""
+            if not updated or updated == NOT_CONFIGURED:
+                # No model available: keep the first line of each turn instead
+                heads = [format_turn(m.role, (m.content.splitlines() or [""])[0]) for m in overflow]
+                updated = "\n".join([summary, *heads] if summary else heads)
+            updated = self._truncate(updated)
+            until_id = overflow[-1].id or 0
+            self._summaries[conversation_id] = (updated, until_id)
+            await self.history.save_summary(conversation_id, updated, until_id)
+        finally:
+            self._summarizing.discard(conversation_id)
+
+    def _truncate(self, text: str) -> str:
+        """Keep the most recent part of ``text`` that fits the summary budget."""
+        tokens = estimate_tokens(text)
+        if tokens <= self.summary_budget:
+            return text
+        return text[-len(text) * self.summary_budget // tokens :].lstrip()
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,308 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.rag.vectorstore import VectorStore
+
+logger = logging.getLogger("uvicorn.error")
+
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", ".idea", ".venv", "venv", "node_modules", "__pycache__",
+    ".mypy_cache", ".pytest_cache", "dist", "build", "rag_index",
+}
+TEXT_SUFFIXES = {
+    ".py", ".go", ".js", ".ts", ".tsx", ".jsx", ".java", ".rs", ".rb", ".sh", ".ps1", ".bat",
+    ".yaml", ".yml", ".json", ".toml", ".ini", ".cfg", ".conf", ".tf", ".hcl", ".md", ".txt",
+    ".sql", ".mk",
+}
+TEXT_NAMES = {"Dockerfile", "Makefile", "Caddyfile", "Jenkinsfile", "Procfile"}
+
+
+def walk_files(root: Path, accept: Callable[[str], bool]) -> Iterator[os.DirEntry]:
+    """Stream files depth-first with ``os.scandir`` (no full tree listing in memory).
+
+    Directories in SKIP_DIRS are not entered; ``accept`` filters file names.
+    """
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and accept(entry.name):
+                        yield entry
+        except OSError:
+            continue
+
+
+def chunk_lines(text: str, size: int, overlap: int) -> List[Tuple[int, int, str]]:
+    """Split text into overlapping line windows: ``(start_line, end_line, text)``."""
+    lines = text.splitlines()
+    if not lines:
+        return []
+    step = max(1, size - overlap)
+    chunks = []
+    for start in range(0, len(lines), step):
+        window = lines[start : start + size]
+        chunks.append((start + 1, start + len(window), "\n".join(window)))
+        if start + size >= len(lines):
+            break
+    return chunks
+
+
+class WorkspaceIngestor:
+    """Incrementally feed workspace files into a VectorStore.
+
+    A manifest of per-file ``(mtime, size, sha256, chunk count)`` is kept next
+    to the index, so a rescan only reads files whose stat changed and only
+    re-chunks files whose content hash changed. ``start_watching`` uses
+    watchdog to re-index changed or deleted files as they happen, and
+    passes the changes on to ``add_listener`` callbacks.
+
+    Configuration via env:
+      RAG_CHUNK_LINES (default 60), RAG_CHUNK_OVERLAP (default 10)
+      RAG_INGEST_MAX_BYTES (skip larger files, default 524288)
+      RAG_INGEST_BATCH (chunks per VectorStore.add_documents call, default 256)
+      RAG_WATCH_DEBOUNCE (seconds, default 0.5)
+    """
+
+    def __init__(self, workspace: str, store: VectorStore) -> None:
+        self.workspace = Path(workspace).resolve()
+        self.store = store
+        self.chunk_size = int(os.getenv("RAG_CHUNK_LINES", "60"))
+        self.chunk_overlap = int(os.getenv("RAG_CHUNK_OVERLAP", "10"))
+        self.max_bytes = int(os.getenv("RAG_INGEST_MAX_BYTES", "524288"))
+        self.batch_size = int(os.getenv("RAG_INGEST_BATCH", "256"))
+        self.debounce = float(os.getenv("RAG_WATCH_DEBOUNCE", "0.5"))
+        self.manifest_path = store.index_dir / store.collection_name / "files.json"
+        self.manifest: Dict[str, Dict[str, Any]] = self._load_manifest()
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._observer: Any = None
+        self._listeners: List[Callable[[str], None]] = []
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def _is_candidate(self, path: Path) -> bool:
+        return path.suffix.lower() in TEXT_SUFFIXES or path.name in TEXT_NAMES
+
+    def _skipped(self, rel: str) -> bool:
+        return any(part in SKIP_DIRS for part in Path(rel).parts[:-1])
+
+    def walk(self) -> Iterator[os.DirEntry]:
+        return walk_files(self.workspace, lambda name: self._is_candidate(Path(name)))
+
+    def _chunk_ids(self, rel: str, count: int) -> List[str]:
+        return [f"{rel}#{i}" for i in range(count)]
+
+    def _read_changed(
+        self, rel: str, stat: os.stat_result
+    ) -> Optional[Tuple[Dict[str, Any], List[Tuple[str, str]]]]:
+        """Return ``rel``'s new manifest entry and chunks, or None if the content is unchanged.
+
+        The entry is not recorded here; ``_ingest`` does that once the chunks are stored.
+        """
+        entry = self.manifest.get(rel)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return None
+        if stat.st_size > self.max_bytes:
+            # Too large to index; record it so it is not re-read until it changes
+            digest, text = f"oversize:{stat.st_size}", ""
+        else:
+            data = (self.workspace / rel).read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            text = "" if b"\0" in data[:4096] else data.decode("utf-8", errors="replace")
+        if entry and entry["hash"] == digest:
+            entry.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+            return None
+        chunks = chunk_lines(text, self.chunk_size, self.chunk_overlap)
+        staged = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": digest, "chunks": len(chunks)}
+        stale = entry["chunks"] if entry else 0
+        if stale > len(chunks):
+            self.store.delete_documents(self._chunk_ids(rel, stale)[len(chunks):], save=False)
+        return staged, [
+            (f"{rel}#{i}", f"{rel}:{start}-{end}\n{body}")
+            for i, (start, end, body) in enumerate(chunks)
+        ]
+
+    def _remove(self, rel: str) -> None:
+        entry = self.manifest.pop(rel, None)
+        if entry and entry["chunks"]:
+            self.store.delete_documents(self._chunk_ids(rel, entry["chunks"]), save=False)
+
+    def _ingest(self, items: Iterable[Tuple[str, Optional[os.stat_result]]]) -> Dict[str, int]:
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0, "chunks": 0}
+        batch: List[Tuple[str, str]] = []
+        staged: Dict[str, Dict[str, Any]] = {}
+
+        def flush() -> None:
+            # Files count as indexed only once their chunks are stored; if
+            # add_documents raises they are retried on the next pass
+            if batch:
+                self.store.add_documents(batch, save=False)
+            self.manifest.update(staged)
+            batch.clear()
+            staged.clear()
+
+        for rel, stat in items:
+            if stat is None:
+                if rel in self.manifest:
+                    self._remove(rel)
+                    stats["removed"] += 1
+                continue
+            try:
+                changed = self._read_changed(rel, stat)
+            except OSError:
+                continue
+            if changed is None:
+                stats["unchanged"] += 1
+                continue
+            entry, chunks = changed
+            stats["indexed"] += 1
+            stats["chunks"] += len(chunks)
+            staged[rel] = entry
+            batch.extend(chunks)
+            if len(batch) >= self.batch_size:
+                flush()
+        flush()
+        # Persist index and manifest together so they never disagree on disk
+        self.store.save()
+        self._save_manifest()
+        return stats
+
+    def sync(self) -> Dict[str, int]:
+        """Full incremental pass: index new/changed files, drop deleted ones."""
+        with self._lock:
+            seen: Set[str] = set()
+
+            def items() -> Iterator[Tuple[str, Optional[os.stat_result]]]:
+                for entry in self.walk():
+                    rel = Path(entry.path).relative_to(self.workspace).as_posix()
+                    seen.add(rel)
+                    yield rel, entry.stat(follow_symlinks=False)
+                # Evaluated after the walk, so ``seen`` is complete
+                for rel in [r for r in self.manifest if r not in seen]:
+                    yield rel, None
+
+            return self._ingest(items())
+
+    def sync_paths(self, paths: Iterable[str]) -> Dict[str, int]:
+        """Re-index only the given paths (absolute or workspace-relative)."""
+        with self._lock:
+            items: List[Tuple[str, Optional[os.stat_result]]] = []
+            for raw in paths:
+                path = Path(raw)
+                path = path if path.is_absolute() else self.workspace / path
+                try:
+                    rel = path.resolve().relative_to(self.workspace).as_posix()
+                except ValueError:
+                    continue
+                if self._skipped(rel):
+                    continue
+                if path.is_dir():
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    # Gone (possibly since the event): a deleted directory
+                    # removes everything indexed beneath it
+                    prefix = rel + "/"
+                    items.extend((r, None) for r in list(self.manifest) if r == rel or r.startswith(prefix))
+                    continue
+                if self._is_candidate(path):
+                    items.append((rel, stat))
+            return self._ingest(items)
+
+    # File watching
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        """Also send watched changes (workspace-relative paths) to ``callback``.
+
+        Called on the watcher thread, so ``callback`` must be quick and thread-safe.
+        """
+        self._listeners.append(callback)
+
+    def _on_paths(self, *paths: str) -> None:
+        self._enqueue(*paths)
+        for raw in paths:
+            try:
+                rel = Path(raw).relative_to(self.workspace).as_posix() if raw else ""
+            except ValueError:
+                continue
+            if rel and rel != "." and not self._skipped(rel):
+                for callback in self._listeners:
+                    callback(rel)
+
+    def _enqueue(self, *paths: str) -> None:
+        with self._pending_lock:
+            self._pending.update(p for p in paths if p)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self) -> None:
+        with self._pending_lock:
+            paths, self._pending = self._pending, set()
+            self._timer = None
+        if not paths:
+            return
+        try:
+            self.sync_paths(paths)
+        except Exception:
+            # Runs on the timer thread, where nobody would see it; keep the
+            # paths so the next change retries them
+            logger.exception("re-indexing %d changed paths failed", len(paths))
+            with self._pending_lock:
+                self._pending.update(paths)
+
+    def start_watching(self) -> bool:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except Exception:  # pragma: no cover - optional during bootstrap
+            return False
+
+        ingestor = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event: Any) -> None:
+                if event.event_type in ("opened", "closed_no_write"):
+                    return
+                if event.is_directory and event.event_type == "modified":
+                    return  # a child changed; that child gets its own event
+                ingestor._on_paths(event.src_path, getattr(event, "dest_path", ""))
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), str(self.workspace), recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def stop_watching(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
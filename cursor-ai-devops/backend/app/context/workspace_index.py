@@ -0,0 +1,455 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.context.conversation import estimate_tokens
+from app.context.ingestion import SKIP_DIRS, walk_files
+
+LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".ts": "typescript",
+    ".tsx": "typescript", ".go": "go", ".java": "java", ".rs": "rust", ".rb": "ruby", ".sh": "shell",
+    ".ps1": "powershell", ".tf": "terraform", ".hcl": "terraform", ".yaml": "yaml", ".yml": "yaml",
+    ".json": "json", ".toml": "toml", ".md": "markdown", ".sql": "sql",
+}
+LANGUAGE_NAMES = {"Dockerfile": "dockerfile", "Makefile": "make", "Jenkinsfile": "groovy"}
+JS_EXTENSIONS = ("", ".ts", ".tsx", ".js", ".jsx", ".mjs", "/index.ts", "/index.tsx", "/index.js")
+
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+_JS_IMPORT = re.compile(r"""(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)["'](\.{1,2}/[^"']+)["']""")
+_JS_DEF = re.compile(
+    r"^[ \t]*(?:export\s+)?(?:default\s+)?(?:"
+    r"(?:async\s+)?function\s*\*?\s*(?P<fn>\w+)"
+    r"|(?:abstract\s+)?class\s+(?P<cls>\w+)"
+    r"|(?:interface|type|enum)\s+(?P<type>\w+)"
+    r"|(?:const|let|var)\s+(?P<var>\w+)\s*(?::[^=]+)?=\s*(?:async\s*)?(?:\([^)]*\)\s*(?::[^=]+)?=>|\w+\s*=>|function)"
+    r")",
+    re.MULTILINE,
+)
+_GO_DEF = re.compile(r"^(?:func\s+(?:\([^)]*\)\s*)?(?P<fn>\w+)|type\s+(?P<type>\w+))", re.MULTILINE)
+
+# (name, kind, first line, last line, signature line)
+Symbol = Tuple[str, str, int, int, str]
+# (kind, candidates): "py" candidates are dotted modules, "path" candidates workspace files
+ImportRef = Tuple[str, List[str]]
+
+
+def language_of(name: str) -> Optional[str]:
+    return LANGUAGE_NAMES.get(name) or LANGUAGES.get(Path(name).suffix.lower())
+
+
+def module_name(rel: str) -> Optional[str]:
+    """Dotted module for a workspace-relative ``.py`` path (``a/b/__init__.py`` -> ``a.b``)."""
+    if not rel.endswith(".py"):
+        return None
+    parts = rel[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts) if parts else None
+
+
+def _python_symbols(text: str, rel: str) -> Tuple[List[Symbol], List[ImportRef]]:
+    tree = ast.parse(text)
+    lines = text.splitlines()
+    symbols: List[Symbol] = []
+    imports: List[ImportRef] = []
+
+    def add(node: Any, kind: str) -> None:
+        symbols.append((node.name, kind, node.lineno, node.end_lineno or node.lineno, lines[node.lineno - 1].strip()))
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            add(node, "function")
+        elif isinstance(node, ast.ClassDef):
+            add(node, "class")
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and not item.name.startswith("__"):
+                    add(item, "method")
+    package = (module_name(rel) or "").split(".")
+    if not rel.endswith("__init__.py"):
+        package = package[:-1]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(("py", [alias.name]) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parent = package[: len(package) - node.level + 1]
+                base = ".".join([*parent, base] if base else parent)
+            for alias in node.names:
+                # "from pkg import mod" may name a submodule; fall back to the package
+                imports.append(("py", [f"{base}.{alias.name}", base] if base else [alias.name]))
+    return symbols, imports
+
+
+_REGEX_KINDS = {"fn": "function", "var": "function", "cls": "class", "type": "type"}
+
+
+def _regex_symbols(text: str, pattern: "re.Pattern[str]") -> List[Symbol]:
+    symbols: List[Symbol] = []
+    for match in pattern.finditer(text):
+        group = match.lastgroup or "fn"
+        line = text.count("\n", 0, match.start()) + 1
+        eol = text.find("\n", match.start())
+        signature = text[match.start() : eol if eol != -1 else len(text)].strip()
+        # End lines are unknown without a parser; prompt_context caps the excerpt
+        symbols.append((match.group(group), _REGEX_KINDS[group], line, line + 1000, signature))
+    return symbols
+
+
+def _js_imports(text: str, rel: str) -> List[ImportRef]:
+    base = Path(rel).parent
+    imports: List[ImportRef] = []
+    for spec in _JS_IMPORT.findall(text):
+        target = os.path.normpath((base / spec).as_posix()).replace(os.sep, "/")
+        imports.append(("path", [target + ext for ext in JS_EXTENSIONS]))
+    return imports
+
+
+def extract(text: str, rel: str, language: Optional[str]) -> Tuple[List[Symbol], List[ImportRef]]:
+    """Definitions and workspace-resolvable imports of one file."""
+    if language == "python":
+        try:
+            return _python_symbols(text, rel)
+        except (SyntaxError, ValueError):
+            return [], []
+    if language in ("javascript", "typescript"):
+        return _regex_symbols(text, _JS_DEF), _js_imports(text, rel)
+    if language == "go":
+        return _regex_symbols(text, _GO_DEF), []
+    return [], []
+
+
+class WorkspaceIndex:
+    """File tree, language stats, symbol table and import graph of a workspace.
+
+    Built once with ``sync`` (only files whose mtime/size changed are
+    re-parsed, the rest comes from the persisted index) and kept current
+    with ``enqueue``, fed by ``WorkspaceIngestor.add_listener``.
+    Python is parsed with ``ast``; JS/TS and Go definitions come from
+    regexes. ``related`` picks the few definitions a snippet refers to,
+    preferring files it imports or that import it, for the prompt.
+
+    Configuration via env:
+      WORKSPACE_INDEX_PATH (default $RAG_INDEX_DIR/workspace-<hash>.json)
+      WORKSPACE_INDEX_MAX_BYTES (skip parsing larger files, default 524288)
+      WORKSPACE_CONTEXT_TOKENS (budget for related definitions in a prompt, default 600)
+      WORKSPACE_CONTEXT_DEFS (max definitions, default 5)
+      WORKSPACE_CONTEXT_LINES (max lines per definition, default 15)
+      RAG_WATCH_DEBOUNCE (seconds, default 0.5)
+    """
+
+    def __init__(self, workspace: str) -> None:
+        self.workspace = Path(workspace).resolve()
+        slug = hashlib.sha1(str(self.workspace).encode("utf-8")).hexdigest()[:12]
+        default_path = Path(os.getenv("RAG_INDEX_DIR", "./rag_index")) / f"workspace-{slug}.json"
+        self.path = Path(os.getenv("WORKSPACE_INDEX_PATH", str(default_path)))
+        self.max_bytes = int(os.getenv("WORKSPACE_INDEX_MAX_BYTES", "524288"))
+        self.budget = int(os.getenv("WORKSPACE_CONTEXT_TOKENS", "600"))
+        self.max_defs = int(os.getenv("WORKSPACE_CONTEXT_DEFS", "5"))
+        self.max_lines = int(os.getenv("WORKSPACE_CONTEXT_LINES", "15"))
+        self.debounce = float(os.getenv("RAG_WATCH_DEBOUNCE", "0.5"))
+        # rel -> {"mtime", "size", "language", "lines", "symbols", "imports"}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._names: Dict[str, List[Tuple[str, Symbol]]] = defaultdict(list)
+        self._modules: Dict[str, List[str]] = defaultdict(list)
+        self.imports: Dict[str, Set[str]] = {}
+        self.importers: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+        self._pending: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._load()
+
+    # Persistence
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("workspace") != str(self.workspace):
+            return
+        for rel, entry in data.get("files", {}).items():
+            entry["symbols"] = [tuple(s) for s in entry["symbols"]]
+            entry["imports"] = [(kind, list(c)) for kind, c in entry["imports"]]
+            self.files[rel] = entry
+        self._rebuild()
+
+    def save(self) -> None:
+        with self._lock:
+            payload = json.dumps({"workspace": str(self.workspace), "files": self.files})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    # Derived tables
+
+    def _rebuild(self) -> None:
+        """Recompute name table, module map and both import directions from ``files``."""
+        self._names.clear()
+        self._modules.clear()
+        for rel, entry in self.files.items():
+            self._add_tables(rel, entry)
+        self.imports = {rel: self._resolve(rel, entry) for rel, entry in self.files.items()}
+        self.importers.clear()
+        for rel, targets in self.imports.items():
+            for target in targets:
+                self.importers[target].add(rel)
+
+    def _add_tables(self, rel: str, entry: Dict[str, Any]) -> None:
+        for symbol in entry["symbols"]:
+            self._names[symbol[0]].append((rel, symbol))
+        module = module_name(rel)
+        if module:
+            # Every dotted suffix, so "app.models.router" resolves wherever the source root is
+            parts = module.split(".")
+            for i in range(len(parts)):
+                self._modules[".".join(parts[i:])].append(rel)
+
+    def _drop_tables(self, rel: str, entry: Dict[str, Any]) -> None:
+        for symbol in entry["symbols"]:
+            defs = self._names.get(symbol[0], [])
+            defs[:] = [d for d in defs if d[0] != rel]
+            if not defs:
+                self._names.pop(symbol[0], None)
+
+    def _resolve(self, rel: str, entry: Dict[str, Any]) -> Set[str]:
+        targets: Set[str] = set()
+        for kind, candidates in entry["imports"]:
+            for candidate in candidates:
+                if kind == "path":
+                    hits = [candidate] if candidate in self.files else []
+                else:
+                    hits = self._modules.get(candidate, [])
+                if hits:
+                    # Same-named modules: prefer the one sharing the longest directory prefix
+                    best = max(hits, key=lambda h: len(os.path.commonprefix([h, rel])))
+                    if best != rel:
+                        targets.add(best)
+                    break
+        return targets
+
+    # Indexing
+
+    def _parse(self, rel: str, stat: os.stat_result) -> Dict[str, Any]:
+        language = language_of(rel)
+        entry: Dict[str, Any] = {
+            "mtime": stat.st_mtime_ns, "size": stat.st_size, "language": language,
+            "lines": 0, "symbols": [], "imports": [],
+        }
+        if stat.st_size > self.max_bytes:
+            return entry
+        text = (self.workspace / rel).read_bytes().decode("utf-8", errors="replace")
+        entry["lines"] = text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+        entry["symbols"], entry["imports"] = extract(text, rel, language)
+        return entry
+
+    def _apply(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Swap in parsed entries (None removes); edges are patched unless the file set changed."""
+        with self._lock:
+            membership = False
+            for rel, entry in changes.items():
+                old = self.files.pop(rel, None)
+                if old is not None:
+                    self._drop_tables(rel, old)
+                membership = membership or (old is None) != (entry is None)
+                if entry is not None:
+                    self.files[rel] = entry
+                    if old is None:
+                        self._add_tables(rel, entry)
+                    else:
+                        for symbol in entry["symbols"]:
+                            self._names[symbol[0]].append((rel, symbol))
+            if membership:
+                # Added or removed files can change how other files' imports resolve
+                self._rebuild()
+                return
+            for rel, entry in changes.items():
+                for target in self.imports.pop(rel, set()):
+                    self.importers[target].discard(rel)
+                if entry is not None:
+                    self.imports[rel] = self._resolve(rel, entry)
+                    for target in self.imports[rel]:
+                        self.importers[target].add(rel)
+
+    def sync(self) -> Dict[str, int]:
+        """Full pass: parse new/changed files, drop deleted ones, persist."""
+        stats = {"parsed": 0, "unchanged": 0, "removed": 0}
+        changes: Dict[str, Optional[Dict[str, Any]]] = {}
+        seen: Set[str] = set()
+        for entry in walk_files(self.workspace, lambda name: language_of(name) is not None):
+            rel = Path(entry.path).relative_to(self.workspace).as_posix()
+            seen.add(rel)
+            try:
+                stat = entry.stat(follow_symlinks=False)
+                known = self.files.get(rel)
+                if known and known["mtime"] == stat.st_mtime_ns and known["size"] == stat.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                changes[rel] = self._parse(rel, stat)
+                stats["parsed"] += 1
+            except OSError:
+                continue
+        with self._lock:
+            removed = [r for r in self.files if r not in seen]
+        for rel in removed:
+            changes[rel] = None
+            stats["removed"] += 1
+        if changes:
+            self._apply(changes)
+            self.save()
+        return stats
+
+    def sync_paths(self, paths: Iterable[str]) -> None:
+        """Re-parse only the given workspace-relative paths (deleted paths are dropped)."""
+        changes: Dict[str, Optional[Dict[str, Any]]] = {}
+        for rel in paths:
+            path = self.workspace / rel
+            if any(part in SKIP_DIRS for part in Path(rel).parts[:-1]) or path == self.path.resolve():
+                continue
+            if not path.exists():
+                prefix = rel + "/"
+                changes.update((r, None) for r in list(self.files) if r == rel or r.startswith(prefix))
+                continue
+            if path.is_dir() or language_of(path.name) is None:
+                continue
+            try:
+                stat = path.stat()
+                known = self.files.get(rel)
+                if known and known["mtime"] == stat.st_mtime_ns and known["size"] == stat.st_size:
+                    continue
+                changes[rel] = self._parse(rel, stat)
+            except OSError:
+                continue
+        if changes:
+            self._apply(changes)
+            self.save()
+
+    def enqueue(self, rel: str) -> None:
+        """Watcher callback: batch changed paths and re-parse them after a quiet period."""
+        with self._lock:
+            self._pending.add(rel)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self) -> None:
+        with self._lock:
+            paths, self._pending = self._pending, set()
+            self._timer = None
+        self.sync_paths(paths)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    # Queries
+
+    def languages(self) -> Dict[str, Dict[str, int]]:
+        files: Counter = Counter()
+        lines: Counter = Counter()
+        with self._lock:
+            for entry in self.files.values():
+                files[entry["language"]] += 1
+                lines[entry["language"]] += entry["lines"]
+        return {lang: {"files": files[lang], "lines": lines[lang]} for lang, _ in files.most_common()}
+
+    def tree(self, directory: str = "", depth: int = 1) -> List[str]:
+        """Files and subdirectories up to ``depth`` levels below ``directory`` (``dir/`` suffixed)."""
+        prefix = directory.strip("/") + "/" if directory.strip("/") else ""
+        out: Set[str] = set()
+        with self._lock:
+            for rel in self.files:
+                if not rel.startswith(prefix):
+                    continue
+                parts = rel[len(prefix) :].split("/")
+                out.add("/".join(parts[:depth]) + ("/" if len(parts) > depth else ""))
+        return sorted(out)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            symbols = sum(len(e["symbols"]) for e in self.files.values())
+            edges = sum(len(t) for t in self.imports.values())
+        return {"files": len(self.files), "symbols": symbols, "import_edges": edges, "languages": self.languages()}
+
+    def _relative(self, file_path: Optional[str]) -> Optional[str]:
+        if not file_path:
+            return None
+        path = Path(file_path)
+        if path.is_absolute():
+            try:
+                return path.resolve().relative_to(self.workspace).as_posix()
+            except ValueError:
+                return None
+        rel = path.as_posix().removeprefix("./")
+        if rel in self.files:
+            return rel
+        # Editors may send a path relative to a subproject; match on the suffix
+        matches = [r for r in self.files if r.endswith("/" + rel)]
+        return matches[0] if len(matches) == 1 else None
+
+    def related(self, code: str, file_path: Optional[str] = None) -> List[Tuple[str, Symbol]]:
+        """Definitions ``code`` refers to, most relevant first.
+
+        A definition qualifies when its name appears in the snippet; it ranks
+        higher when its file is imported by (or imports) ``file_path`` or sits
+        in the same directory. Names defined in too many places to tell apart
+        count only within those neighbouring files.
+        """
+        uses = Counter(_IDENT.findall(code))
+        with self._lock:
+            current = self._relative(file_path)
+            forward = self.imports.get(current, set()) if current else set()
+            backward = self.importers.get(current, set()) if current else set()
+            directory = current.rsplit("/", 1)[0] if current and "/" in current else ""
+            scored = []
+            for name, count in uses.items():
+                defs = self._names.get(name)
+                if not defs:
+                    continue
+                for rel, symbol in defs:
+                    if rel == current:
+                        continue  # the editor already has this file
+                    near = 3 if rel in forward else 2 if rel in backward else 0
+                    if not near and len(defs) > 3:
+                        continue
+                    same_dir = 1 if directory and rel.rsplit("/", 1)[0] == directory else 0
+                    scored.append((near + same_dir + min(count, 3), rel, symbol))
+        scored.sort(key=lambda item: (-item[0], item[1], item[2][2]))
+        return [(rel, symbol) for _, rel, symbol in scored]
+
+    def prompt_context(self, code: str, file_path: Optional[str] = None) -> str:
+        """Source of the most relevant definitions, within the token budget (blocking)."""
+        blocks: List[str] = []
+        used = 0
+        cache: Dict[str, List[str]] = {}
+        for rel, (name, kind, start, end, signature) in self.related(code, file_path):
+            if len(blocks) >= self.max_defs:
+                break
+            if rel not in cache:
+                try:
+                    cache[rel] = (self.workspace / rel).read_text(encoding="utf-8", errors="replace").splitlines()
+                except OSError:
+                    continue
+            lines = cache[rel][start - 1 : min(end, start + self.max_lines - 1)]
+            if not lines or lines[0].strip() != signature:
+                continue  # file changed since it was indexed
+            if end > start + len(lines) - 1:
+                lines.append("    ...")
+            block = f"# {rel}:{start}\n" + "\n".join(lines)
+            cost = estimate_tokens(block)
+            if used + cost > self.budget:
+                continue
+            blocks.append(block)
+            used += cost
+        return "\n\n".join(blocks)
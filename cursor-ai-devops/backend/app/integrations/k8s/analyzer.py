@@ -1,6 +1,18 @@
-from typing import Any, Dict, List
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 import yaml
 
+from app.integrations.k8s.cache import FindingsCache
+from app.integrations.k8s.rules import CONTAINER, METADATA, POD, REGISTRY, RULESET_VERSION, CheckFn
+
+# libyaml's C loader is several times faster than the pure-Python one when present
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_DOC_START = re.compile(r"^---(?:[ \t]|$)", re.MULTILINE)
+
 
 def _ensure_list(value: Any) -> List[Any]:
     if value is None:
@@ -10,92 +22,313 @@ def _ensure_list(value: Any) -> List[Any]:
     return [value]
 
 
-def analyze_manifest(manifest_yaml: str) -> List[Dict[str, Any]]:
-    """Lightweight static checks for common K8s security/perf issues.
+class Finding(NamedTuple):
+    severity: str
+    resource: str
+    message: str
+    rule: str
 
-    Returns a list of findings: {severity, resource, message, rule}
+
+_Compiled = Tuple[Tuple[str, str, CheckFn], ...]
+
+
+def _env_set(name: str) -> List[str]:
+    return [v.strip() for v in os.getenv(name, "").split(",") if v.strip()]
+
+
+class RuleEngine:
+    """Rules from ``rules.REGISTRY`` compiled into per-scope dispatch tables.
+
+    Each document is traversed once: metadata, pod spec and containers are
+    resolved a single time and handed to every rule subscribed to that scope.
+
+    Configuration via env (used when arguments are omitted):
+      K8S_RULES_DISABLED: comma-separated rule ids to skip
+      K8S_RULE_SEVERITY: overrides such as ``no-host-network=critical,image-tag-not-latest=low``
     """
-    findings: List[Dict[str, Any]] = []
-    docs = list(yaml.safe_load_all(manifest_yaml))
-    for doc in docs:
+
+    def __init__(
+        self,
+        disabled: Optional[Iterable[str]] = None,
+        severity_overrides: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if disabled is None:
+            disabled = _env_set("K8S_RULES_DISABLED")
+        if severity_overrides is None:
+            severity_overrides = dict(
+                item.split("=", 1) for item in _env_set("K8S_RULE_SEVERITY") if "=" in item
+            )
+        self.disabled = frozenset(disabled)
+        self.severity_overrides = dict(severity_overrides)
+        tables: Dict[str, List[Tuple[str, str, CheckFn]]] = {CONTAINER: [], POD: [], METADATA: []}
+        for rule_id, r in REGISTRY.items():
+            if rule_id in self.disabled:
+                continue
+            tables[r.scope].append((rule_id, self.severity_overrides.get(rule_id, r.severity), r.check))
+        self._container: _Compiled = tuple(tables[CONTAINER])
+        self._pod: _Compiled = tuple(tables[POD])
+        self._metadata: _Compiled = tuple(tables[METADATA])
+        signature = RULESET_VERSION + "|" + ",".join(
+            f"{rule_id}={severity}" for rule_id, severity, _ in self._metadata + self._pod + self._container
+        )
+        self.version = hashlib.sha256(signature.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def rule_ids(self) -> List[str]:
+        return [rule_id for rule_id, _, _ in self._metadata + self._pod + self._container]
+
+    def analyze_document(self, doc: Any, out: Optional[List[Finding]] = None) -> List[Finding]:
+        findings: List[Finding] = [] if out is None else out
         if not isinstance(doc, dict):
-            continue
-        kind = doc.get("kind", "Unknown")
-        metadata = doc.get("metadata", {}) or {}
-        name = metadata.get("name", "unknown")
-        spec = doc.get("spec", {}) or {}
-        resource_id = f"{kind}/{name}"
+            return findings
+        append = findings.append
+        metadata = doc.get("metadata") or {}
+        resource_id = f"{doc.get('kind', 'Unknown')}/{metadata.get('name', 'unknown')}"
+
+        for rule_id, severity, check in self._metadata:
+            message = check(doc, resource_id)
+            if message is not None:
+                append(Finding(severity, resource_id, message, rule_id))
 
-        # Check image tags not 'latest'
-        template = spec.get("template", {}) if "template" in spec else doc.get("template", {})
         # Controllers (Deployment/SS/DS) use spec.template.spec; Pods use spec directly
-        if template:
-            pod_spec = template.get("spec", {}) or {}
-        else:
-            pod_spec = spec or {}
-        containers = _ensure_list(pod_spec.get("containers"))
-        for c in containers:
-            image = c.get("image", "")
-            if ":" not in image or image.endswith(":latest"):
-                findings.append({
-                    "severity": "medium",
-                    "resource": resource_id,
-                    "message": f"Container {c.get('name','?')} uses a floating tag or latest: {image}",
-                    "rule": "image-tag-not-latest",
-                })
-
-            # Resources
-            resources = c.get("resources", {}) or {}
-            if not resources.get("requests") or not resources.get("limits"):
-                findings.append({
-                    "severity": "medium",
-                    "resource": resource_id,
-                    "message": f"Container {c.get('name','?')} missing resource requests/limits",
-                    "rule": "resources-requests-limits-required",
-                })
-
-            # Security context
-            sc = c.get("securityContext", {}) or {}
-            if sc.get("runAsNonRoot") is not True:
-                findings.append({
-                    "severity": "high",
-                    "resource": resource_id,
-                    "message": f"Container {c.get('name','?')} should set securityContext.runAsNonRoot=true",
-                    "rule": "run-as-non-root",
-                })
-            if sc.get("allowPrivilegeEscalation") is not False:
-                findings.append({
-                    "severity": "high",
-                    "resource": resource_id,
-                    "message": f"Container {c.get('name','?')} should set allowPrivilegeEscalation=false",
-                    "rule": "no-priv-esc",
-                })
-            caps = (sc.get("capabilities", {}) or {}).get("drop", [])
-            if "ALL" not in caps:
-                findings.append({
-                    "severity": "medium",
-                    "resource": resource_id,
-                    "message": f"Container {c.get('name','?')} should drop ALL capabilities",
-                    "rule": "capabilities-drop-all",
-                })
-
-        # Pod-level checks
-        if pod_spec:
-            if pod_spec.get("hostNetwork") is True:
-                findings.append({
-                    "severity": "high",
-                    "resource": resource_id,
-                    "message": "hostNetwork=true increases risk; avoid unless required",
-                    "rule": "no-host-network",
-                })
-            if pod_spec.get("serviceAccountName") in (None, "default"):
-                findings.append({
-                    "severity": "medium",
-                    "resource": resource_id,
-                    "message": "Explicit serviceAccountName recommended (avoid default)",
-                    "rule": "explicit-service-account",
-                })
-
-    return findings
+        spec = doc.get("spec") or {}
+        template = spec.get("template", {}) if "template" in spec else doc.get("template", {})
+        pod_spec = (template.get("spec") or {}) if template else spec
+        if not pod_spec:
+            return findings
+
+        for container in _ensure_list(pod_spec.get("containers")):
+            name = container.get("name", "?")
+            for rule_id, severity, check in self._container:
+                message = check(container, name)
+                if message is not None:
+                    append(Finding(severity, resource_id, message, rule_id))
+
+        for rule_id, severity, check in self._pod:
+            message = check(pod_spec, resource_id)
+            if message is not None:
+                append(Finding(severity, resource_id, message, rule_id))
+        return findings
+
+    def analyze(self, docs: Iterable[Any]) -> List[Finding]:
+        findings: List[Finding] = []
+        for doc in docs:
+            self.analyze_document(doc, findings)
+        return findings
+
+
+_default_engine: Optional[RuleEngine] = None
+
+
+def default_engine() -> RuleEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = RuleEngine()
+    return _default_engine
+
+
+def load_documents(manifest_yaml: Any) -> Iterator[Any]:
+    """Lazily parse a multi-document YAML string or stream, one document at a time."""
+    return yaml.load_all(manifest_yaml, Loader=YamlLoader)
+
+
+def split_documents(manifest_yaml: str, target_bytes: int) -> List[str]:
+    """Split raw YAML on ``---`` markers into batches of roughly ``target_bytes``.
+
+    Splitting is textual so batches can be parsed in other processes.
+    """
+    starts = [m.start() for m in _DOC_START.finditer(manifest_yaml)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(manifest_yaml))
+    batches: List[str] = []
+    batch_start = 0
+    for end in starts[1:]:
+        if end - batch_start >= target_bytes:
+            batches.append(manifest_yaml[batch_start:end])
+            batch_start = end
+    if batch_start < len(manifest_yaml):
+        batches.append(manifest_yaml[batch_start:])
+    return batches
+
+
+_worker_engines: Dict[Tuple[Any, ...], RuleEngine] = {}
+
+
+def _worker_engine(disabled: Tuple[str, ...], overrides: Tuple[Tuple[str, str], ...]) -> RuleEngine:
+    key = (disabled, overrides)
+    engine = _worker_engines.get(key)
+    if engine is None:
+        engine = _worker_engines[key] = RuleEngine(disabled, dict(overrides))
+    return engine
+
 
+def analyze_batch(batch: str, disabled: Tuple[str, ...], overrides: Tuple[Tuple[str, str], ...]) -> List[Finding]:
+    return _worker_engine(disabled, overrides).analyze(load_documents(batch))
 
+
+def _analyze_each(
+    texts: List[str], disabled: Tuple[str, ...], overrides: Tuple[Tuple[str, str], ...]
+) -> List[List[Finding]]:
+    engine = _worker_engine(disabled, overrides)
+    return [engine.analyze(load_documents(text)) for text in texts]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def parallel_workers() -> int:
+    return int(os.getenv("K8S_ANALYZE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=parallel_workers())
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def iter_findings(
+    manifest_yaml: str, engine: Optional[RuleEngine] = None, parallel: Optional[bool] = None
+) -> Iterator[Finding]:
+    """Yield findings as documents are analyzed.
+
+    Sequential mode parses and checks one document at a time. Parallel mode
+    (default for bundles of K8S_PARALLEL_MIN_BYTES or more, when
+    K8S_ANALYZE_WORKERS > 1) fans document batches of K8S_BATCH_BYTES out to
+    a process pool; findings still come back in document order.
+    """
+    engine = engine or default_engine()
+    if parallel is None:
+        min_bytes = int(os.getenv("K8S_PARALLEL_MIN_BYTES", str(2 * 1024 * 1024)))
+        parallel = parallel_workers() > 1 and len(manifest_yaml) >= min_bytes
+    if not parallel:
+        for doc in load_documents(manifest_yaml):
+            yield from engine.analyze_document(doc)
+        return
+    batches = split_documents(manifest_yaml, int(os.getenv("K8S_BATCH_BYTES", str(256 * 1024))))
+    disabled = tuple(sorted(engine.disabled))
+    overrides = tuple(sorted(engine.severity_overrides.items()))
+    n = len(batches)
+    for findings in get_pool().map(analyze_batch, batches, [disabled] * n, [overrides] * n):
+        yield from findings
+
+
+def digest_text(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def canonical_key(doc: Any) -> str:
+    """Hash of the parsed document, independent of key order and formatting."""
+    return digest_text(json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str))
+
+
+def iter_findings_cached(
+    manifest_yaml: str,
+    cache: FindingsCache,
+    engine: Optional[RuleEngine] = None,
+    parallel: Optional[bool] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[Finding]:
+    """Like ``iter_findings`` but only re-checks documents not seen before.
+
+    Each document is looked up first by a hash of its raw text, which skips
+    parsing entirely for byte-identical documents, then (sequential mode) by
+    a hash of the canonicalized parsed document, which also catches
+    reformatted ones. Keys include ``engine.version``. ``stats`` receives
+    ``documents`` and ``cache_hits`` counts.
+    """
+    engine = engine or default_engine()
+    stats = stats if stats is not None else {}
+    stats.setdefault("documents", 0)
+    stats.setdefault("cache_hits", 0)
+    texts = [t for t in split_documents(manifest_yaml, 0) if t.strip()]
+    if parallel is None:
+        min_bytes = int(os.getenv("K8S_PARALLEL_MIN_BYTES", str(2 * 1024 * 1024)))
+        parallel = parallel_workers() > 1 and len(manifest_yaml) >= min_bytes
+    raw_keys = [f"{engine.version}:raw:{digest_text(t.strip())}" for t in texts]
+    cached = [cache.get(key) for key in raw_keys]
+
+    misses: Iterator[List[Finding]]
+    if parallel:
+        pending = [t for t, hit in zip(texts, cached) if hit is None]
+        target = int(os.getenv("K8S_BATCH_BYTES", str(256 * 1024)))
+        batches: List[List[str]] = [[]]
+        size = 0
+        for text in pending:
+            if size >= target:
+                batches.append([])
+                size = 0
+            batches[-1].append(text)
+            size += len(text)
+        disabled = tuple(sorted(engine.disabled))
+        overrides = tuple(sorted(engine.severity_overrides.items()))
+        n = len(batches)
+        results = get_pool().map(_analyze_each, batches, [disabled] * n, [overrides] * n)
+        misses = (findings for batch in results for findings in batch)
+    else:
+
+        def analyze_sequential() -> Iterator[List[Finding]]:
+            for text, hit in zip(texts, cached):
+                if hit is not None:
+                    continue
+                findings: List[Finding] = []
+                for doc in load_documents(text):
+                    key = f"{engine.version}:doc:{canonical_key(doc)}"
+                    doc_hit = cache.get(key)
+                    if doc_hit is None:
+                        doc_findings = engine.analyze_document(doc)
+                        cache.put(key, doc_findings)
+                    else:
+                        stats["cache_hits"] += 1
+                        doc_findings = [Finding(*f) for f in doc_hit]
+                    findings.extend(doc_findings)
+                yield findings
+
+        misses = analyze_sequential()
+
+    for raw_key, hit in zip(raw_keys, cached):
+        stats["documents"] += 1
+        if hit is not None:
+            stats["cache_hits"] += 1
+            for f in hit:
+                yield Finding(*f)
+            continue
+        findings = next(misses)
+        cache.put(raw_key, findings)
+        yield from findings
+
+
+_default_cache: Optional[FindingsCache] = None
+
+
+def default_cache() -> Optional[FindingsCache]:
+    global _default_cache
+    if _default_cache is None and os.getenv("K8S_CACHE", "1") == "1":
+        _default_cache = FindingsCache()
+    return _default_cache
+
+
+def analyze_manifest(
+    manifest_yaml: str,
+    engine: Optional[RuleEngine] = None,
+    parallel: Optional[bool] = None,
+    cache: Optional[FindingsCache] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Lightweight static checks for common K8s security/perf issues.
+
+    Returns a list of findings: {severity, resource, message, rule}
+    """
+    if cache is None:
+        findings = iter_findings(manifest_yaml, engine, parallel)
+    else:
+        findings = iter_findings_cached(manifest_yaml, cache, engine, parallel, stats)
+    return [f._asdict() for f in findings]
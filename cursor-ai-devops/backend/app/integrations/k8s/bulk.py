@@ -0,0 +1,265 @@
+import asyncio
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import os
+import tarfile
+import zipfile
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.integrations.k8s.analyzer import (
+    Finding,
+    RuleEngine,
+    analyze_batch,
+    default_cache,
+    default_engine,
+    digest_text,
+    get_pool,
+)
+
+MANIFEST_SUFFIXES = (".yaml", ".yml")
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# (display name, zero-arg reader returning the file text)
+Source = Tuple[str, Callable[[], str]]
+
+
+def _is_manifest(name: str) -> bool:
+    return name.lower().endswith(MANIFEST_SUFFIXES)
+
+
+def _is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+class ArchiveTooLargeError(ValueError):
+    """The archive exceeds K8S_BULK_MAX_MEMBERS or K8S_BULK_MAX_TOTAL_BYTES."""
+
+
+# Tar compressions by magic bytes; the tar is then read as one forward stream
+_DECOMPRESSORS: Tuple[Tuple[bytes, Callable[[Any], Any]], ...] = (
+    (b"\x1f\x8b", lambda raw: gzip.GzipFile(fileobj=raw)),
+    (b"BZh", bz2.BZ2File),
+    (b"\xfd7zXZ\x00", lzma.LZMAFile),
+)
+
+
+class _Budget(io.RawIOBase):
+    """Readable wrapper raising ``ArchiveTooLargeError`` once more than ``limit`` bytes came out of ``raw``."""
+
+    def __init__(self, raw: Any, limit: int) -> None:
+        self.raw = raw
+        self.limit = limit
+        self.used = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        try:
+            chunk = self.raw.read(len(buffer))
+        except (OSError, EOFError, lzma.LZMAError) as exc:
+            raise tarfile.ReadError(f"corrupt archive: {exc}") from exc
+        self.used += len(chunk)
+        if self.used > self.limit:
+            raise ArchiveTooLargeError(f"archive expands beyond {self.limit} bytes")
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def _archive_sources(
+    data: bytes, max_bytes: int, max_total: Optional[int] = None, max_members: Optional[int] = None
+) -> List[Source]:
+    """Read manifests out of a zip or tar(.gz/.bz2/.xz) archive held in memory.
+
+    Limits apply to the bytes actually decompressed, not to the sizes the
+    headers declare: a member over ``max_bytes`` is skipped, and more than
+    ``max_members`` entries or ``max_total`` bytes in all raises
+    ``ArchiveTooLargeError``. For a zip that is what the manifests inflate
+    to (other members are never decompressed); a compressed tar has to be
+    decompressed whole to walk it, so every byte of it counts, headers and
+    skipped members included.
+    """
+    max_total = max_total or int(os.getenv("K8S_BULK_MAX_TOTAL_BYTES", str(256 * 1024 * 1024)))
+    max_members = max_members or int(os.getenv("K8S_BULK_MAX_MEMBERS", "10000"))
+    sources: List[Source] = []
+    total = 0
+    members = 0
+
+    def take(name: str, handle: Any, counted: bool = False) -> None:
+        nonlocal total
+        raw = handle.read(max_bytes + 1)
+        if not counted:
+            total += len(raw)
+            if total > max_total:
+                raise ArchiveTooLargeError(f"archive expands beyond {max_total} bytes")
+        if len(raw) <= max_bytes:
+            text = _decode(raw)
+            sources.append((name, lambda text=text: text))
+
+    def count() -> None:
+        nonlocal members
+        members += 1
+        if members > max_members:
+            raise ArchiveTooLargeError(f"archive has more than {max_members} entries")
+
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                count()
+                if not info.is_dir() and _is_manifest(info.filename):
+                    with zf.open(info) as handle:
+                        take(info.filename, handle)
+        return sources
+    raw: Any = io.BytesIO(data)
+    for magic, opener in _DECOMPRESSORS:
+        if data.startswith(magic):
+            raw = opener(raw)
+            break
+    with tarfile.open(fileobj=io.BufferedReader(_Budget(raw, max_total)), mode="r|") as tf:
+        for member in tf:
+            count()
+            if member.isfile() and _is_manifest(member.name):
+                handle = tf.extractfile(member)
+                if handle is not None:
+                    take(member.name, handle, counted=True)  # _Budget already counts it
+    return sources
+
+
+def _inside(path: Path, root: Path) -> bool:
+    resolved = path.resolve()
+    return resolved == root or root in resolved.parents
+
+
+def collect_sources(target: str, max_bytes: Optional[int] = None, root: Optional[Path] = None) -> List[Source]:
+    """Resolve a directory, glob pattern or archive path into manifest sources.
+
+    Files are not read here; each source carries a reader so I/O can be
+    scheduled with bounded concurrency. Archives are read eagerly.
+
+    With ``root`` (the HTTP API), ``target`` is taken relative to it and
+    anything resolving outside it, through ``..`` or symlinks, raises
+    ``PermissionError`` or is skipped.
+    """
+    max_bytes = max_bytes or int(os.getenv("K8S_BULK_MAX_FILE_BYTES", str(64 * 1024 * 1024)))
+    if root is not None:
+        root = root.resolve()
+        if Path(target).is_absolute() or ".." in Path(target).parts:
+            raise PermissionError(f"target must be a relative path inside {root}")
+        target = str(root / target)
+    path = Path(target)
+    if path.is_file() and _is_archive(path.name):
+        if root is not None and not _inside(path, root):
+            raise PermissionError(f"target must be a relative path inside {root}")
+        return _archive_sources(path.read_bytes(), max_bytes)
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file() and _is_manifest(p.name))
+        base: Optional[Path] = path
+    elif path.is_file():
+        files, base = [path], None
+    else:
+        files = sorted(Path(p) for p in glob.glob(target, recursive=True) if _is_manifest(p) and os.path.isfile(p))
+        base = None
+    sources: List[Source] = []
+    for f in files:
+        if root is not None and not _inside(f, root):
+            continue
+        if f.stat().st_size > max_bytes:
+            continue
+        if base is not None:
+            name = f.relative_to(base).as_posix()
+        else:
+            name = f.relative_to(root).as_posix() if root is not None else f.as_posix()
+        sources.append((name, lambda f=f: f.read_text(encoding="utf-8", errors="replace")))
+    return sources
+
+
+def summarize(files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    by_rule: Counter = Counter()
+    by_severity: Counter = Counter()
+    for entry in files:
+        for f in entry["findings"]:
+            by_rule[f["rule"]] += 1
+            by_severity[f["severity"]] += 1
+    return {
+        "files": len(files),
+        "errors": sum(1 for entry in files if entry.get("error")),
+        "findings": sum(by_rule.values()),
+        "cache_hits": sum(1 for entry in files if entry.get("cached")),
+        "by_rule": dict(by_rule.most_common()),
+        "by_severity": dict(by_severity.most_common()),
+    }
+
+
+async def analyze_sources(
+    sources: List[Source],
+    engine: Optional[RuleEngine] = None,
+    io_concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Read sources with bounded concurrency and analyze them on the process pool.
+
+    A file is submitted for analysis as soon as it has been read, so I/O and
+    CPU work overlap; at most K8S_BULK_IN_FLIGHT files are between read and
+    result at once, which bounds memory. Whole files are looked up in the
+    analyzer cache first.
+
+    Configuration via env:
+      K8S_BULK_IO_CONCURRENCY (concurrent file reads, default 16)
+      K8S_BULK_IN_FLIGHT (files read but not yet analyzed, default 32)
+      K8S_BULK_MAX_FILE_BYTES (skip larger files, default 64 MiB)
+      K8S_BULK_MAX_MEMBERS (archive entries, default 10000)
+      K8S_BULK_MAX_TOTAL_BYTES (decompressed archive size, default 256 MiB)
+    """
+    engine = engine or default_engine()
+    cache = default_cache()
+    semaphore = asyncio.Semaphore(io_concurrency or int(os.getenv("K8S_BULK_IO_CONCURRENCY", "16")))
+    in_flight = asyncio.Semaphore(max(1, int(os.getenv("K8S_BULK_IN_FLIGHT", "32"))))
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    disabled = tuple(sorted(engine.disabled))
+    overrides = tuple(sorted(engine.severity_overrides.items()))
+
+    async def run_one(name: str, read: Callable[[], str]) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"file": name, "findings": []}
+        try:
+            async with in_flight:
+                async with semaphore:
+                    text = await asyncio.to_thread(read)
+                key = f"{engine.version}:file:{digest_text(text)}"
+                hit = cache.get(key) if cache is not None else None
+                if hit is not None:
+                    findings = [Finding(*f) for f in hit]
+                    entry["cached"] = True
+                else:
+                    findings = await loop.run_in_executor(pool, analyze_batch, text, disabled, overrides)
+                    if cache is not None:
+                        cache.put(key, findings)
+            entry["findings"] = [f._asdict() for f in findings]
+        except Exception as exc:
+            entry["error"] = f"{type(exc).__name__}: {exc}"
+        entry["count"] = len(entry["findings"])
+        return entry
+
+    files = list(await asyncio.gather(*(run_one(name, read) for name, read in sources)))
+    return {"files": files, "summary": summarize(files)}
+
+
+async def analyze_target(
+    target: str, engine: Optional[RuleEngine] = None, root: Optional[Path] = None
+) -> Dict[str, Any]:
+    sources = await asyncio.to_thread(collect_sources, target, None, root)
+    return await analyze_sources(sources, engine)
+
+
+async def analyze_archive_bytes(data: bytes, engine: Optional[RuleEngine] = None) -> Dict[str, Any]:
+    max_bytes = int(os.getenv("K8S_BULK_MAX_FILE_BYTES", str(64 * 1024 * 1024)))
+    sources = await asyncio.to_thread(_archive_sources, data, max_bytes)
+    return await analyze_sources(sources, engine)
@@ -0,0 +1,70 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional
+
+
+class FindingsCache:
+    """Per-document analyzer results keyed by content hash and ruleset version.
+
+    In-memory LRU, optionally backed by a SQLite file so results survive
+    across processes (e.g. CI runs of the CLI).
+
+    Configuration via env:
+      K8S_CACHE (default 1), K8S_CACHE_MAX_ENTRIES (in-memory, default 20000)
+      K8S_CACHE_PATH (SQLite file; unset keeps the cache in memory only)
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None) -> None:
+        self.max_entries = max_entries or int(os.getenv("K8S_CACHE_MAX_ENTRIES", "20000"))
+        self._memory: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        path = path or os.getenv("K8S_CACHE_PATH")
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS findings (key TEXT PRIMARY KEY, findings TEXT NOT NULL)")
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[List[Any]]:
+        """Return cached findings as lists of fields, or None on a miss."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute("SELECT findings FROM findings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, findings: List[Any]) -> None:
+        value = [list(f) for f in findings]
+        with self._lock:
+            self._remember(key, value)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO findings (key, findings) VALUES (?, ?)", (key, json.dumps(value))
+                    )
+
+    def _remember(self, key: str, value: List[Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
@@ -0,0 +1,108 @@
+from typing import Any, Callable, Dict, List, Optional
+
+# Scopes a rule can subscribe to. The analyzer resolves each once per document.
+CONTAINER = "container"  # every entry of the pod spec's containers list
+POD = "pod"  # the pod spec (spec.template.spec for controllers, spec for Pods)
+METADATA = "metadata"  # the whole document, for kind/metadata level checks
+SCOPES = (CONTAINER, POD, METADATA)
+
+# Bump whenever a rule's logic or message changes; it is part of the analyzer
+# cache key, so cached findings from older rules are never reused.
+RULESET_VERSION = "1"
+
+CheckFn = Callable[[Dict[str, Any], str], Optional[str]]
+
+
+class Rule:
+    """A single check. ``check(node, label)`` returns a message when it fires.
+
+    ``label`` is the container name for container rules and the resource id
+    (``Kind/name``) otherwise.
+    """
+
+    __slots__ = ("id", "severity", "scope", "check", "description")
+
+    def __init__(self, rule_id: str, severity: str, scope: str, check: CheckFn, description: str = "") -> None:
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown rule scope: {scope}")
+        self.id = rule_id
+        self.severity = severity
+        self.scope = scope
+        self.check = check
+        self.description = description
+
+
+REGISTRY: Dict[str, Rule] = {}
+
+
+def rule(rule_id: str, severity: str, scope: str) -> Callable[[CheckFn], CheckFn]:
+    """Register a check function in ``REGISTRY``."""
+
+    def decorator(fn: CheckFn) -> CheckFn:
+        REGISTRY[rule_id] = Rule(rule_id, severity, scope, fn, (fn.__doc__ or "").strip())
+        return fn
+
+    return decorator
+
+
+def registered(scope: Optional[str] = None) -> List[Rule]:
+    return [r for r in REGISTRY.values() if scope is None or r.scope == scope]
+
+
+@rule("image-tag-not-latest", "medium", CONTAINER)
+def _image_tag(container: Dict[str, Any], name: str) -> Optional[str]:
+    """Images must be pinned to a tag other than latest."""
+    image = container.get("image", "")
+    if ":" not in image or image.endswith(":latest"):
+        return f"Container {name} uses a floating tag or latest: {image}"
+    return None
+
+
+@rule("resources-requests-limits-required", "medium", CONTAINER)
+def _resources(container: Dict[str, Any], name: str) -> Optional[str]:
+    """Containers must declare resource requests and limits."""
+    resources = container.get("resources") or {}
+    if not resources.get("requests") or not resources.get("limits"):
+        return f"Container {name} missing resource requests/limits"
+    return None
+
+
+@rule("run-as-non-root", "high", CONTAINER)
+def _run_as_non_root(container: Dict[str, Any], name: str) -> Optional[str]:
+    """securityContext.runAsNonRoot must be true."""
+    if (container.get("securityContext") or {}).get("runAsNonRoot") is not True:
+        return f"Container {name} should set securityContext.runAsNonRoot=true"
+    return None
+
+
+@rule("no-priv-esc", "high", CONTAINER)
+def _no_priv_esc(container: Dict[str, Any], name: str) -> Optional[str]:
+    """securityContext.allowPrivilegeEscalation must be false."""
+    if (container.get("securityContext") or {}).get("allowPrivilegeEscalation") is not False:
+        return f"Container {name} should set allowPrivilegeEscalation=false"
+    return None
+
+
+@rule("capabilities-drop-all", "medium", CONTAINER)
+def _drop_all(container: Dict[str, Any], name: str) -> Optional[str]:
+    """Containers must drop ALL Linux capabilities."""
+    caps = ((container.get("securityContext") or {}).get("capabilities") or {}).get("drop", [])
+    if "ALL" not in caps:
+        return f"Container {name} should drop ALL capabilities"
+    return None
+
+
+@rule("no-host-network", "high", POD)
+def _host_network(pod_spec: Dict[str, Any], resource: str) -> Optional[str]:
+    """Pods should not share the host network namespace."""
+    if pod_spec.get("hostNetwork") is True:
+        return "hostNetwork=true increases risk; avoid unless required"
+    return None
+
+
+@rule("explicit-service-account", "medium", POD)
+def _service_account(pod_spec: Dict[str, Any], resource: str) -> Optional[str]:
+    """Pods should name a dedicated service account."""
+    if pod_spec.get("serviceAccountName") in (None, "default"):
+        return "Explicit serviceAccountName recommended (avoid default)"
+    return None
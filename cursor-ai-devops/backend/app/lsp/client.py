@@ -0,0 +1,238 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class LspError(Exception):
+    """The language server failed, timed out or exited."""
+
+
+def utf16_len(text: str) -> int:
+    """Length in UTF-16 code units, the unit of LSP ``character`` offsets."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def position_at(text: str, offset: int) -> Dict[str, int]:
+    """LSP ``Position`` of a string offset."""
+    line = text.count("\n", 0, offset)
+    start = text.rfind("\n", 0, offset) + 1
+    return {"line": line, "character": utf16_len(text[start:offset])}
+
+
+def text_edit(old: str, new: str) -> Dict[str, Any]:
+    """One ``didChange`` content change turning ``old`` into ``new``: the span between common prefix and suffix."""
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]:
+        suffix += 1
+    return {
+        "range": {"start": position_at(old, prefix), "end": position_at(old, len(old) - suffix)},
+        "text": new[prefix : len(new) - suffix],
+    }
+
+
+class LspClient:
+    """One long-lived language server subprocess, JSON-RPC over stdio.
+
+    Requests are multiplexed: each gets an id and a future, and a single
+    reader task routes responses back, so any number of callers can have
+    requests in flight. Open documents are tracked with their version and
+    text so edits go out as incremental ``didChange`` deltas when the server
+    supports them.
+    """
+
+    def __init__(self, command: List[str], root: Path, max_documents: int = 200) -> None:
+        self.command = command
+        self.root = root
+        self.max_documents = max_documents
+        self.capabilities: Dict[str, Any] = {}
+        self.last_used = time.monotonic()
+        self.documents: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._write_lock = asyncio.Lock()
+        self._closed = False
+
+    @property
+    def alive(self) -> bool:
+        return not self._closed and self._process is not None and self._process.returncode is None
+
+    async def start(self, timeout: float) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            *self.command,
+            cwd=str(self.root),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+        params = {
+            "processId": None,
+            "rootUri": self.root.as_uri(),
+            "workspaceFolders": [{"uri": self.root.as_uri(), "name": self.root.name}],
+            "capabilities": {
+                "textDocument": {
+                    "synchronization": {"dynamicRegistration": False},
+                    "completion": {"completionItem": {"snippetSupport": False}},
+                },
+                "workspace": {"configuration": True, "workspaceFolders": True},
+            },
+        }
+        try:
+            result = await self.request("initialize", params, timeout)
+        except BaseException:
+            await self.aclose()
+            raise
+        self.capabilities = (result or {}).get("capabilities", {})
+        await self.notify("initialized", {})
+
+    @property
+    def sync_kind(self) -> int:
+        """textDocumentSync change kind: 0 none, 1 full text, 2 incremental."""
+        sync = self.capabilities.get("textDocumentSync", 1)
+        return sync.get("change", 1) if isinstance(sync, dict) else int(sync)
+
+    # Wire format
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        if not self.alive:
+            raise LspError("language server is not running")
+        body = json.dumps({"jsonrpc": "2.0", **message}, separators=(",", ":")).encode("utf-8")
+        assert self._process is not None and self._process.stdin is not None
+        async with self._write_lock:
+            self._process.stdin.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            try:
+                await self._process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as exc:
+                raise LspError("language server closed its input") from exc
+
+    async def _read_message(self) -> Optional[Dict[str, Any]]:
+        assert self._process is not None and self._process.stdout is not None
+        stdout = self._process.stdout
+        length = None
+        while True:
+            line = await stdout.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.decode("ascii", errors="replace").partition(":")
+            if name.lower() == "content-length":
+                length = int(value.strip())
+        if length is None:
+            return {}
+        return json.loads(await stdout.readexactly(length))
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                message = await self._read_message()
+                if message is None:
+                    break
+                if "id" in message and "method" not in message:
+                    future = self._pending.pop(message["id"], None)
+                    if future is not None and not future.done():
+                        if "error" in message:
+                            future.set_exception(LspError(message["error"].get("message", "request failed")))
+                        else:
+                            future.set_result(message.get("result"))
+                elif "id" in message:
+                    await self._answer_server_request(message)
+        except (asyncio.IncompleteReadError, ValueError, LspError):
+            pass
+        finally:
+            self._closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(LspError("language server exited"))
+            self._pending.clear()
+
+    async def _answer_server_request(self, message: Dict[str, Any]) -> None:
+        # workspace/configuration wants one entry per item; everything else
+        # (progress tokens, capability registration) is acknowledged with null
+        result: Any = None
+        if message["method"] == "workspace/configuration":
+            result = [None for _ in message.get("params", {}).get("items", [])]
+        await self._send({"id": message["id"], "result": result})
+
+    # RPC
+
+    async def request(self, method: str, params: Any, timeout: float) -> Any:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.last_used = time.monotonic()
+        try:
+            await self._send({"id": request_id, "method": method, "params": params})
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if self.alive:
+                await self.notify("$/cancelRequest", {"id": request_id})
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def notify(self, method: str, params: Any) -> None:
+        await self._send({"method": method, "params": params})
+
+    # Documents
+
+    async def sync_document(self, uri: str, language_id: str, text: str) -> List[str]:
+        """Open ``uri`` or send what changed since the last sync.
+
+        Returns the URIs closed to stay within ``max_documents``.
+        """
+        known = self.documents.get(uri)
+        if known is None:
+            await self.notify(
+                "textDocument/didOpen",
+                {"textDocument": {"uri": uri, "languageId": language_id, "version": 1, "text": text}},
+            )
+            self.documents[uri] = (1, text)
+            closed = []
+            while len(self.documents) > self.max_documents:
+                old_uri, _ = self.documents.popitem(last=False)
+                await self.notify("textDocument/didClose", {"textDocument": {"uri": old_uri}})
+                closed.append(old_uri)
+            return closed
+        self.documents.move_to_end(uri)
+        version, old = known
+        if old == text:
+            return []
+        change = text_edit(old, text) if self.sync_kind == 2 else {"text": text}
+        await self.notify(
+            "textDocument/didChange",
+            {"textDocument": {"uri": uri, "version": version + 1}, "contentChanges": [change]},
+        )
+        self.documents[uri] = (version + 1, text)
+        return []
+
+    async def aclose(self) -> None:
+        """``shutdown`` + ``exit``, then kill the process if it lingers."""
+        process = self._process
+        if process is None:
+            return
+        if self.alive:
+            try:
+                await self.request("shutdown", None, 2.0)
+                await self.notify("exit", None)
+            except (LspError, asyncio.TimeoutError):
+                pass
+        self._closed = True
+        try:
+            await asyncio.wait_for(process.wait(), 2.0)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        if self._reader is not None:
+            self._reader.cancel()
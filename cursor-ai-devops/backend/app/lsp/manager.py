@@ -1,22 +1,262 @@
-from typing import Optional
+import asyncio
+import hashlib
+import os
+import shlex
+import shutil
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.lsp.client import LspClient, LspError, utf16_len
+from app.observability.metrics import lsp_completion_seconds, lsp_completions_total, lsp_servers
+
+# Default servers; LSP_SERVER_<LANGUAGE> overrides (e.g. LSP_SERVER_PYTHON="pylsp")
+DEFAULT_SERVERS = {
+    "python": "pyright-langserver --stdio",
+    "go": "gopls",
+    "typescript": "typescript-language-server --stdio",
+    "javascript": "typescript-language-server --stdio",
+    "rust": "rust-analyzer",
+    "yaml": "yaml-language-server --stdio",
+    "terraform": "terraform-ls serve",
+}
+ALIASES = {"py": "python", "ts": "typescript", "tsx": "typescript", "js": "javascript", "jsx": "javascript",
+           "golang": "go", "rs": "rust", "yml": "yaml", "tf": "terraform", "hcl": "terraform"}
+EXTENSIONS = {"python": ".py", "go": ".go", "typescript": ".ts", "javascript": ".js", "rust": ".rs",
+              "yaml": ".yaml", "terraform": ".tf"}
+
+_ServerKey = Tuple[str, str]  # (language, workspace root)
 
 
 class LspManager:
-    """Placeholder for spawning/managing language servers.
+    """Pool of long-lived language servers, one per (language, workspace root).
+
+    Servers are spawned on first use and reused, so a completion costs one
+    JSON-RPC round trip plus an incremental document sync instead of a
+    process start and project scan. A start runs in the background: no
+    completion waits longer than LSP_TIMEOUT in total, and requests get
+    ``[]`` until the server is up. A language whose server cannot start
+    is retried after LSP_RETRY_SECONDS. Concurrent requests share a server;
+    requests for the same document are serialized so each completion sees
+    its own text. Idle servers are stopped, as is the least recently used
+    one beyond LSP_MAX_SERVERS, and results are cached by document content
+    and cursor position.
 
-    Future: integrate pygls or spawn node-based LSPs (tsserver, gopls, pyright, etc.).
+    Configuration via env:
+      LSP_ENABLED (default 1; without a workspace nothing is ever started)
+      LSP_SERVER_<LANGUAGE>: server command line, overrides DEFAULT_SERVERS
+      LSP_TIMEOUT (seconds per completion, default 2), LSP_START_TIMEOUT (spawn + initialize, default 30)
+      LSP_RETRY_SECONDS (wait before retrying a server that failed to start, default 60)
+      LSP_IDLE_SECONDS (stop servers unused this long, default 600)
+      LSP_MAX_SERVERS (default 8), LSP_MAX_DOCUMENTS (open documents per server, default 200)
+      LSP_CACHE_SIZE (cached completion results, default 512), LSP_MAX_ITEMS (per result, default 50)
     """
 
-    def __init__(self) -> None:
+    def __init__(self, workspace: Optional[str] = None) -> None:
+        self.workspace = Path(workspace or os.getcwd()).resolve()
+        # Without a workspace a server would be rooted at the CWD
+        self.enabled = bool(workspace) and os.getenv("LSP_ENABLED", "1") == "1"
+        self.timeout = float(os.getenv("LSP_TIMEOUT", "2"))
+        self.start_timeout = float(os.getenv("LSP_START_TIMEOUT", "30"))
+        self.retry_seconds = float(os.getenv("LSP_RETRY_SECONDS", "60"))
+        self.idle_seconds = float(os.getenv("LSP_IDLE_SECONDS", "600"))
+        self.max_servers = int(os.getenv("LSP_MAX_SERVERS", "8"))
+        self.max_documents = int(os.getenv("LSP_MAX_DOCUMENTS", "200"))
+        self.cache_size = int(os.getenv("LSP_CACHE_SIZE", "512"))
+        self.max_items = int(os.getenv("LSP_MAX_ITEMS", "50"))
+        self.servers: "OrderedDict[_ServerKey, LspClient]" = OrderedDict()
+        self.cache: "OrderedDict[Tuple[Any, ...], List[Dict[str, Any]]]" = OrderedDict()
+        self._starting: Dict[_ServerKey, asyncio.Task] = {}
+        self._document_locks: Dict[str, asyncio.Lock] = {}
+        self._unavailable: Dict[str, float] = {}  # language -> monotonic time of the next start attempt
+        self._reaper: Optional[asyncio.Task] = None
         self.started = False
 
-    def start(self) -> None:
+    async def start(self) -> None:
         self.started = True
+        if self.enabled and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_idle())
 
     def is_running(self) -> bool:
         return self.started
 
-    def request_completion(self, language: str, code: str, file_path: Optional[str] = None) -> str:
-        return ""  # TODO: wire real LSP completions
+    def known(self, language: str) -> bool:
+        """Languages with a default or configured server; others never reach metrics or state."""
+        return language in DEFAULT_SERVERS or bool(language.isidentifier() and os.getenv(f"LSP_SERVER_{language.upper()}"))
+
+    def command_for(self, language: str) -> Optional[List[str]]:
+        line = os.getenv(f"LSP_SERVER_{language.upper()}") or DEFAULT_SERVERS.get(language)
+        if not line:
+            return None
+        command = shlex.split(line)
+        return command if command and shutil.which(command[0]) else None
+
+    async def _server(self, language: str, root: Path, wait: float) -> Optional[LspClient]:
+        """The running server, waiting at most ``wait`` seconds for one that is starting.
+
+        The start itself is a shared background task bounded by
+        LSP_START_TIMEOUT; giving up on it here does not cancel it.
+        """
+        key = (language, str(root))
+        client = self.servers.get(key)
+        if client is not None and client.alive:
+            self.servers.move_to_end(key)
+            return client
+        if self._unavailable.get(language, 0.0) > time.monotonic():
+            return None
+        task = self._starting.get(key)
+        if task is None:
+            task = self._starting[key] = asyncio.create_task(self._spawn(language, root))
+            task.add_done_callback(lambda _, key=key: self._starting.pop(key, None))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), max(0.0, wait))
+        except asyncio.TimeoutError:
+            return None
+
+    async def _spawn(self, language: str, root: Path) -> Optional[LspClient]:
+        key = (language, str(root))
+        if key in self.servers:
+            await self._stop(key)  # crashed; replace it
+        command = self.command_for(language)
+        client = LspClient(command, root, self.max_documents) if command is not None else None
+        try:
+            if client is None:
+                raise LspError(f"no language server found for {language}")
+            await client.start(self.start_timeout)
+        except (OSError, LspError, asyncio.TimeoutError):
+            self._unavailable[language] = time.monotonic() + self.retry_seconds
+            return None
+        self._unavailable.pop(language, None)
+        self.servers[key] = client
+        lsp_servers.labels(language=language).inc()
+        while len(self.servers) > self.max_servers:
+            await self._stop(next(iter(self.servers)))
+        return client
 
+    async def _stop(self, key: _ServerKey) -> None:
+        client = self.servers.pop(key, None)
+        if client is None:
+            return
+        lsp_servers.labels(language=key[0]).dec()
+        self._forget_documents(list(client.documents))
+        await client.aclose()
 
+    def _forget_documents(self, uris: List[str]) -> None:
+        for uri in uris:
+            lock = self._document_locks.get(uri)
+            if lock is not None and not lock.locked():
+                del self._document_locks[uri]
+
+    async def _reap_idle(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, min(60.0, self.idle_seconds / 2)))
+            cutoff = time.monotonic() - self.idle_seconds
+            for key in [k for k, c in self.servers.items() if c.last_used < cutoff or not c.alive]:
+                await self._stop(key)
+
+    def _document(self, language: str, file_path: Optional[str]) -> Tuple[Path, str]:
+        """Workspace root and document URI for a request.
+
+        Servers are only ever rooted at the workspace: a ``file_path`` that
+        does not resolve inside it (absolute, ``..`` or a symlink out) is
+        treated like an unsaved snippet.
+        """
+        path = (self.workspace / file_path).resolve() if file_path else None
+        if path is None or self.workspace not in path.parents:
+            # Unsaved snippet: a stable virtual file, servers take the text from didOpen
+            path = self.workspace / f".untitled{EXTENSIONS.get(language, '.txt')}"
+        return self.workspace, path.as_uri()
+
+    async def request_completion(
+        self,
+        language: str,
+        code: str,
+        file_path: Optional[str] = None,
+        line: Optional[int] = None,
+        character: Optional[int] = None,
+        wait_for_start: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Completion items at ``line``/``character`` (default: end of ``code``).
+
+        Returns ``[]`` when no server is available or ready, or the whole
+        request (server start, document lock, sync and completion) does not
+        finish in LSP_TIMEOUT; never raises for server trouble. With
+        ``wait_for_start=False`` only an already running server is asked; a
+        missing one is started in the background for later requests.
+        """
+        language = ALIASES.get(language.lower(), language.lower())
+        if not self.enabled or not self.known(language):
+            return []
+        if line is None or character is None:
+            line = code.count("\n")
+            character = utf16_len(code[code.rfind("\n") + 1 :])
+        root, uri = self._document(language, file_path)
+        key = (language, str(root), uri, hashlib.sha1(code.encode("utf-8")).hexdigest(), line, character)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            lsp_completions_total.labels(language=language, outcome="cached").inc()
+            return cached
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        outcome = "ok"
+        items: List[Dict[str, Any]] = []
+        try:
+            client = await self._server(language, root, self.timeout if wait_for_start else 0.0)
+            if client is None:
+                outcome = "starting" if (language, str(root)) in self._starting else "unavailable"
+                return []
+            lock = self._document_locks.setdefault(uri, asyncio.Lock())
+            await asyncio.wait_for(lock.acquire(), max(0.0, deadline - time.monotonic()))
+            try:
+                closed = await client.sync_document(uri, language, code)
+                result = await client.request(
+                    "textDocument/completion",
+                    {"textDocument": {"uri": uri}, "position": {"line": line, "character": character}},
+                    max(0.0, deadline - time.monotonic()),
+                )
+            finally:
+                lock.release()
+            self._forget_documents(closed)
+            items = self._items(result)
+            self.cache[key] = items
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return items
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            return []
+        except LspError:
+            outcome = "error"
+            return []
+        finally:
+            lsp_completions_total.labels(language=language, outcome=outcome).inc()
+            if outcome != "unavailable":
+                lsp_completion_seconds.labels(language=language).observe(time.perf_counter() - started)
+
+    def _items(self, result: Any) -> List[Dict[str, Any]]:
+        raw = result.get("items", []) if isinstance(result, dict) else result or []
+        raw = sorted(raw, key=lambda item: item.get("sortText") or item.get("label", ""))
+        items = []
+        for item in raw[: self.max_items]:
+            edit = item.get("textEdit") or {}
+            items.append({
+                "label": item.get("label", ""),
+                "kind": item.get("kind"),
+                "detail": item.get("detail"),
+                "insert_text": edit.get("newText") or item.get("insertText") or item.get("label", ""),
+            })
+        return items
+
+    async def aclose(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        starting = list(self._starting.values())
+        for task in starting:
+            task.cancel()
+        await asyncio.gather(*starting, return_exceptions=True)
+        for key in list(self.servers):
+            await self._stop(key)
+        self.started = False
@@ -1,17 +1,130 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
-from starlette.responses import Response
+import time
 
-from app.api.routes import router as api_router
-from app.agents.orchestrator import AgentsOrchestrator
+_import_started = time.perf_counter()  # before the heavy imports, for the startup report
+
+import asyncio
 import importlib
+import logging
 import os
 import sys
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
+from typing import Any, AsyncIterator, Callable, List, Optional
 
-app = FastAPI(title="Cursor DevOps AI", version="0.1.0")
+from fastapi import Depends, FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
+from starlette.responses import Response
+
+from app.agents.orchestrator import AgentsOrchestrator
+from app.api.deps import get_history, get_orchestrator
+from app.api.routes import router as api_router
+from app.api.suggest_ws import ws_router as suggest_ws_router
+from app.context.context_service import ProjectContextService
+from app.context.ingestion import WorkspaceIngestor
+from app.context.workspace_index import WorkspaceIndex
+from app.integrations.k8s.analyzer import shutdown_pool
+from app.lsp.manager import LspManager
+from app.models.scheduler import QueueFullError
+from app.observability.metrics import ws_connections
+from app.observability.middleware import MetricsMiddleware, TimingMiddleware
+from app.observability.profiling import ProfilingMiddleware, debug_router
+from app.observability.startup import startup_report
+from app.storage.history import ChatHistory
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def _warmup(orchestrator: AgentsOrchestrator) -> None:
+    results = await orchestrator.warmup()
+    startup_report.warmup.update(results)
+    steps = (f"{name}={'ok' if r['ok'] else 'failed'} in {r['seconds'] * 1000:.0f}ms" for name, r in results.items())
+    logger.info("warmup done: %s", ", ".join(steps))
+
+
+async def _initial_sync(name: str, sync: Callable[[], Any]) -> None:
+    """Run a blocking startup sync in a thread; the outcome goes to the startup report and the log."""
+    started = time.perf_counter()
+    try:
+        stats = await asyncio.to_thread(sync)
+        result = {"ok": True}
+        logger.info("%s sync done: %s", name, stats)
+    except Exception as exc:
+        result = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        logger.exception("%s sync failed", name)
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    startup_report.warmup[name] = result
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the shared services, start background work, tear it all down on exit.
+
+    Configuration via env:
+      MODEL_WARMUP (default 1): load models (and the RAG index, when WORKSPACE_DIR feeds it) in the background at startup
+      WORKSPACE_DIR: feed the RAG store from a local checkout and add its git state and
+        related definitions to suggestions (all watched for changes)
+      ENABLED_PLUGINS: comma-separated plugin modules, see load_plugins()
+    """
+    with startup_report.phase("services"):
+        history = ChatHistory()
+        orchestrator = AgentsOrchestrator(history)
+        app.state.history = history
+        app.state.orchestrator = orchestrator
+        lsp = LspManager(os.getenv("WORKSPACE_DIR"))
+        app.state.lsp = lsp
+        await lsp.start()
+    with startup_report.phase("history"):
+        await history.start()
+    with startup_report.phase("plugins"):
+        load_plugins(app)
+    ingestor: Optional[WorkspaceIngestor] = None
+    project: Optional[ProjectContextService] = None
+    symbols: Optional[WorkspaceIndex] = None
+    syncs: List[asyncio.Task] = []
+    workspace = os.getenv("WORKSPACE_DIR")
+    if workspace:
+        with startup_report.phase("ingestion"):
+            ingestor = WorkspaceIngestor(workspace, orchestrator.vector_store)
+            ingestor.start_watching()
+            orchestrator.retrieval = orchestrator.vector_store
+            syncs.append(asyncio.create_task(_initial_sync("ingestion", ingestor.sync)))
+        with startup_report.phase("git_context"):
+            project = ProjectContextService(workspace)
+            project.start_watching()
+            orchestrator.project_context = project
+        with startup_report.phase("workspace_index"):
+            # Loads the persisted index; the sync only re-parses files changed since
+            symbols = WorkspaceIndex(workspace)
+            # The ingestor's watcher covers the tree whether or not it is a git checkout
+            ingestor.add_listener(symbols.enqueue)
+            syncs.append(asyncio.create_task(_initial_sync("workspace_index", symbols.sync)))
+            orchestrator.workspace_index = symbols
+    # Serving starts now; model loads finish in the background
+    warmup = asyncio.create_task(_warmup(orchestrator)) if os.getenv("MODEL_WARMUP", "1") == "1" else None
+    startup_report.ready()
+    logger.info(startup_report.summary())
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+        # A sync thread cannot be interrupted; let it finish before its store is closed
+        await asyncio.gather(*syncs, return_exceptions=True)
+        if ingestor is not None:
+            ingestor.stop_watching()
+        if project is not None:
+            project.stop_watching()
+        if symbols is not None:
+            symbols.close()
+        shutdown_pool()
+        await lsp.aclose()
+        await history.aclose()
+        await orchestrator.aclose()
+
+
+app = FastAPI(title="Cursor DevOps AI", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,12 +133,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(TimingMiddleware)
+# Outermost, so CORS preflights and error responses are measured too
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router, prefix="/api")
+app.include_router(suggest_ws_router)
+# Slow-request log, profiler and startup report; 404 unless PROFILE_TOKEN is set
+app.include_router(debug_router, prefix="/debug", include_in_schema=False)
 
 ws_messages_total = Counter("ws_messages_total", "Total websocket messages", ["role"])
 
-orchestrator = AgentsOrchestrator()
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError) -> JSONResponse:
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": "1"})
 
 
 @app.get("/health")
@@ -39,20 +162,39 @@ def metrics() -> Response:
 
 
 @app.websocket("/ws/chat")
-async def chat_ws(websocket: WebSocket) -> None:
+async def chat_ws(
+    websocket: WebSocket,
+    orchestrator: AgentsOrchestrator = Depends(get_orchestrator),
+    history: ChatHistory = Depends(get_history),
+) -> None:
     await websocket.accept()
+    # ?conversation_id=N resumes a conversation; otherwise one is created on the first message
+    raw_id = websocket.query_params.get("conversation_id")
+    conversation_id: Optional[int] = int(raw_id) if raw_id and raw_id.isdigit() else None
+    connections = ws_connections.labels(path="/ws/chat")
+    connections.inc()
     try:
         while True:
             data = await websocket.receive_text()
             ws_messages_total.labels(role="user").inc()
-            reply = await orchestrator.handle_chat_message(data)
+            if conversation_id is None:
+                conversation_id = await history.create_conversation(data)
+            # Frames: {"type": "delta", "content": ...}* or {"type": "error", ...}, then {"type": "end"}
+            try:
+                async with aclosing(orchestrator.stream_chat_message(data, conversation_id)) as chunks:
+                    async for chunk in chunks:
+                        await websocket.send_json({"type": "delta", "content": chunk})
+            except QueueFullError as exc:
+                await websocket.send_json({"type": "error", "status": 429, "message": str(exc)})
             ws_messages_total.labels(role="assistant").inc()
-            await websocket.send_text(reply)
+            await websocket.send_json({"type": "end"})
     except WebSocketDisconnect:
         return
+    finally:
+        connections.dec()
 
 
-def load_plugins() -> None:
+def load_plugins(app: FastAPI) -> None:
     enabled = os.getenv("ENABLED_PLUGINS", "").split(",")
     # Ensure project root and plugins dir are importable
     app_dir = Path(__file__).resolve().parents[2]  # .../cursor-ai-devops
@@ -70,6 +212,7 @@ def load_plugins() -> None:
             continue
 
 
-load_plugins()
+startup_report.record("import", time.perf_counter() - _import_started)
+startup_report.begin(_import_started)
 
 
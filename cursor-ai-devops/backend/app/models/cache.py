@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize line endings and trailing whitespace; indentation is kept."""
+    lines = prompt.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def cache_key(provider: str, model: str, temperature: float, prompt: str) -> str:
+    digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{temperature:g}:{digest}"
+
+
+class ResponseCache:
+    """Two-tier LLM response cache: in-memory LRU plus optional SQLite.
+
+    Configuration via env:
+      LLM_CACHE_ENABLED (default 1)
+      LLM_CACHE_MAX_ENTRIES (in-memory, default 512)
+      LLM_CACHE_TTL (seconds, default 3600; 0 disables expiry)
+      LLM_CACHE_SQLITE (default 0) and LLM_CACHE_SQLITE_MAX_ENTRIES (default 10000)
+    """
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+        self.max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+        self.ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+        self.sqlite_enabled = os.getenv("LLM_CACHE_SQLITE", "0") == "1"
+        self.sqlite_max_entries = int(os.getenv("LLM_CACHE_SQLITE_MAX_ENTRIES", "10000"))
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._sqlite_ready = False
+        self.hits = 0
+        self.misses = 0
+        self.sqlite_hits = 0
+
+    def _expiry(self) -> float:
+        return time.time() + self.ttl if self.ttl > 0 else float("inf")
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        value = self._memory_get(key)
+        if value is None and self.sqlite_enabled:
+            row = await asyncio.to_thread(self._sqlite_get, key)
+            if row is not None:
+                value, expires_at = row
+                self._memory_put(key, value, expires_at)
+                self.sqlite_hits += 1
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        if not self.enabled:
+            return
+        expires_at = self._expiry()
+        self._memory_put(key, value, expires_at)
+        if self.sqlite_enabled:
+            await asyncio.to_thread(self._sqlite_put, key, value, expires_at)
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sqlite_hits": self.sqlite_hits,
+            "entries": len(self._memory),
+        }
+
+    # SQLite tier (runs in a worker thread; reuses app.storage.db)
+
+    def _sqlite_init(self) -> None:
+        if not self._sqlite_ready:
+            from app.storage.db import init_db
+
+            init_db()
+            self._sqlite_ready = True
+
+    def _sqlite_get(self, key: str) -> Optional[Tuple[str, float]]:
+        from app.storage.db import CachedResponse, get_session
+
+        self._sqlite_init()
+        now = time.time()
+        with get_session() as session:
+            row = session.get(CachedResponse, key)
+            if row is None:
+                return None
+            if row.expires_at < now:
+                session.delete(row)
+                session.commit()
+                return None
+            row.accessed_at = now
+            session.add(row)
+            session.commit()
+            return row.value, row.expires_at
+
+    def _sqlite_put(self, key: str, value: str, expires_at: float) -> None:
+        from sqlmodel import delete, func, select
+
+        from app.storage.db import CachedResponse, get_session
+
+        self._sqlite_init()
+        now = time.time()
+        with get_session() as session:
+            session.merge(CachedResponse(key=key, value=value, expires_at=expires_at, accessed_at=now))
+            session.exec(delete(CachedResponse).where(CachedResponse.expires_at < now))
+            count = session.exec(select(func.count()).select_from(CachedResponse)).one()
+            overflow = count - self.sqlite_max_entries
+            if overflow > 0:
+                oldest = select(CachedResponse.key).order_by(CachedResponse.accessed_at).limit(overflow)
+                session.exec(delete(CachedResponse).where(CachedResponse.key.in_(oldest)))
+            session.commit()
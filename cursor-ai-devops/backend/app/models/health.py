@@ -0,0 +1,85 @@
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+class ProviderHealth:
+    """Rolling latency/error window and circuit breaker for one provider.
+
+    Configuration via env:
+      MODEL_HEALTH_WINDOW (samples kept, default 50)
+      MODEL_BREAKER_FAILURES (consecutive failures to open, default 3)
+      MODEL_BREAKER_COOLDOWN (seconds before a half-open trial, default 30)
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.window: Deque[Tuple[Optional[float], bool]] = deque(maxlen=int(os.getenv("MODEL_HEALTH_WINDOW", "50")))
+        self.failure_threshold = int(os.getenv("MODEL_BREAKER_FAILURES", "3"))
+        self.cooldown = float(os.getenv("MODEL_BREAKER_COOLDOWN", "30"))
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent; half-open lets one trial through."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self._trial_in_flight)
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        self.window.append((latency, ok))
+        self._trial_in_flight = False
+        if ok:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            return
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Forget a half-open trial that ended without a verdict (e.g. cancelled)."""
+        self._trial_in_flight = False
+
+    def latency_quantile(self, q: float, min_samples: int = 5) -> Optional[float]:
+        samples = sorted(latency for latency, ok in self.window if ok and latency is not None)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for _, ok in self.window if not ok) / len(self.window)
+
+    def score(self) -> float:
+        """Lower is better: p50 latency inflated by the recent error rate."""
+        p50 = self.latency_quantile(0.5, min_samples=1)
+        return (p50 if p50 is not None else 0.0) * (1.0 + 4.0 * self.error_rate())
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "p50": self.latency_quantile(0.5, min_samples=1),
+            "p95": self.latency_quantile(0.95, min_samples=1),
+            "error_rate": round(self.error_rate(), 3),
+            "samples": len(self.window),
+        }
@@ -0,0 +1,68 @@
+import hashlib
+from typing import Any, Dict, List, NamedTuple, Tuple, Union
+
+
+def format_turn(role: str, content: str) -> str:
+    return f"{'User' if role == 'user' else 'Assistant'}: {content}"
+
+
+class Prompt(NamedTuple):
+    """A chat prompt laid out for provider-side prefix caching.
+
+    Providers reuse work for the longest prefix they have seen before, so
+    the parts go from most to least stable: ``system`` is fixed per kind of
+    request, ``context`` changes rarely (repo summary, conversation
+    summary) and ``messages`` holds the ``(role, content)`` turns, ending
+    with the new user message. Nothing request-specific belongs in the
+    first two.
+    """
+
+    system: str
+    context: str = ""
+    messages: Tuple[Tuple[str, str], ...] = ()
+
+    def text(self) -> str:
+        """Single-string rendering, for cache keys and token estimates."""
+        parts = [part for part in (self.system, self.context) if part]
+        parts.extend(format_turn(role, content) for role, content in self.messages)
+        return "\n".join(parts) + "\nAssistant:"
+
+    def prefix_key(self) -> str:
+        """Short stable id of the cacheable prefix."""
+        return hashlib.sha256(f"{self.system}\0{self.context}".encode("utf-8")).hexdigest()[:16]
+
+    def chat_messages(self) -> List[Dict[str, str]]:
+        """OpenAI/Ollama ``messages``: one system message with the prefix, then the turns."""
+        instructions = "\n\n".join(part for part in (self.system, self.context) if part)
+        head = [{"role": "system", "content": instructions}] if instructions else []
+        return head + [{"role": role, "content": content} for role, content in self.messages]
+
+    def anthropic_request(self) -> Dict[str, Any]:
+        """Anthropic ``system`` and ``messages`` with ``cache_control`` breakpoints.
+
+        Breakpoints go after the system text, after the context and on the
+        last earlier turn, so a follow-up in the same conversation reads all
+        of that from the cache. Consecutive turns of one role are merged and
+        leading assistant turns dropped, as the API requires.
+        """
+        cached = {"type": "ephemeral"}
+        system = [{"type": "text", "text": part, "cache_control": cached} for part in (self.system, self.context) if part]
+        turns: List[List[str]] = []
+        for role, content in self.messages:
+            if not turns and role != "user":
+                continue
+            if turns and turns[-1][0] == role:
+                turns[-1][1] += "\n\n" + content
+            else:
+                turns.append([role, content])
+        messages: List[Dict[str, Any]] = [
+            {"role": role, "content": [{"type": "text", "text": content}]} for role, content in turns
+        ]
+        if len(messages) > 1:
+            messages[-2]["content"][0]["cache_control"] = cached
+        return {"system": system, "messages": messages} if system else {"messages": messages}
+
+
+def as_prompt(prompt: Union[str, Prompt]) -> Prompt:
+    """A bare string is sent as a single user message."""
+    return prompt if isinstance(prompt, Prompt) else Prompt("", "", (("user", prompt),))
@@ -1,65 +1,481 @@
+import asyncio
+import importlib.util
+import json
 import os
-from typing import Optional
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 import httpx
 
+from app.models.cache import ResponseCache, cache_key
+from app.models.health import ProviderHealth
+from app.models.prompt import Prompt, as_prompt
+from app.models.scheduler import Priority, ProviderScheduler, QueueFullError
+from app.models.singleflight import SingleFlight
+from app.observability.metrics import llm_errors_total, llm_latency_seconds, llm_tokens_total, llm_ttft_seconds
+from app.observability.timing import record
+
+NOT_CONFIGURED = "Model provider not configured. Set PROVIDER env to openai|anthropic|ollama."
+SUPPORTED_PROVIDERS = ("openai", "anthropic", "ollama")
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when every provider in the chain is short-circuited."""
+
 
 class ModelRouter:
     """Minimal async model router with pluggable providers.
 
     Configuration via env:
       PROVIDER: openai|anthropic|ollama|none
+      PROVIDERS: ordered fallback chain, e.g. "ollama,openai" (overrides PROVIDER)
+      MODEL_ROUTING: ordered|latency (default ordered; latency sorts by rolling health score)
+      MODEL_TIMEOUT_<PROVIDER>: per-provider timeout (time-to-first-token for streams)
+      MODEL_HEDGE (default 0): race the next provider once the first exceeds its p95
       OPENAI_API_KEY, ANTHROPIC_API_KEY
       OLLAMA_HOST (default http://localhost:11434)
+      OLLAMA_KEEP_ALIVE: how long Ollama keeps the model loaded, e.g. "30m" or "-1" (default: server's)
+      MODEL_PROMPT_CACHE (default 1): Anthropic cache_control breakpoints and OpenAI prompt_cache_key
+      MODEL_TEMPERATURE (default 0.2)
+      MODEL_TIMEOUT (seconds, default 60)
+      MODEL_POOL_MAX_CONNECTIONS (default 20), MODEL_POOL_MAX_KEEPALIVE (default 10)
+      MODEL_POOL_KEEPALIVE_EXPIRY (seconds, default 30)
+      MODEL_HTTP2 (default 1; used when the h2 package is installed)
+
+    Provider clients are created lazily on first use and reused for the
+    lifetime of the router; call ``aclose()`` on shutdown to release the pools.
+    ``complete()`` results are cached, see ``app.models.cache.ResponseCache``,
+    and concurrent identical prompts share one in-flight provider call.
+    Provider calls go through ``ProviderScheduler`` (concurrency caps, priorities)
+    and are tracked by a per-provider ``ProviderHealth`` (latency window, breaker).
+
+    Prompts are a bare string or a ``Prompt`` (stable system/context prefix
+    plus chat turns), sent with real message roles so providers can reuse
+    the prefix: Anthropic via cache breakpoints, OpenAI via its automatic
+    prefix cache, Ollama via the KV cache of the kept-alive model on
+    ``/api/chat``. Cached prompt tokens are counted in ``llm_tokens_total``.
     """
 
     def __init__(self) -> None:
         self.provider = os.getenv("PROVIDER", "none").lower()
+        chain = os.getenv("PROVIDERS", self.provider).lower().split(",")
+        self.providers = [p.strip() for p in chain if p.strip() in SUPPORTED_PROVIDERS]
+        if self.providers:
+            self.provider = self.providers[0]
+        self.routing = os.getenv("MODEL_ROUTING", "ordered").lower()
+        self.hedge = os.getenv("MODEL_HEDGE", "0") == "1"
+        self.health: Dict[str, ProviderHealth] = {p: ProviderHealth(p) for p in self.providers}
         self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.anthropic_model = os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
         self.ollama_model = os.getenv("OLLAMA_MODEL", "llama3:8b")
         self.ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        self.ollama_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE") or None
+        self.prompt_cache = os.getenv("MODEL_PROMPT_CACHE", "1") == "1"
+        self.temperature = float(os.getenv("MODEL_TEMPERATURE", "0.2"))
+        self.timeout = float(os.getenv("MODEL_TIMEOUT", "60"))
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("MODEL_POOL_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("MODEL_POOL_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("MODEL_POOL_KEEPALIVE_EXPIRY", "30")),
+        )
+        self.http2 = os.getenv("MODEL_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+        self._ollama_client: Optional[httpx.AsyncClient] = None
+        self._openai_client: Any = None
+        self._anthropic_client: Any = None
+        self.cache = ResponseCache()
+        self.flights = SingleFlight()
+        self.scheduler = ProviderScheduler()
+
+    def _http_client(self, base_url: str = "", http2: bool = False) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+        )
+
+    def _get_ollama(self) -> httpx.AsyncClient:
+        if self._ollama_client is None:
+            # Ollama speaks plain HTTP/1.1; keep-alive pooling is what matters here
+            self._ollama_client = self._http_client(self.ollama_host)
+        return self._ollama_client
+
+    def _get_openai(self) -> Any:
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+
+            self._openai_client = AsyncOpenAI(http_client=self._http_client(http2=self.http2))
+        return self._openai_client
+
+    def _get_anthropic(self) -> Any:
+        if self._anthropic_client is None:
+            from anthropic import AsyncAnthropic
+
+            self._anthropic_client = AsyncAnthropic(http_client=self._http_client(http2=self.http2))
+        return self._anthropic_client
+
+    async def aclose(self) -> None:
+        """Close pooled provider clients. Safe to call more than once."""
+        clients = (self._ollama_client, self._openai_client, self._anthropic_client)
+        self._ollama_client = self._openai_client = self._anthropic_client = None
+        for client in clients:
+            if client is None:
+                continue
+            close = getattr(client, "aclose", None) or getattr(client, "close", None)
+            if close is not None:
+                await close()
+
+    async def warmup(self) -> Dict[str, Dict[str, Any]]:
+        """Get every configured provider ready before the first request.
+
+        Ollama is asked to load the model (a generate call without a prompt);
+        the OpenAI/Anthropic SDKs are imported off the event loop and their
+        clients created. Failures are reported, never raised.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        for provider in self.providers:
+            started = time.perf_counter()
+            try:
+                if provider == "ollama":
+                    body = {"model": self.ollama_model, **self._ollama_extra()}
+                    resp = await self._get_ollama().post("/api/generate", json=body)
+                    resp.raise_for_status()
+                else:
+                    await asyncio.to_thread(importlib.import_module, provider)
+                    get_client = self._get_openai if provider == "openai" else self._get_anthropic
+                    get_client()
+                results[provider] = {"ok": True}
+            except Exception as exc:
+                results[provider] = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            results[provider]["seconds"] = round(time.perf_counter() - started, 4)
+        return results
+
+    def model_name(self, provider: Optional[str] = None) -> str:
+        provider = provider or self.provider
+        return {
+            "openai": self.openai_model,
+            "anthropic": self.anthropic_model,
+            "ollama": self.ollama_model,
+        }.get(provider, "")
+
+    def _candidates(self) -> List[str]:
+        """Providers to try, in order, skipping those with an open circuit."""
+        available = [p for p in self.providers if self.health[p].available()]
+        if self.routing == "latency":
+            available.sort(key=lambda p: self.health[p].score())
+        return available
+
+    def timeout_for(self, provider: str) -> float:
+        return float(os.getenv(f"MODEL_TIMEOUT_{provider.upper()}", str(self.timeout)))
+
+    def _chain_key(self, prompt: Union[str, Prompt]) -> str:
+        models = ",".join(self.model_name(p) for p in self.providers)
+        text = prompt if isinstance(prompt, str) else prompt.text()
+        return cache_key(",".join(self.providers), models, self.temperature, text)
+
+    async def complete(self, prompt: Union[str, Prompt], priority: Priority = Priority.SUGGEST) -> str:
+        if not self.providers:
+            return NOT_CONFIGURED
+        key = self._chain_key(prompt)
+        prompt = as_prompt(prompt)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await self.flights.do(key, lambda: self._complete_and_store(key, prompt, priority))
+
+    async def _complete_and_store(self, key: str, prompt: Prompt, priority: Priority) -> str:
+        result = await self._route_complete(prompt, priority)
+        await self.cache.set(key, result)
+        return result
+
+    async def _route_complete(self, prompt: Prompt, priority: Priority) -> str:
+        pending = self._candidates()
+        if not pending:
+            raise ProviderUnavailableError("All model providers have open circuits")
+        last_error: Optional[BaseException] = None
+        while pending:
+            primary = pending.pop(0)
+            try:
+                return await self._hedged(primary, pending, prompt, priority)
+            except Exception as exc:
+                last_error = exc
+        assert last_error is not None
+        raise last_error
+
+    async def _hedged(self, primary: str, pending: List[str], prompt: Prompt, priority: Priority) -> str:
+        """Call ``primary``; if it is slower than its p95, race the next provider.
 
-    async def complete(self, prompt: str) -> str:
-        if self.provider == "openai":
+        A hedge provider that gets launched is removed from ``pending``.
+        """
+        tasks = [asyncio.create_task(self._call(primary, prompt, priority))]
+        try:
+            delay = self.health[primary].latency_quantile(0.95) if self.hedge and pending else None
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    tasks.append(asyncio.create_task(self._call(pending.pop(0), prompt, priority)))
+            errors: List[BaseException] = []
+            remaining = set(tasks)
+            while remaining:
+                done, remaining = await asyncio.wait(remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+            # Prefer reporting backpressure over a generic provider error
+            raise next((e for e in errors if not isinstance(e, QueueFullError)), errors[0])
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _call(self, provider: str, prompt: Prompt, priority: Priority) -> str:
+        health = self.health[provider]
+        async with self.scheduler.slot(provider, priority):
+            if not health.allow():
+                raise ProviderUnavailableError(f"Circuit open for {provider}")
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._complete_uncached(provider, prompt), self.timeout_for(provider))
+            except asyncio.CancelledError:
+                health.release_trial()
+                raise
+            except Exception as exc:
+                health.record(False)
+                self._record_error(provider, exc)
+                raise
+            elapsed = time.perf_counter() - started
+            health.record(True, elapsed)
+            record("provider", elapsed)
+            llm_latency_seconds.labels(provider=provider, model=self.model_name(provider), mode="complete").observe(
+                elapsed
+            )
+            return result
+
+    def _record_error(self, provider: str, exc: BaseException) -> None:
+        llm_errors_total.labels(provider=provider, model=self.model_name(provider), error=type(exc).__name__).inc()
+
+    def _record_usage(
+        self,
+        provider: str,
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int],
+        cached_tokens: Optional[int] = None,
+        cache_write_tokens: Optional[int] = None,
+    ) -> None:
+        """Count provider-reported token usage (skipped when the provider omits it).
+
+        ``cached_tokens`` are prompt tokens read from the provider's prefix
+        cache, ``cache_write_tokens`` those written to it (Anthropic only).
+        """
+        model = self.model_name(provider)
+        for kind, count in (
+            ("prompt", prompt_tokens),
+            ("completion", completion_tokens),
+            ("cached", cached_tokens),
+            ("cache_write", cache_write_tokens),
+        ):
+            if count:
+                llm_tokens_total.labels(provider=provider, model=model, kind=kind).inc(count)
+
+    def _record_openai_usage(self, usage: Any) -> None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        self._record_usage("openai", usage.prompt_tokens, usage.completion_tokens, cached)
+
+    def _record_anthropic_usage(self, usage: Any) -> None:
+        self._record_usage(
+            "anthropic",
+            usage.input_tokens,
+            usage.output_tokens,
+            getattr(usage, "cache_read_input_tokens", None),
+            getattr(usage, "cache_creation_input_tokens", None),
+        )
+
+    async def _complete_uncached(self, provider: str, prompt: Prompt) -> str:
+        if provider == "openai":
             return await self._openai(prompt)
-        if self.provider == "anthropic":
+        if provider == "anthropic":
             return await self._anthropic(prompt)
-        if self.provider == "ollama":
-            return await self._ollama(prompt)
-        return "Model provider not configured. Set PROVIDER env to openai|anthropic|ollama."
+        return await self._ollama(prompt)
+
+    async def stream(self, prompt: Union[str, Prompt], priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[str]:
+        """Yield completion text chunks as the provider produces them."""
+        if not self.providers:
+            yield NOT_CONFIGURED
+            return
+        key = self._chain_key(prompt)
+        prompt = as_prompt(prompt)
+        async with aclosing(self.flights.stream(key, lambda: self._route_stream(prompt, priority))) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def _route_stream(self, prompt: Prompt, priority: Priority) -> AsyncIterator[str]:
+        """Fall back along the chain until a provider yields its first chunk.
+
+        The per-provider timeout bounds time-to-first-token; once output has
+        started the stream is committed to that provider. Streams are not hedged.
+        """
+        candidates = self._candidates()
+        if not candidates:
+            raise ProviderUnavailableError("All model providers have open circuits")
+        last_error: Optional[BaseException] = None
+        for provider in candidates:
+            health = self.health[provider]
+            try:
+                await self.scheduler.acquire(provider, priority)
+            except QueueFullError as exc:
+                last_error = exc  # saturated: try the next provider, as complete() does
+                continue
+            chunks = self._stream_uncached(provider, prompt)
+            # The slot is held for the whole stream, not just until the first token
+            try:
+                async with aclosing(chunks):
+                    if not health.allow():
+                        last_error = ProviderUnavailableError(f"Circuit open for {provider}")
+                        continue
+                    model = self.model_name(provider)
+                    started = time.perf_counter()
+                    try:
+                        first = await asyncio.wait_for(chunks.__anext__(), self.timeout_for(provider))
+                    except StopAsyncIteration:
+                        health.record(True, time.perf_counter() - started)
+                        return
+                    except asyncio.CancelledError:
+                        health.release_trial()
+                        raise
+                    except Exception as exc:
+                        health.record(False)
+                        self._record_error(provider, exc)
+                        last_error = exc
+                        continue
+                    ttft = time.perf_counter() - started
+                    llm_ttft_seconds.labels(provider=provider, model=model).observe(ttft)
+                    record("ttft", ttft)
+                    yield first
+                    try:
+                        async for chunk in chunks:
+                            yield chunk
+                    except Exception as exc:
+                        health.record(False)
+                        self._record_error(provider, exc)
+                        raise
+                    health.record(True)
+                    llm_latency_seconds.labels(provider=provider, model=model, mode="stream").observe(
+                        time.perf_counter() - started
+                    )
+                    return
+            finally:
+                self.scheduler.release(provider)
+        assert last_error is not None
+        raise last_error
+
+    async def _stream_uncached(self, provider: str, prompt: Prompt) -> AsyncIterator[str]:
+        if provider == "openai":
+            chunks = self._openai_stream(prompt)
+        elif provider == "anthropic":
+            chunks = self._anthropic_stream(prompt)
+        else:
+            chunks = self._ollama_stream(prompt)
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if chunk:
+                    yield chunk
 
-    async def _openai(self, prompt: str) -> str:
-        from openai import AsyncOpenAI
+    def _openai_extra(self, prompt: Prompt) -> Dict[str, Any]:
+        # Routes requests sharing a prefix to the same cache; extra_body works with any SDK version
+        if not self.prompt_cache or not (prompt.system or prompt.context):
+            return {}
+        return {"extra_body": {"prompt_cache_key": prompt.prefix_key()}}
 
-        client = AsyncOpenAI()
-        resp = await client.chat.completions.create(
+    def _anthropic_request(self, prompt: Prompt) -> Dict[str, Any]:
+        request = prompt.anthropic_request()
+        if not self.prompt_cache:
+            for block in request.get("system", []):
+                block.pop("cache_control", None)
+            for message in request["messages"]:
+                message["content"][0].pop("cache_control", None)
+        return request
+
+    async def _openai(self, prompt: Prompt) -> str:
+        resp = await self._get_openai().chat.completions.create(
             model=self.openai_model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
+            messages=prompt.chat_messages(),
+            temperature=self.temperature,
+            **self._openai_extra(prompt),
         )
+        if resp.usage is not None:
+            self._record_openai_usage(resp.usage)
         return resp.choices[0].message.content or ""
 
-    async def _anthropic(self, prompt: str) -> str:
-        from anthropic import AsyncAnthropic
-
-        client = AsyncAnthropic()
-        msg = await client.messages.create(
+    async def _anthropic(self, prompt: Prompt) -> str:
+        msg = await self._get_anthropic().messages.create(
             model=self.anthropic_model,
             max_tokens=512,
-            temperature=0.2,
-            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            **self._anthropic_request(prompt),
         )
+        usage = getattr(msg, "usage", None)
+        if usage is not None:
+            self._record_anthropic_usage(usage)
         return "".join(block.text for block in msg.content) if hasattr(msg, "content") else ""
 
-    async def _ollama(self, prompt: str) -> str:
-        async with httpx.AsyncClient(timeout=60) as client:
-            resp = await client.post(
-                f"{self.ollama_host}/api/generate",
-                json={"model": self.ollama_model, "prompt": prompt, "stream": False},
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("response", "")
+    def _ollama_extra(self) -> Dict[str, Any]:
+        return {"keep_alive": self.ollama_keep_alive} if self.ollama_keep_alive else {}
+
+    def _ollama_body(self, prompt: Prompt, stream: bool) -> Dict[str, Any]:
+        # Same model, options and leading messages as the last call lets Ollama
+        # reuse the loaded model's KV cache and only evaluate the new turns
+        return {
+            "model": self.ollama_model,
+            "messages": prompt.chat_messages(),
+            "stream": stream,
+            "options": {"temperature": self.temperature},
+            **self._ollama_extra(),
+        }
+
+    async def _ollama(self, prompt: Prompt) -> str:
+        resp = await self._get_ollama().post("/api/chat", json=self._ollama_body(prompt, stream=False))
+        resp.raise_for_status()
+        data = resp.json()
+        self._record_usage("ollama", data.get("prompt_eval_count"), data.get("eval_count"))
+        return (data.get("message") or {}).get("content", "")
 
+    async def _openai_stream(self, prompt: Prompt) -> AsyncIterator[str]:
+        stream = await self._get_openai().chat.completions.create(
+            model=self.openai_model,
+            messages=prompt.chat_messages(),
+            temperature=self.temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self._openai_extra(prompt),
+        )
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+            # With include_usage the final chunk has no choices, only usage
+            if getattr(chunk, "usage", None) is not None:
+                self._record_openai_usage(chunk.usage)
+
+    async def _anthropic_stream(self, prompt: Prompt) -> AsyncIterator[str]:
+        async with self._get_anthropic().messages.stream(
+            model=self.anthropic_model,
+            max_tokens=512,
+            temperature=self.temperature,
+            **self._anthropic_request(prompt),
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+            self._record_anthropic_usage((await stream.get_final_message()).usage)
 
+    async def _ollama_stream(self, prompt: Prompt) -> AsyncIterator[str]:
+        async with self._get_ollama().stream("POST", "/api/chat", json=self._ollama_body(prompt, stream=True)) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                yield (data.get("message") or {}).get("content", "")
+                if data.get("done"):
+                    self._record_usage("ollama", data.get("prompt_eval_count"), data.get("eval_count"))
+                    break
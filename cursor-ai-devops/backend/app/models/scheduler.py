@@ -0,0 +1,115 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, List, Tuple
+
+from app.observability.metrics import llm_queue_depth, llm_queue_rejected_total, llm_queue_wait_seconds
+from app.observability.timing import record
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+
+    INTERACTIVE = 0  # /ws/chat
+    SUGGEST = 1  # /api/suggest
+    BACKGROUND = 2  # runbook drafting and other batch work
+
+
+class QueueFullError(Exception):
+    """Raised when a provider's wait queue is at capacity."""
+
+    def __init__(self, provider: str) -> None:
+        super().__init__(f"Provider {provider} is saturated; retry shortly")
+        self.provider = provider
+
+
+class _ProviderQueue:
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.active = 0
+        self.waiters: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+
+
+class ProviderScheduler:
+    """Per-provider concurrency caps with a priority wait queue.
+
+    Configuration via env:
+      MODEL_CONCURRENCY_OLLAMA (default 2), MODEL_CONCURRENCY_OPENAI (default 8),
+      MODEL_CONCURRENCY_ANTHROPIC (default 8), MODEL_CONCURRENCY_DEFAULT (default 4)
+      MODEL_QUEUE_DEPTH (max waiters per provider, default 32)
+    """
+
+    DEFAULT_LIMITS = {"ollama": 2, "openai": 8, "anthropic": 8}
+
+    def __init__(self) -> None:
+        self.max_queue_depth = int(os.getenv("MODEL_QUEUE_DEPTH", "32"))
+        self._queues: Dict[str, _ProviderQueue] = {}
+        self._seq = itertools.count()
+
+    def limit_for(self, provider: str) -> int:
+        default = self.DEFAULT_LIMITS.get(provider, int(os.getenv("MODEL_CONCURRENCY_DEFAULT", "4")))
+        return max(1, int(os.getenv(f"MODEL_CONCURRENCY_{provider.upper()}", str(default))))
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        queue = self._queues.get(provider)
+        if queue is None:
+            queue = self._queues[provider] = _ProviderQueue(self.limit_for(provider))
+        return queue
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"active": q.active, "waiting": len(q.waiters), "limit": q.limit}
+            for name, q in self._queues.items()
+        }
+
+    async def acquire(self, provider: str, priority: Priority = Priority.SUGGEST) -> None:
+        queue = self._queue(provider)
+        started = time.perf_counter()
+        if queue.active < queue.limit and not queue.waiters:
+            queue.active += 1
+        else:
+            if len(queue.waiters) >= self.max_queue_depth:
+                llm_queue_rejected_total.labels(provider=provider).inc()
+                raise QueueFullError(provider)
+            future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+            entry = (int(priority), next(self._seq), future)
+            heapq.heappush(queue.waiters, entry)
+            llm_queue_depth.labels(provider=provider).set(len(queue.waiters))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Slot was handed over just as we were cancelled; pass it on
+                    self.release(provider)
+                elif entry in queue.waiters:
+                    # release() may already have popped and skipped the cancelled entry
+                    queue.waiters.remove(entry)
+                    heapq.heapify(queue.waiters)
+                    llm_queue_depth.labels(provider=provider).set(len(queue.waiters))
+                raise
+        waited = time.perf_counter() - started
+        llm_queue_wait_seconds.labels(provider=provider, priority=priority.name.lower()).observe(waited)
+        record("queue", waited)
+
+    def release(self, provider: str) -> None:
+        queue = self._queue(provider)
+        queue.active -= 1
+        while queue.waiters and queue.active < queue.limit:
+            _, _, future = heapq.heappop(queue.waiters)
+            if future.done():
+                continue
+            queue.active += 1
+            future.set_result(None)
+        llm_queue_depth.labels(provider=provider).set(len(queue.waiters))
+
+    @asynccontextmanager
+    async def slot(self, provider: str, priority: Priority = Priority.SUGGEST) -> AsyncIterator[None]:
+        await self.acquire(provider, priority)
+        try:
+            yield
+        finally:
+            self.release(provider)
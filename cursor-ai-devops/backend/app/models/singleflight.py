@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class _SharedStream:
+    """Fan one provider stream out to several subscribers.
+
+    Chunks are buffered so late subscribers replay from the start. The
+    provider stream is cancelled once every subscriber has gone away.
+    """
+
+    def __init__(self, source: AsyncIterator[str]) -> None:
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.abandoned = False
+        self._changed = asyncio.Condition()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                async with self._changed:
+                    self.chunks.append(chunk)
+                    self._changed.notify_all()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.done = True
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: index < len(self.chunks) or self.done)
+                    pending = self.chunks[index:]
+                    done = self.done
+                index += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.task.done():
+                self.abandoned = True
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls onto one in-flight provider call."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, "asyncio.Future[str]"] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self.coalesced = 0
+
+    @staticmethod
+    def _forget(table: Dict, key: str, entry: object) -> None:
+        if table.get(key) is entry:
+            del table[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(self._calls, key, f))
+        else:
+            self.coalesced += 1
+        # Shield so one cancelled waiter does not abort the call for the others
+        return await asyncio.shield(future)
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        shared = self._streams.get(key)
+        if shared is None or shared.abandoned:
+            shared = _SharedStream(fn())
+            self._streams[key] = shared
+            entry = shared
+            shared.task.add_done_callback(lambda _: self._forget(self._streams, key, entry))
+        else:
+            self.coalesced += 1
+        async with aclosing(shared.subscribe()) as chunks:
+            async for chunk in chunks:
+                yield chunk
@@ -1,7 +1,48 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
+# Paths are route templates (e.g. /api/conversations/{conversation_id}/messages) to keep cardinality bounded
 http_requests_total = Counter("http_requests_total", "Total HTTP requests", ["method", "path", "status"])
-llm_tokens_total = Counter("llm_tokens_total", "Total LLM tokens used", ["provider"])
-llm_latency_seconds = Histogram("llm_latency_seconds", "LLM call latency", ["provider"])
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent", ["method", "path"]
+)
+http_requests_in_progress = Gauge("http_requests_in_progress", "HTTP requests being served", ["method"])
+ws_connections = Gauge("ws_connections", "Open WebSocket connections", ["path"])
 
+# kind: prompt|completion, plus cached (prompt tokens read from the provider's prefix cache) and cache_write
+llm_tokens_total = Counter("llm_tokens_total", "Total LLM tokens used", ["provider", "model", "kind"])
+llm_latency_seconds = Histogram(
+    "llm_latency_seconds",
+    "LLM call latency (full completion or full stream)",
+    ["provider", "model", "mode"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 120),
+)
+llm_ttft_seconds = Histogram(
+    "llm_ttft_seconds",
+    "Time to first streamed token",
+    ["provider", "model"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32),
+)
+llm_errors_total = Counter("llm_errors_total", "Failed LLM calls", ["provider", "model", "error"])
+llm_queue_wait_seconds = Histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a provider slot", ["provider", "priority"]
+)
+llm_queue_depth = Gauge("llm_queue_depth", "Requests waiting for a provider slot", ["provider"])
+llm_queue_rejected_total = Counter("llm_queue_rejected_total", "Requests rejected on a full queue", ["provider"])
 
+lsp_servers = Gauge("lsp_servers", "Running language server processes", ["language"])
+lsp_completions_total = Counter(
+    "lsp_completions_total", "LSP completion requests by outcome (cached|ok|timeout|error|starting|unavailable)",
+    ["language", "outcome"],
+)
+lsp_completion_seconds = Histogram(
+    "lsp_completion_seconds",
+    "LSP completion latency, including document sync and server start",
+    ["language"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+
+suggest_requests_total = Counter(
+    "suggest_requests_total",
+    "Suggestion channel requests by outcome (completed|superseded|cancelled|disconnected|error)",
+    ["outcome"],
+)
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi.routing import APIRoute
+
+from app.observability.metrics import http_request_duration_seconds, http_requests_in_progress, http_requests_total
+from app.observability.timing import RequestTimings, request_timings, slow_requests
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path template; unmatched paths share one label."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts and latency per route.
+
+    Unlike ``BaseHTTPMiddleware`` it does not buffer or re-wrap the response,
+    so streaming responses are unaffected and the overhead is a few
+    microseconds per request. Latency covers the whole response body.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method=method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            # The router stores the matched route in the (shared) scope dict
+            path = route_template(scope)
+            http_request_duration_seconds.labels(method=method, path=path).observe(time.perf_counter() - started)
+            http_requests_total.labels(method=method, path=path, status=str(status)).inc()
+
+
+class TimingMiddleware:
+    """Collect stage spans per HTTP request and expose them as ``Server-Timing``.
+
+    The header is written when the response starts, so for streaming
+    responses it only covers the work done before the first byte; the slow
+    request log always sees the full duration.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timings.handler_done is not None:
+                    timings.add("serialize", now - timings.handler_done)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(now - timings.started).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_timings.reset(token)
+            total = time.perf_counter() - timings.started
+            slow_requests.observe(scope["method"], route_template(scope), status, total, timings)
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records the endpoint body as the ``handler`` span.
+
+    Whatever happens between the endpoint returning and the response
+    starting (validation, JSON encoding) is then reported as ``serialize``.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        # include_router() re-creates routes from the already wrapped endpoint
+        if getattr(endpoint, "_timed", False) or not asyncio.iscoroutinefunction(endpoint):
+            super().__init__(path, endpoint, **kwargs)
+            return
+
+        @wraps(endpoint)
+        async def timed(*args: Any, **kw: Any) -> Any:
+            timings = request_timings.get()
+            started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                if timings is not None:
+                    timings.handler_done = time.perf_counter()
+                    timings.add("handler", timings.handler_done - started)
+
+        timed._timed = True  # type: ignore[attr-defined]
+        super().__init__(path, timed, **kwargs)
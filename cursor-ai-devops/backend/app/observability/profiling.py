@@ -0,0 +1,198 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.observability.middleware import ASGIApp, Message, Receive, Scope, Send
+from app.observability.startup import startup_report
+from app.observability.timing import slow_requests
+
+PROFILE_MAX_SECONDS = 60.0
+
+
+def profile_token() -> Optional[str]:
+    """PROFILE_TOKEN enables profiling; unset keeps every debug surface off."""
+    return os.getenv("PROFILE_TOKEN") or None
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    expected = profile_token()
+    return bool(expected and candidate and hmac.compare_digest(candidate, expected))
+
+
+class _Profiler:
+    """pyinstrument's sampler when installed, cProfile otherwise.
+
+    ``async_mode="enabled"`` follows one request's task across awaits;
+    ``"disabled"`` samples whatever the loop thread runs (time windows).
+    """
+
+    def __init__(self, async_mode: str = "enabled") -> None:
+        try:
+            from pyinstrument import Profiler
+        except Exception:  # pragma: no cover - optional dependency
+            self.kind = "cprofile"
+            self._impl: Any = cProfile.Profile()
+        else:
+            self.kind = "pyinstrument"
+            self._impl = Profiler(async_mode=async_mode)
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._impl.start()
+        else:
+            self._impl.enable()
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._impl.stop()
+        else:
+            self._impl.disable()
+
+    def report(self, limit: int = 60) -> str:
+        if self.kind == "pyinstrument":
+            return self._impl.output_text(unicode=False, color=False)
+        out = io.StringIO()
+        pstats.Stats(self._impl, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+class ProfileStore:
+    """Most recent profile reports, keyed by id.
+
+    Only one profiler runs at a time; a request asking for a profile while
+    another is being captured is served unprofiled.
+
+    Configuration via env:
+      PROFILE_TOKEN (required to enable profiling and /debug endpoints)
+      PROFILE_KEEP (reports kept, default 20)
+    """
+
+    def __init__(self) -> None:
+        self.keep = int(os.getenv("PROFILE_KEEP", "20"))
+        self.reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.busy = False
+        self._ids = itertools.count(1)
+
+    def begin(self, async_mode: str = "enabled") -> Optional[Tuple[str, _Profiler]]:
+        if self.busy:
+            return None
+        self.busy = True
+        profiler = _Profiler(async_mode)
+        profiler.start()
+        return f"p{next(self._ids)}", profiler
+
+    def end(self, profile_id: str, profiler: _Profiler, label: str, seconds: float) -> str:
+        try:
+            profiler.stop()
+        finally:
+            self.busy = False
+        report = profiler.report()
+        self.reports[profile_id] = {
+            "id": profile_id,
+            "label": label,
+            "profiler": profiler.kind,
+            "seconds": round(seconds, 3),
+            "at": time.time(),
+            "report": report,
+        }
+        while len(self.reports) > self.keep:
+            self.reports.popitem(last=False)
+        return report
+
+
+profiles = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """Profile a single request sent with ``X-Profile: <PROFILE_TOKEN>``.
+
+    The response carries ``X-Profile-Id``; fetch the report from
+    ``/debug/profiles/{id}``. cProfile sees every coroutine running on the
+    loop meanwhile, so profile on a quiet instance for clean numbers.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or profile_token() is None:
+            await self.app(scope, receive, send)
+            return
+        requested = dict(scope.get("headers") or []).get(b"x-profile")
+        started = profiles.begin() if requested and token_matches(requested.decode("latin-1")) else None
+        if started is None:
+            await self.app(scope, receive, send)
+            return
+        profile_id, profiler = started
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            label = f"{scope['method']} {scope['path']}"
+            profiles.end(profile_id, profiler, label, time.perf_counter() - t0)
+
+
+def require_token(x_profile_token: Optional[str] = Header(default=None)) -> None:
+    if profile_token() is None:
+        raise HTTPException(status_code=404)
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
+debug_router = APIRouter(dependencies=[Depends(require_token)])
+
+
+@debug_router.get("/slow")
+async def slow():
+    """Recent slow requests with their per-stage breakdown (see TIMING_SLOW_MS)."""
+    return {"threshold_ms": slow_requests.threshold * 1000, "requests": slow_requests.recent()}
+
+
+@debug_router.get("/startup")
+async def startup():
+    """Import and lifespan phase durations, plus background warmup results."""
+    return startup_report.as_dict()
+
+
+@debug_router.post("/profile", response_class=PlainTextResponse)
+async def profile_window(seconds: float = 5.0) -> str:
+    """Profile everything the process does for ``seconds`` and return the report."""
+    started = profiles.begin(async_mode="disabled")
+    if started is None:
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    profile_id, profiler = started
+    seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        report = profiles.end(profile_id, profiler, f"window {seconds:g}s", seconds)
+    return report
+
+
+@debug_router.get("/profiles")
+async def list_profiles():
+    return [{k: v for k, v in entry.items() if k != "report"} for entry in reversed(profiles.reports.values())]
+
+
+@debug_router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str) -> str:
+    entry = profiles.reports.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown profile id")
+    return entry["report"]
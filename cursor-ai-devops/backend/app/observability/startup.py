@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class StartupReport:
+    """Where process start-up time goes: module import, lifespan phases, warmup.
+
+    Phases are recorded in the order they finish; warmup runs in the
+    background after the app is already serving, so it is reported apart
+    from ``ready_seconds``.
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self.ready_seconds: Optional[float] = None
+        self._origin: Optional[float] = None
+
+    def begin(self, origin: Optional[float] = None) -> None:
+        """Start the clock; ``origin`` is a ``perf_counter`` taken before the imports."""
+        self._origin = origin if origin is not None else time.perf_counter()
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = round(seconds, 4)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def ready(self) -> None:
+        if self._origin is not None:
+            self.ready_seconds = round(time.perf_counter() - self._origin, 4)
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items()]
+        ready = f"{self.ready_seconds * 1000:.0f}ms" if self.ready_seconds is not None else "n/a"
+        return f"startup ready in {ready} ({', '.join(parts)})"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"ready_seconds": self.ready_seconds, "phases": dict(self.phases), "warmup": dict(self.warmup)}
+
+
+startup_report = StartupReport()
@@ -0,0 +1,85 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+class RequestTimings:
+    """Per-stage durations for one request, summed by stage name."""
+
+    __slots__ = ("started", "spans", "handler_done")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: Dict[str, Tuple[float, int]] = {}
+        self.handler_done: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, count + 1)
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, (seconds, _) in self.spans.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# Set by TimingMiddleware for the duration of each HTTP request
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    """Attribute ``seconds`` to stage ``name`` of the current request (no-op outside one)."""
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as stage ``name``; usable around ``await`` in async code."""
+    if request_timings.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+class SlowRequestLog:
+    """Ring buffer of the most recent requests slower than a threshold.
+
+    Configuration via env:
+      TIMING_SLOW_MS (default 1000), TIMING_SLOW_BUFFER (entries kept, default 100)
+    """
+
+    def __init__(self) -> None:
+        self.threshold = float(os.getenv("TIMING_SLOW_MS", "1000")) / 1000
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=int(os.getenv("TIMING_SLOW_BUFFER", "100")))
+
+    def observe(self, method: str, path: str, status: int, total: float, timings: RequestTimings) -> None:
+        if total < self.threshold:
+            return
+        self.entries.append(
+            {
+                "at": time.time(),
+                "method": method,
+                "path": path,
+                "status": status,
+                "total_ms": round(total * 1000, 1),
+                "spans": {
+                    name: {"ms": round(seconds * 1000, 1), "count": count}
+                    for name, (seconds, count) in timings.spans.items()
+                },
+            }
+        )
+
+    def recent(self) -> List[Dict[str, Any]]:
+        return list(reversed(self.entries))
+
+
+slow_requests = SlowRequestLog()
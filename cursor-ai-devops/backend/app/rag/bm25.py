@@ -0,0 +1,92 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_.:/-]+")
+_SPLIT_RE = re.compile(r"[_.:/-]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens that keep identifiers whole and also index their parts.
+
+    ``my-api.default:8080`` yields the full token plus ``my``, ``api``,
+    ``default`` and ``8080`` so both exact and partial identifier queries match.
+    """
+    tokens: List[str] = []
+    for raw in _TOKEN_RE.findall(text.lower()):
+        token = raw.strip(".:/-_")
+        if not token:
+            continue
+        tokens.append(token)
+        parts = [p for p in _SPLIT_RE.split(token) if p]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring, updated incrementally."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def add(self, docs: Iterable[Tuple[str, str]]) -> None:
+        for doc_id, text in docs:
+            if doc_id in self.doc_terms:
+                self._remove(doc_id)
+            terms = Counter(tokenize(text))
+            self.doc_terms[doc_id] = terms
+            length = sum(terms.values())
+            self.doc_len[doc_id] = length
+            self.total_len += length
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def delete(self, ids: Sequence[str]) -> None:
+        for doc_id in ids:
+            if doc_id in self.doc_terms:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        for term in self.doc_terms.pop(doc_id):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(doc_id)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        n = len(self.doc_len)
+        if n == 0 or k <= 0:
+            return []
+        avgdl = self.total_len / n or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Merge ranked id lists; each list contributes ``1 / (k + rank)`` per id."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
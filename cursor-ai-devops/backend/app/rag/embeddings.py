@@ -0,0 +1,239 @@
+import hashlib
+import importlib.util
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_.:/-]+")
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of word tokens.
+
+    Much weaker than a neural model, but deterministic and fast; used when
+    sentence-transformers is not installed.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return out
+
+
+class SentenceTransformerEmbedder:
+    """Wraps a sentence-transformers model, imported and loaded on first use.
+
+    With a process pool only the workers embed, so the parent never loads
+    the model; it learns ``dim`` from a worker instead.
+    """
+
+    def __init__(self, model_name: str) -> None:
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise ImportError("sentence-transformers is not installed")
+        self.name = model_name
+        self._model: Any = None
+        self._dim: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self) -> Any:
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer  # type: ignore
+
+                self._model = SentenceTransformer(self.name)
+                self._dim = int(self._model.get_sentence_embedding_dimension())
+        return self._model
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            self._dim = int(self.model.get_sentence_embedding_dimension())
+        return self._dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def get_embedder(kind: Optional[str] = None) -> Any:
+    """Pick an embedder from RAG_EMBEDDER=auto|hash|sentence-transformers.
+
+    RAG_EMBED_MODEL selects the sentence-transformers model (default all-MiniLM-L6-v2).
+    """
+    kind = (kind or os.getenv("RAG_EMBEDDER", "auto")).lower()
+    if kind in ("auto", "sentence-transformers"):
+        try:
+            return SentenceTransformerEmbedder(os.getenv("RAG_EMBED_MODEL", "all-MiniLM-L6-v2"))
+        except Exception:
+            if kind != "auto":
+                raise
+    return HashingEmbedder()
+
+
+_worker_embedder: Any = None
+
+
+def _init_worker(model_name: str) -> None:
+    global _worker_embedder
+    _worker_embedder = SentenceTransformerEmbedder(model_name)
+
+
+def _worker_embed(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.embed(texts)
+
+
+def _worker_dim() -> int:
+    return _worker_embedder.dim
+
+
+class EmbeddingCache:
+    """Content-hash keyed embedding cache in a local SQLite file."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start : start + 500])
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", chunk)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                [(key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items.items()],
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class EmbeddingService:
+    """Micro-batched, cached embedding with an optional worker pool.
+
+    Configuration via env:
+      RAG_EMBED_BATCH (texts per model call, default 64)
+      RAG_EMBED_CACHE (default 1) and RAG_EMBED_CACHE_PATH (default $RAG_INDEX_DIR/embeddings.sqlite)
+      RAG_EMBED_WORKERS (default 1 = inline) and RAG_EMBED_POOL: thread|process (default thread)
+    """
+
+    def __init__(self, embedder: Any = None) -> None:
+        self.embedder = embedder or get_embedder()
+        self.batch_size = max(1, int(os.getenv("RAG_EMBED_BATCH", "64")))
+        self.workers = max(1, int(os.getenv("RAG_EMBED_WORKERS", "1")))
+        self.pool_kind = os.getenv("RAG_EMBED_POOL", "thread").lower()
+        self.cache: Optional[EmbeddingCache] = None
+        if os.getenv("RAG_EMBED_CACHE", "1") == "1":
+            default_path = Path(os.getenv("RAG_INDEX_DIR", "./rag_index")) / "embeddings.sqlite"
+            self.cache = EmbeddingCache(Path(os.getenv("RAG_EMBED_CACHE_PATH", str(default_path))))
+        self._executor: Optional[Executor] = None
+        self._dim: Optional[int] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            executor = self._get_executor()
+            if isinstance(executor, ProcessPoolExecutor) and not getattr(self.embedder, "loaded", True):
+                # Ask a worker instead of loading a second copy of the model here
+                self._dim = int(executor.submit(_worker_dim).result())
+            else:
+                self._dim = int(self.embedder.dim)
+        return self._dim
+
+    @property
+    def name(self) -> str:
+        return self.embedder.name
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.embedder.name}:{digest}"
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 1 or isinstance(self.embedder, HashingEmbedder):
+            return None
+        if self._executor is None:
+            if self.pool_kind == "process":
+                # Each worker process loads its own copy of the model once
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(self.embedder.name,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embed")
+        return self._executor
+
+    def _embed_batches(self, texts: List[str]) -> np.ndarray:
+        batches = [texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        executor = self._get_executor()
+        if executor is None:
+            results = [self.embedder.embed(batch) for batch in batches]
+        elif isinstance(executor, ProcessPoolExecutor):
+            results = list(executor.map(_worker_embed, batches))
+        else:
+            results = list(executor.map(self.embedder.embed, batches))
+        return np.concatenate(results).astype(np.float32, copy=False)
+
+    def embed(self, texts: Sequence[str], use_cache: bool = True) -> np.ndarray:
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return out
+        if not use_cache or self.cache is None:
+            out[:] = self._embed_batches(texts)
+            return out
+        keys = [self._key(t) for t in texts]
+        cached = self.cache.get_many(list(set(keys)))
+        missing: Dict[str, int] = {}
+        for row, key in enumerate(keys):
+            vec = cached.get(key)
+            if vec is not None:
+                out[row] = vec
+                self.cache_hits += 1
+            elif key not in missing:
+                missing[key] = row
+                self.cache_misses += 1
+        if missing:
+            fresh = self._embed_batches([texts[row] for row in missing.values()])
+            computed = dict(zip(missing.keys(), fresh))
+            self.cache.put_many(computed)
+            for row, key in enumerate(keys):
+                if key in computed:
+                    out[row] = computed[key]
+        return out
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,205 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class NumpyIndex:
+    """Flat float32 vector index with optional IVF coarse quantizer.
+
+    Vectors live in one contiguous matrix; top-k uses ``argpartition`` so a
+    query is a single matrix-vector product plus an O(n) selection. With
+    ``metric="cosine"`` rows are L2-normalized on insert and queries become
+    dot products. ``save``/``load`` persist to ``vectors.npy`` + ``meta.json``;
+    ``load`` memory-maps the matrix so startup does not re-embed or copy.
+
+    Configuration via env:
+      RAG_IVF_MIN_VECTORS (switch to IVF search at this size, default 100000; 0 disables)
+      RAG_IVF_NLIST (coarse centroids, default sqrt(n)), RAG_IVF_NPROBE (default 8)
+    """
+
+    def __init__(self, dim: int, metric: str = "cosine") -> None:
+        if metric not in ("cosine", "dot"):
+            raise ValueError(f"Unsupported metric: {metric}")
+        self.dim = dim
+        self.metric = metric
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._size = 0
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.ivf_min_vectors = int(os.getenv("RAG_IVF_MIN_VECTORS", "100000"))
+        self.ivf_nlist = int(os.getenv("RAG_IVF_NLIST", "0"))
+        self.ivf_nprobe = int(os.getenv("RAG_IVF_NPROBE", "8"))
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: self._size]
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dim {self.dim}, got {vectors.shape[1]}")
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity and self._vectors.flags.writeable:
+            return
+        grown = np.empty((max(needed, capacity * 2, 64), self.dim), dtype=np.float32)
+        grown[: self._size] = self._vectors[: self._size]
+        self._vectors = grown
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray, texts: Sequence[str]) -> None:
+        """Insert or replace rows; existing ids are updated in place."""
+        vectors = self._prepare(vectors)
+        self._reserve(len(ids))
+        rows: List[int] = []
+        for doc_id, vector, text in zip(ids, vectors, texts):
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._size
+                self._rows[doc_id] = row
+                self.ids.append(doc_id)
+                self.texts.append(text)
+                self._size += 1
+            else:
+                self.texts[row] = text
+            self._vectors[row] = vector
+            rows.append(row)
+        self.dirty = True
+        self._update_ivf(rows)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        rows = [self._rows[i] for i in ids if i in self._rows]
+        if not rows:
+            return 0
+        keep = np.ones(self._size, dtype=bool)
+        keep[rows] = False
+        self._vectors = np.ascontiguousarray(self.vectors[keep])
+        self.ids = [i for i, k in zip(self.ids, keep) if k]
+        self.texts = [t for t, k in zip(self.texts, keep) if k]
+        self._size = len(self.ids)
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._centroids = self._assignments = None
+        self.dirty = True
+        return len(rows)
+
+    def get_text(self, doc_id: str) -> Optional[str]:
+        row = self._rows.get(doc_id)
+        return self.texts[row] if row is not None else None
+
+    def search(self, query: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
+        if self._size == 0 or k <= 0:
+            return []
+        q = self._prepare(query)[0]
+        if self.ivf_min_vectors and self._size >= self.ivf_min_vectors:
+            candidates = self._ivf_candidates(q)
+            scores = self.vectors[candidates] @ q
+        else:
+            candidates = None
+            scores = self.vectors @ q
+        k = min(k, scores.shape[0])
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+        return [(self.ids[r], float(scores[t])) for r, t in zip(rows, top)]
+
+    # IVF coarse quantizer
+
+    def _update_ivf(self, rows: List[int]) -> None:
+        if self._centroids is None or self._assignments is None:
+            return
+        # Retrain once the index has grown by a quarter; otherwise just assign touched rows
+        if self._size > self._trained_size * 1.25:
+            self._centroids = self._assignments = None
+            return
+        if self._assignments.shape[0] < self._size:
+            grown = np.zeros(self._size, dtype=np.int32)
+            grown[: self._assignments.shape[0]] = self._assignments
+            self._assignments = grown
+        idx = np.asarray(rows, dtype=np.int64)
+        self._assignments[idx] = np.argmax(self._vectors[idx] @ self._centroids.T, axis=1)
+
+    def _train_ivf(self) -> None:
+        data = self.vectors
+        nlist = self.ivf_nlist or max(1, int(np.sqrt(self._size)))
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(self._size, size=min(self._size, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(10):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if members.shape[0]:
+                    centroids[c] = members.mean(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        self._centroids = centroids
+        self._assign_all()
+        self._trained_size = self._size
+
+    def _assign_all(self) -> None:
+        assert self._centroids is not None
+        assignments = np.empty(self._size, dtype=np.int32)
+        for start in range(0, self._size, 65536):
+            block = self.vectors[start : start + 65536]
+            assignments[start : start + block.shape[0]] = np.argmax(block @ self._centroids.T, axis=1)
+        self._assignments = assignments
+
+    def _ivf_candidates(self, q: np.ndarray) -> np.ndarray:
+        if self._centroids is None or self._assignments is None:
+            self._train_ivf()
+        assert self._centroids is not None and self._assignments is not None
+        nprobe = min(self.ivf_nprobe, self._centroids.shape[0])
+        probes = np.argpartition(-(self._centroids @ q), nprobe - 1)[:nprobe]
+        return np.flatnonzero(np.isin(self._assignments, probes))
+
+    # Persistence
+
+    def save(self, directory: str) -> None:
+        if not self._vectors.flags.writeable:
+            # Still memory-mapped from load(): nothing changed, and replacing a
+            # mapped file fails on Windows
+            return
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        tmp = path / "vectors.tmp.npy"
+        np.save(tmp, self.vectors)
+        os.replace(tmp, path / "vectors.npy")
+        meta = {"dim": self.dim, "metric": self.metric, "ids": self.ids, "texts": self.texts}
+        tmp_meta = path / "meta.tmp.json"
+        tmp_meta.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_meta, path / "meta.json")
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["NumpyIndex"]:
+        path = Path(directory)
+        if not (path / "meta.json").exists() or not (path / "vectors.npy").exists():
+            return None
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        index = cls(meta["dim"], meta["metric"])
+        # Read-only memory map; the first add() copies it into a growable buffer
+        index._vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        index._size = index._vectors.shape[0]
+        index.ids = list(meta["ids"])
+        index.texts = list(meta["texts"])
+        index._rows = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        return index
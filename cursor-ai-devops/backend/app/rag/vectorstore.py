@@ -1,30 +1,157 @@
-from typing import List, Tuple
+import os
+import re
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
 
-try:
-    import chromadb  # type: ignore
-except Exception:  # pragma: no cover - optional during bootstrap
-    chromadb = None
+from app.observability.timing import span
+from app.rag.bm25 import BM25Index, reciprocal_rank_fusion
+from app.rag.embeddings import EmbeddingService
+from app.rag.index import NumpyIndex
 
 
 class VectorStore:
-    def __init__(self, collection_name: str = "devops-kb") -> None:
+    """Document store for RAG retrieval.
+
+    Configuration via env:
+      RAG_BACKEND: numpy|chroma (default numpy; persisted under RAG_INDEX_DIR)
+      RAG_INDEX_DIR (default ./rag_index), RAG_METRIC: cosine|dot (default cosine)
+      RAG_EMBEDDER / RAG_EMBED_MODEL / RAG_EMBED_*, see ``app.rag.embeddings``
+      RAG_HYBRID (default 1): fuse BM25 keyword and vector rankings with RRF
+      RAG_RRF_K (default 60), RAG_CANDIDATES (per-ranker depth multiplier, default 4)
+    """
+
+    def __init__(self, collection_name: str = "devops-kb", backend: Optional[str] = None) -> None:
         self.collection_name = collection_name
-        self.client = chromadb.Client() if chromadb else None
-        self.collection = (
-            self.client.get_or_create_collection(collection_name) if self.client else None
-        )
+        self.backend = (backend or os.getenv("RAG_BACKEND", "numpy")).lower()
+        self.index_dir = Path(os.getenv("RAG_INDEX_DIR", "./rag_index"))
+        self.metric = os.getenv("RAG_METRIC", "cosine")
+        self.client = None
+        self.collection = None
+        self._embedder: Optional[EmbeddingService] = None
+        self._index: Optional[NumpyIndex] = None
+        self._keywords: Optional[BM25Index] = None
+        # Warmup and the ingestion sync run in threads at startup; both may be
+        # first to touch these, and a second copy would lose documents
+        self._lazy_lock = threading.RLock()
+        self.hybrid = os.getenv("RAG_HYBRID", "1") == "1"
+        self.rrf_k = int(os.getenv("RAG_RRF_K", "60"))
+        self.candidates = max(1, int(os.getenv("RAG_CANDIDATES", "4")))
+        if self.backend == "chroma":
+            # Imported only for this backend: chromadb takes seconds to import
+            try:
+                import chromadb  # type: ignore
+            except Exception:  # pragma: no cover - optional dependency
+                chromadb = None
+            self.client = chromadb.Client() if chromadb else None
+            self.collection = (
+                self.client.get_or_create_collection(collection_name) if self.client else None
+            )
+
+    @property
+    def embedder(self) -> EmbeddingService:
+        if self._embedder is None:
+            with self._lazy_lock:
+                if self._embedder is None:
+                    self._embedder = EmbeddingService()
+        return self._embedder
+
+    @property
+    def index_path(self) -> Path:
+        # One directory per embedder so vectors of different models never mix
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.embedder.name)
+        return self.index_dir / self.collection_name / slug
+
+    @property
+    def index(self) -> NumpyIndex:
+        if self._index is None:
+            with self._lazy_lock:
+                if self._index is None:
+                    self._index = NumpyIndex.load(str(self.index_path)) or NumpyIndex(self.embedder.dim, self.metric)
+        return self._index
 
-    def add_documents(self, docs: List[Tuple[str, str]]) -> None:
-        if not self.collection:
+    @property
+    def keywords(self) -> BM25Index:
+        if self._keywords is None:
+            with self._lazy_lock:
+                if self._keywords is None:
+                    # Not persisted: rebuilding from the stored chunk texts is cheap
+                    keywords = BM25Index()
+                    keywords.add(zip(self.index.ids, self.index.texts))
+                    self._keywords = keywords
+        return self._keywords
+
+    def warmup(self) -> None:
+        """Load the embedding model, vector index and keyword index (blocking)."""
+        if self.backend == "chroma":
+            return
+        self.embedder.dim  # loads the model, in a worker with RAG_EMBED_POOL=process
+        self.keywords  # loads the vector index first
+
+    def add_documents(self, docs: List[Tuple[str, str]], save: bool = True) -> None:
+        if not docs:
             return
         ids = [d[0] for d in docs]
         texts = [d[1] for d in docs]
-        self.collection.add(ids=ids, documents=texts)
+        if self.backend == "chroma":
+            if self.collection:
+                self.collection.add(ids=ids, documents=texts)
+            return
+        # Unchanged chunks are skipped outright; changed ones hit the embedding cache first
+        changed = [(i, t) for i, t in zip(ids, texts) if self.index.get_text(i) != t]
+        if not changed:
+            return
+        ids = [d[0] for d in changed]
+        texts = [d[1] for d in changed]
+        keywords = self.keywords  # build from existing chunks before adding new ones
+        self.index.add(ids, self.embedder.embed(texts), texts)
+        keywords.add(changed)
+        if save:
+            self.save()
 
-    def search(self, query: str, k: int = 5) -> List[str]:
-        if not self.collection:
+    def delete_documents(self, ids: List[str], save: bool = True) -> None:
+        if self.backend == "chroma":
+            if self.collection and ids:
+                self.collection.delete(ids=ids)
+            return
+        if self.index.delete(ids):
+            self.keywords.delete(ids)
+            if save:
+                self.save()
+
+    def save(self) -> None:
+        if self._index is not None and self._index.dirty:
+            self._index.save(str(self.index_path))
+
+    def vector_search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        if self.backend == "chroma" or len(self.index) == 0:
             return []
-        res = self.collection.query(query_texts=[query], n_results=k)
-        return (res.get("documents", [[]])[0]) if res else []
+        return self.index.search(self.embedder.embed([query], use_cache=False)[0], k)
 
+    def keyword_search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        if self.backend == "chroma":
+            return []
+        return self.keywords.search(query, k)
+
+    def search_with_scores(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Return ``(doc_id, score)`` pairs, best first (numpy backend only).
 
+        In hybrid mode scores are reciprocal-rank-fusion scores, not similarities.
+        """
+        with span("retrieval"):
+            if not self.hybrid:
+                return self.vector_search(query, k)
+            depth = k * self.candidates
+            rankings = [
+                [doc_id for doc_id, _ in self.vector_search(query, depth)],
+                [doc_id for doc_id, _ in self.keyword_search(query, depth)],
+            ]
+            return reciprocal_rank_fusion(rankings, self.rrf_k)[:k]
+
+    def search(self, query: str, k: int = 5) -> List[str]:
+        if self.backend == "chroma":
+            if not self.collection:
+                return []
+            res = self.collection.query(query_texts=[query], n_results=k)
+            return (res.get("documents", [[]])[0]) if res else []
+        return [self.index.get_text(doc_id) or "" for doc_id, _ in self.search_with_scores(query, k)]
@@ -1,4 +1,6 @@
-from typing import Optional
+import os
+from typing import Any, Optional
+from sqlalchemy import event, text
 from sqlmodel import SQLModel, Field, create_engine, Session
 
 
@@ -9,19 +11,73 @@ class Conversation(SQLModel, table=True):
 
 class Message(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    conversation_id: int
+    conversation_id: int = Field(index=True)
     role: str
     content: str
 
 
-engine = create_engine("sqlite:///./app.db")
+class ConversationSummary(SQLModel, table=True):
+    conversation_id: int = Field(primary_key=True)
+    summary: str
+    until_message_id: int  # last message folded into the summary
+
+
+class CachedResponse(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    value: str
+    expires_at: float
+    accessed_at: float = Field(index=True)
+
+
+# DATABASE_URL must be a sqlite URL; the async engine uses the aiosqlite driver on the same file
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+
+
+def _sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    # WAL lets readers proceed while the history writer commits; NORMAL sync is safe under WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '16384'))}")
+    cursor.close()
+
+
+engine = create_engine(DATABASE_URL)
+event.listen(engine, "connect", _sqlite_pragmas)
+
+_async_engine: Any = None
+
+
+def get_async_engine() -> Any:
+    """Lazily create the aiosqlite engine (import deferred so sync-only users skip it)."""
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _async_engine = create_async_engine(DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+        event.listen(_async_engine.sync_engine, "connect", _sqlite_pragmas)
+    return _async_engine
 
 
 def init_db() -> None:
     SQLModel.metadata.create_all(engine)
 
 
+async def init_db_async() -> None:
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        # create_all skips indexes on tables that already exist (databases from older builds)
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_message_conversation_id ON message (conversation_id)"))
+
+
 def get_session() -> Session:
     return Session(engine)
 
 
+async def dispose_async_engine() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.storage.db import (
+    Conversation,
+    ConversationSummary,
+    Message,
+    dispose_async_engine,
+    get_async_engine,
+    init_db_async,
+)
+
+logger = logging.getLogger("uvicorn.error")
+
+_Pending = Tuple[int, str, str]  # (conversation_id, role, content)
+
+
+class ChatHistory:
+    """Conversation persistence off the request path.
+
+    ``append`` only enqueues; a single writer task drains the queue and
+    inserts whatever has accumulated in one transaction, so a burst of chat
+    messages costs one commit instead of one per message. Reading a
+    conversation waits only for that conversation's queued writes. A batch
+    that fails is retried once, then dropped and logged.
+
+    Configuration via env:
+      HISTORY_ENABLED (default 1)
+      HISTORY_BATCH_SIZE (max messages per transaction, default 100)
+      HISTORY_FLUSH_INTERVAL (seconds to wait for a batch to fill, default 0.05)
+      HISTORY_QUEUE_MAX (pending messages before append waits, default 10000)
+    """
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("HISTORY_ENABLED", "1") == "1"
+        self.batch_size = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+        self.flush_interval = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.05"))
+        self.queue_max = int(os.getenv("HISTORY_QUEUE_MAX", "10000"))
+        self._queue: Optional["asyncio.Queue[_Pending]"] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Queue positions: the writer handles messages in order, so everything
+        # up to ``_done`` is committed (or dropped); ``_last`` is the position
+        # of each conversation's newest queued message
+        self._queued = 0
+        self._done = 0
+        self._last: Dict[int, int] = {}
+        self._progress: Optional[asyncio.Condition] = None
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def started(self) -> bool:
+        return self._writer is not None
+
+    async def start(self) -> None:
+        if not self.enabled or self.started:
+            return
+        await init_db_async()
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._progress = asyncio.Condition()
+        self._writer = asyncio.create_task(self._run())
+
+    async def create_conversation(self, title: str) -> Optional[int]:
+        if not self.started:
+            return None
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            conversation = Conversation(title=title[:200])
+            session.add(conversation)
+            await session.commit()
+            return conversation.id
+
+    async def append(self, conversation_id: Optional[int], role: str, content: str) -> None:
+        if self._queue is None or conversation_id is None:
+            return
+        await self._queue.put((conversation_id, role, content))
+        # No await since the put: positions follow queue order
+        self._queued += 1
+        self._last[conversation_id] = self._queued
+
+    async def messages(self, conversation_id: int, limit: int = 50) -> List[Message]:
+        """Most recent ``limit`` messages, oldest first (includes queued writes)."""
+        if not self.started:
+            return []
+        await self.flush(conversation_id)
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            query = (
+                select(Message)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.id.desc())
+                .limit(limit)
+            )
+            rows = (await session.execute(query)).scalars().all()
+        return list(reversed(rows))
+
+    async def get_summary(self, conversation_id: int) -> Optional[ConversationSummary]:
+        if not self.started:
+            return None
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            return await session.get(ConversationSummary, conversation_id)
+
+    async def save_summary(self, conversation_id: int, summary: str, until_message_id: int) -> None:
+        if not self.started:
+            return
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            await session.merge(
+                ConversationSummary(conversation_id=conversation_id, summary=summary, until_message_id=until_message_id)
+            )
+            await session.commit()
+
+    async def flush(self, conversation_id: Optional[int] = None) -> None:
+        """Wait until what was enqueued so far has been written.
+
+        With ``conversation_id``, only that conversation's messages count, so
+        a reader never waits on other conversations' writes.
+        """
+        if self._queue is None or self._progress is None:
+            return
+        if conversation_id is None:
+            await self._queue.join()
+            return
+        target = self._last.get(conversation_id, 0)
+        if self._done >= target:
+            return
+        async with self._progress:
+            await self._progress.wait_for(lambda: self._done >= target)
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write_or_drop(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+                await self._advance(len(batch))
+
+    async def _write_or_drop(self, batch: List[_Pending]) -> None:
+        # Never let a bad batch kill the writer; history is best-effort
+        for attempt in (1, 2):
+            try:
+                await self._write(batch)
+                return
+            except Exception:
+                if attempt == 2:
+                    self.failed += 1
+                    logger.exception("dropped a batch of %d chat messages", len(batch))
+
+    async def _advance(self, count: int) -> None:
+        assert self._progress is not None
+        self._done += count
+        for conversation_id, last in list(self._last.items()):
+            if last <= self._done:
+                del self._last[conversation_id]
+        async with self._progress:
+            self._progress.notify_all()
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            session.add_all(Message(conversation_id=cid, role=role, content=content) for cid, role, content in batch)
+            await session.commit()
+        self.batches += 1
+        self.written += len(batch)
+
+    async def aclose(self) -> None:
+        if self._writer is None:
+            return
+        await self.flush()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+        self._queue = None
+        self._progress = None
+        await dispose_async_engine()
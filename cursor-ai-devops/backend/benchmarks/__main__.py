@@ -0,0 +1,103 @@
+"""Run the benchmark suite and write machine-readable results.
+
+Run from the backend directory:
+  python -m benchmarks --quick --output bench-results/latest.json
+  python -m benchmarks --output new.json --compare bench-results/baseline.json --tolerance 0.15
+
+``--compare`` prints every timing or throughput that moved by more than
+``--tolerance`` against a previous results file and exits 1 on regressions.
+Timings (``*_ms``, ``*_seconds``) regress when they grow, throughputs
+(``throughput_*``, ``*_per_second``) when they shrink; single-sample ``max_ms`` is
+ignored.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from benchmarks import bench_api, bench_k8s_analyzer, bench_vectorstore
+from benchmarks.common import write_results
+
+SIZES = {
+    "quick": {"resources": 500, "vectors": 10000, "docs": 1000, "queries": 50, "clients": 5, "requests": 40},
+    "full": {"resources": 5000, "vectors": 100000, "docs": 10000, "queries": 200, "clients": 20, "requests": 400},
+}
+SUITES = ("k8s", "vectorstore", "api")
+
+
+def run_suite(names: List[str], size: Dict[str, int]) -> List[Dict[str, Any]]:
+    results = []
+    for name in names:
+        print(f"running {name} ...", file=sys.stderr)
+        if name == "k8s":
+            results.append(bench_k8s_analyzer.run(size["resources"], 3, 3))
+        elif name == "vectorstore":
+            results.append(bench_vectorstore.run(size["vectors"], 384, size["docs"], size["queries"]))
+        elif name == "api":
+            results.append(bench_api.run(size["clients"], size["requests"], 0.05, 200.0, 32))
+    return results
+
+
+def _flatten(value: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def _direction(metric: str) -> int:
+    """+1 if larger is worse, -1 if smaller is worse, 0 if not a performance number."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf == "max_ms":
+        return 0  # a single sample; too noisy to gate on
+    if leaf.endswith(("_ms", "_seconds")):
+        return 1
+    if leaf.startswith("throughput") or leaf.endswith("_per_second"):
+        return -1
+    return 0
+
+
+def compare(old: List[Dict[str, Any]], new: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Return regressions; improvements and regressions are printed."""
+    before = {f"{r['benchmark']}.{k}": v for r in old for k, v in _flatten(r)}
+    regressions = []
+    for result in new:
+        for key, value in _flatten(result):
+            metric = f"{result['benchmark']}.{key}"
+            direction = _direction(metric)
+            baseline = before.get(metric)
+            if not direction or not baseline:
+                continue
+            change = (value - baseline) / baseline
+            if abs(change) <= tolerance:
+                continue
+            worse = change * direction > 0
+            line = f"{'REGRESSION' if worse else 'improved  '} {metric}: {baseline:g} -> {value:g} ({change:+.1%})"
+            print(line)
+            if worse:
+                regressions.append(line)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="small sizes, for CI smoke runs")
+    parser.add_argument("--only", choices=SUITES, action="append", help="run only these suites (repeatable)")
+    parser.add_argument("--output", default="bench-results/latest.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative change ignored (default 0.15)")
+    args = parser.parse_args()
+
+    results = run_suite(args.only or list(SUITES), SIZES["quick" if args.quick else "full"])
+    write_results(args.output, results)
+    print(f"results written to {args.output}", file=sys.stderr)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        if compare(baseline, results, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
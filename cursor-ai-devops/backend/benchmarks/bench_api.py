@@ -0,0 +1,157 @@
+"""Load-test /api/suggest and /ws/chat against the fake Ollama server.
+
+Starts the stub model server and the backend under uvicorn on local ports,
+then drives them with N concurrent clients over real sockets. Prompts are
+unique per request so the response cache and single-flight do not help.
+
+Run from the backend directory:
+  python -m benchmarks.bench_api --clients 20 --requests 200 --latency 0.2 --tokens-per-second 100
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import percentiles
+from benchmarks.fake_ollama import create_app, serve_in_thread
+
+
+async def _drive(clients: int, total: int, one) -> Dict[str, Any]:
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while next(counter) < total:
+            started = time.perf_counter()
+            try:
+                await one()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency": percentiles(latencies),
+    }
+
+
+async def bench_suggest(base_url: str, clients: int, total: int) -> Dict[str, Any]:
+    seq = itertools.count()
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+
+        async def one() -> None:
+            body = {"language": "python", "code": f"print({next(seq)})", "file_path": "bench.py"}
+            resp = await client.post("/api/suggest", json=body)
+            resp.raise_for_status()
+
+        return await _drive(clients, total, one)
+
+
+async def bench_ws_chat(base_url: str, clients: int, total: int) -> Dict[str, Any]:
+    import websockets
+
+    url = base_url.replace("http://", "ws://") + "/ws/chat"
+    seq = itertools.count()
+    ttft: List[float] = []
+    latencies: List[float] = []
+
+    async def session(messages: int) -> None:
+        # One socket per client; its messages are sent one after another, like a user would
+        async with websockets.connect(url, max_size=None) as ws:
+            for _ in range(messages):
+                started = time.perf_counter()
+                await ws.send(f"benchmark question {next(seq)}")
+                first = True
+                while json.loads(await ws.recv())["type"] != "end":
+                    if first:
+                        ttft.append(time.perf_counter() - started)
+                        first = False
+                latencies.append(time.perf_counter() - started)
+
+    shares = [total // clients + (1 if i < total % clients else 0) for i in range(clients)]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(session(n) for n in shares if n), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    return {
+        "messages": total,
+        "client_errors": sum(1 for r in results if isinstance(r, BaseException)),
+        "seconds": round(elapsed, 4),
+        "throughput_msgs_per_second": round(len(latencies) / elapsed, 2),
+        "ttft": percentiles(ttft),
+        "latency": percentiles(latencies),
+    }
+
+
+def run(
+    clients: int,
+    requests: int,
+    latency: float,
+    tokens_per_second: float,
+    tokens: int,
+    model_concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    fake = create_app(latency, tokens_per_second, tokens)
+    with tempfile.TemporaryDirectory() as tmp, serve_in_thread(fake) as ollama_url:
+        # The backend reads its configuration when its services are created at startup
+        os.environ.update({
+            "PROVIDER": "ollama",
+            "OLLAMA_HOST": ollama_url,
+            "LLM_CACHE_SQLITE": "0",
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "RAG_INDEX_DIR": f"{tmp}/rag_index",
+        })
+        if model_concurrency:
+            os.environ["MODEL_CONCURRENCY_OLLAMA"] = str(model_concurrency)
+        from app.main import app
+
+        with serve_in_thread(app) as base_url:
+            slots = app.state.orchestrator.model_router.scheduler.limit_for("ollama")
+            suggest = asyncio.run(bench_suggest(base_url, clients, requests))
+            chat = asyncio.run(bench_ws_chat(base_url, clients, requests))
+    return {
+        "benchmark": "api",
+        "clients": clients,
+        "model_concurrency": slots,
+        "fake_model": {
+            "latency_s": latency,
+            "tokens_per_second": tokens_per_second,
+            "tokens": tokens,
+            "requests_served": fake.state.requests,
+        },
+        "suggest": suggest,
+        "ws_chat": chat,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--tokens", type=int, default=32)
+    parser.add_argument("--model-concurrency", type=int, default=None,
+                        help="MODEL_CONCURRENCY_OLLAMA for the backend (default: the scheduler's own default)")
+    args = parser.parse_args()
+    result = run(args.clients, args.requests, args.latency, args.tokens_per_second, args.tokens, args.model_concurrency)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
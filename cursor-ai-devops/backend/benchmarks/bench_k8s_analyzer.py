@@ -0,0 +1,83 @@
+"""Benchmark the K8s analyzer over a large synthetic multi-document manifest.
+
+Run from the backend directory:
+  python -m benchmarks.bench_k8s_analyzer --resources 5000 --containers 3
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import yaml
+
+from app.integrations.k8s.analyzer import RuleEngine, YamlLoader, analyze_manifest, shutdown_pool
+
+
+def synthetic_manifest(resources: int, containers: int) -> str:
+    docs: List[Dict[str, Any]] = []
+    for i in range(resources):
+        if i % 5 == 4:
+            docs.append({"apiVersion": "v1", "kind": "Service", "metadata": {"name": f"svc-{i}"},
+                         "spec": {"ports": [{"port": 80}]}})
+            continue
+        pod_spec: Dict[str, Any] = {
+            "serviceAccountName": "default" if i % 2 else f"sa-{i}",
+            "containers": [
+                {
+                    "name": f"c{j}",
+                    "image": f"registry.local/app-{i}:{'latest' if j % 2 else '1.0.' + str(j)}",
+                    "resources": {"requests": {"cpu": "100m"}, "limits": {"cpu": "500m"}} if i % 3 else {},
+                    "securityContext": {"runAsNonRoot": True, "allowPrivilegeEscalation": False,
+                                        "capabilities": {"drop": ["ALL"]}} if i % 4 else {},
+                }
+                for j in range(containers)
+            ],
+        }
+        docs.append({"apiVersion": "apps/v1", "kind": "Deployment", "metadata": {"name": f"app-{i}"},
+                     "spec": {"replicas": 2, "template": {"spec": pod_spec}}})
+    return yaml.safe_dump_all(docs)
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(resources: int, containers: int, repeat: int) -> Dict[str, Any]:
+    manifest = synthetic_manifest(resources, containers)
+    docs = list(yaml.safe_load_all(manifest))
+    engine = RuleEngine()
+    findings = len(engine.analyze(docs))
+    check_s = _best_of(repeat, lambda: engine.analyze(docs))
+    full_s = _best_of(repeat, lambda: analyze_manifest(manifest, engine, parallel=False))
+    parallel_s = _best_of(repeat, lambda: analyze_manifest(manifest, engine, parallel=True))
+    shutdown_pool()
+    return {
+        "benchmark": "k8s_analyzer",
+        "resources": resources,
+        "containers": containers,
+        "manifest_bytes": len(manifest),
+        "findings": findings,
+        "rules_seconds": round(check_s, 6),
+        "rules_docs_per_second": round(resources / check_s, 1),
+        "yaml_loader": YamlLoader.__name__,
+        "end_to_end_seconds": round(full_s, 6),
+        "parallel_seconds": round(parallel_s, 6),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resources", type=int, default=2000)
+    parser.add_argument("--containers", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.resources, args.containers, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
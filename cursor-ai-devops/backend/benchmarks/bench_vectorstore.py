@@ -0,0 +1,125 @@
+"""Benchmark RAG retrieval: raw index search (flat vs IVF) and VectorStore queries.
+
+Run from the backend directory:
+  python -m benchmarks.bench_vectorstore --vectors 50000 --docs 5000 --queries 200
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Set
+
+import numpy as np
+
+from app.rag.index import NumpyIndex
+from benchmarks.common import percentiles
+
+WORDS = (
+    "deployment service ingress pod node cluster helm chart terraform module vpc subnet lambda bucket "
+    "pipeline runner cache latency timeout retry backoff secret vault token certificate dns probe "
+    "readiness liveness autoscaler replica volume snapshot backup restore alert dashboard"
+).split()
+
+
+def _timed(fn, queries: List[Any]) -> Dict[str, float]:
+    samples = []
+    for q in queries:
+        started = time.perf_counter()
+        fn(q)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def bench_index(vectors: int, dim: int, queries: int, k: int, seed: int) -> Dict[str, Any]:
+    # Clustered data like real embeddings; IVF recall on isotropic noise would be meaningless
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, vectors // 500), dim), dtype=np.float32)
+
+    def sample(n: int) -> np.ndarray:
+        noise = rng.standard_normal((n, dim), dtype=np.float32) * 0.5
+        return centers[rng.integers(0, len(centers), n)] + noise
+
+    data = sample(vectors)
+    ids = [f"v{i}" for i in range(vectors)]
+    texts = [""] * vectors
+    qs = list(sample(queries))
+
+    flat = NumpyIndex(dim)
+    flat.ivf_min_vectors = 0
+    started = time.perf_counter()
+    flat.add(ids, data, texts)
+    flat_build = time.perf_counter() - started
+
+    ivf = NumpyIndex(dim)
+    ivf.ivf_min_vectors = 1
+    started = time.perf_counter()
+    ivf.add(ids, data, texts)
+    ivf.search(qs[0], k)  # make sure the coarse quantizer is trained before timing
+    ivf_build = time.perf_counter() - started
+
+    recall = []
+    for q in qs:
+        exact: Set[str] = {doc_id for doc_id, _ in flat.search(q, k)}
+        approx = {doc_id for doc_id, _ in ivf.search(q, k)}
+        recall.append(len(exact & approx) / k)
+    return {
+        "vectors": vectors,
+        "dim": dim,
+        "k": k,
+        "flat": {"build_seconds": round(flat_build, 4), "search": _timed(lambda q: flat.search(q, k), qs)},
+        "ivf": {
+            "build_seconds": round(ivf_build, 4),
+            "nprobe": ivf.ivf_nprobe,
+            "search": _timed(lambda q: ivf.search(q, k), qs),
+            f"recall_at_{k}": round(sum(recall) / len(recall), 4),
+        },
+    }
+
+
+def bench_store(docs: int, queries: int, k: int, seed: int) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({"RAG_INDEX_DIR": tmp, "RAG_EMBEDDER": os.getenv("RAG_EMBEDDER", "hash")})
+        from app.rag.vectorstore import VectorStore
+
+        store = VectorStore("bench")
+        corpus = [(f"doc{i}", " ".join(rnd.choice(WORDS) for _ in range(60))) for i in range(docs)]
+        started = time.perf_counter()
+        store.add_documents(corpus, save=False)
+        ingest = time.perf_counter() - started
+        qs = [" ".join(rnd.choice(WORDS) for _ in range(6)) for _ in range(queries)]
+        result = {
+            "docs": docs,
+            "embedder": store.embedder.name,
+            "ingest_seconds": round(ingest, 4),
+            "vector_search": _timed(lambda q: store.vector_search(q, k), qs),
+            "keyword_search": _timed(lambda q: store.keyword_search(q, k), qs),
+            "hybrid_search": _timed(lambda q: store.search_with_scores(q, k), qs),
+        }
+        store.embedder.close()
+    return result
+
+
+def run(vectors: int, dim: int, docs: int, queries: int, k: int = 10, seed: int = 7) -> Dict[str, Any]:
+    return {
+        "benchmark": "vectorstore",
+        "index": bench_index(vectors, dim, queries, k, seed),
+        "store": bench_store(docs, queries, k, seed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.vectors, args.dim, args.docs, args.queries, args.k), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Ollama-compatible stub model server with configurable latency and token rate.
+
+Implements ``POST /api/chat`` and ``POST /api/generate`` (streaming NDJSON and
+non-streaming) and ``GET /api/tags``, so the backend can be pointed at it with
+``PROVIDER=ollama OLLAMA_HOST=http://127.0.0.1:11435``.
+
+Run standalone from the backend directory:
+  python -m benchmarks.fake_ollama --port 11435 --latency 0.2 --tokens-per-second 80 --tokens 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(latency: float = 0.1, tokens_per_second: float = 100.0, tokens: int = 32) -> FastAPI:
+    """``latency`` is time to first token; completion tokens then arrive at ``tokens_per_second``."""
+    app = FastAPI(title="fake-ollama")
+    app.state.requests = 0
+    app.state.aborted = 0
+    interval = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    app.state.last_prompt = ""
+
+    def counts(prompt: str) -> Dict[str, int]:
+        # Like Ollama's KV cache reuse: only the part after the previous prompt's shared prefix is evaluated
+        shared = len(os.path.commonprefix([app.state.last_prompt, prompt]))
+        app.state.last_prompt = prompt
+        return {"prompt_eval_count": max(1, (len(prompt) - shared) // 4), "eval_count": tokens}
+
+    @app.get("/api/tags")
+    async def tags() -> Dict[str, Any]:
+        return {"models": [{"name": "fake:latest"}]}
+
+    async def respond(body: Dict[str, Any], prompt: str, frame: Callable[[str], Dict[str, Any]]):
+        """``frame`` shapes the text of one NDJSON line: ``response`` for generate, ``message`` for chat."""
+        app.state.requests += 1
+        words = [f"tok{i} " for i in range(tokens)]
+        if not body.get("stream", True):
+            await asyncio.sleep(latency + interval * tokens)
+            return JSONResponse({"model": body.get("model"), **frame("".join(words)), "done": True, **counts(prompt)})
+
+        async def lines() -> AsyncIterator[bytes]:
+            try:
+                await asyncio.sleep(latency)
+                for i, word in enumerate(words):
+                    if i and interval:
+                        await asyncio.sleep(interval)
+                    yield (json.dumps({**frame(word), "done": False}) + "\n").encode()
+                yield (json.dumps({**frame(""), "done": True, **counts(prompt)}) + "\n").encode()
+            except asyncio.CancelledError:
+                app.state.aborted += 1  # the client went away mid-generation
+                raise
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        if "prompt" not in body:
+            # Like Ollama: no prompt only loads the model (the backend's startup warmup)
+            return JSONResponse({"model": body.get("model"), "response": "", "done": True, "done_reason": "load"})
+        return await respond(body, body["prompt"], lambda text: {"response": text})
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        if not messages:
+            return JSONResponse({"model": body.get("model"), "message": {"role": "assistant", "content": ""},
+                                 "done": True, "done_reason": "load"})
+        prompt = "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in messages)
+        return await respond(body, prompt, lambda text: {"message": {"role": "assistant", "content": text}})
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve_in_thread(app: Any, port: int = 0) -> Iterator[str]:
+    """Run an ASGI app under uvicorn on a background thread; yields its base URL."""
+    import uvicorn
+
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError(f"server on port {port} failed to start")
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--tokens", type=int, default=32, help="completion tokens per response")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.tokens_per_second, args.tokens), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
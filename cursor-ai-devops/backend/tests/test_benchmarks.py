@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+
+from app.models.router import ModelRouter
+from benchmarks.__main__ import compare
+from benchmarks.common import percentiles
+from benchmarks.fake_ollama import create_app
+
+
+def test_fake_ollama_serves_router_complete_and_stream(monkeypatch):
+    monkeypatch.setenv("PROVIDER", "ollama")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    fake = create_app(latency=0.0, tokens_per_second=0, tokens=4)
+    router = ModelRouter()
+    router._ollama_client = httpx.AsyncClient(base_url="http://fake", transport=httpx.ASGITransport(app=fake))
+
+    async def run():
+        text = await router.complete("hello")
+        chunks = [c async for c in router.stream("hello again")]
+        await router.aclose()
+        return text, chunks
+
+    text, chunks = asyncio.run(run())
+    assert text == "tok0 tok1 tok2 tok3 "
+    assert chunks == ["tok0 ", "tok1 ", "tok2 ", "tok3 "]
+    assert fake.state.requests == 2
+
+
+def test_percentiles_and_regression_compare():
+    stats = percentiles([0.001 * i for i in range(1, 101)])
+    assert stats["p50_ms"] == 50 and stats["p99_ms"] == 99 and stats["count"] == 100
+
+    old = [{"benchmark": "b", "search": {"p50_ms": 10.0, "max_ms": 10.0}, "throughput_rps": 100.0, "docs": 5}]
+    new = [{"benchmark": "b", "search": {"p50_ms": 13.0, "max_ms": 90.0}, "throughput_rps": 120.0, "docs": 50}]
+    regressions = compare(old, new, tolerance=0.2)
+    assert len(regressions) == 1 and "b.search.p50_ms" in regressions[0]
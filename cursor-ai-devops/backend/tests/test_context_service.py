@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from git import Repo
+
+from app.context.context_service import ProjectContextService, parse_porcelain
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "watcher event not seen"
+        time.sleep(0.02)
+
+
+def _pending(service: ProjectContextService) -> bool:
+    return service._head_stale or service._status_stale or bool(service._paths)
+
+
+def test_git_context_is_cached_and_updated_from_watcher_events(tmp_path):
+    repo = Repo.init(tmp_path)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Dev").set_value("user", "email", "dev@example.com")
+    (tmp_path / "a.txt").write_text("a\n")
+    repo.index.add(["a.txt"])
+    repo.index.commit("initial commit")
+
+    service = ProjectContextService(str(tmp_path))
+    assert service.start_watching()
+
+    async def scenario():
+        first = await service.summarize()
+        assert first["git"]["dirty"] is False
+        assert first["git"]["recent_commits"][0]["subject"] == "initial commit"
+        assert await service.summarize() is first  # cached: no git call at all
+        assert service.full_refreshes == 1
+
+        (tmp_path / "b.txt").write_text("b\n")
+        await asyncio.to_thread(_wait_for, lambda: _pending(service))
+        edited = await service.summarize()
+        assert edited["git"]["changed_files"] == [{"path": "b.txt", "status": "??"}]
+        # Only the touched path was re-checked
+        assert (service.full_refreshes, service.path_refreshes) == (1, 1)
+        assert "b.txt (??)" in await service.prompt_text()
+        checkout, changes = await service.prompt_parts()
+        assert "b.txt" not in checkout and changes == "Uncommitted changes: b.txt (??)"
+
+        repo.git.add("b.txt")
+        repo.git.commit("-m", "add b")
+        await asyncio.to_thread(_wait_for, lambda: service._head_stale and service._status_stale)
+        committed = await service.summarize()
+        assert committed["git"]["dirty"] is False
+        assert committed["git"]["recent_commits"][0]["subject"] == "add b"
+        assert committed["git"]["head"] != first["git"]["head"]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        service.stop_watching()
+
+
+def test_git_context_outside_a_repo_and_porcelain_parsing(tmp_path):
+    service = ProjectContextService(str(tmp_path))
+    assert asyncio.run(service.summarize())["git"] == {"status": "not_a_git_repo"}
+    assert asyncio.run(service.prompt_text()) == ""
+    assert not service.start_watching()
+
+    output = " M app/main.py\0R  new.py\0old.py\0?? notes.txt\0"
+    assert parse_porcelain(output) == {"app/main.py": "M", "new.py": "R", "notes.txt": "??"}
@@ -0,0 +1,53 @@
+import asyncio
+
+from app.context.conversation import ContextBuilder, estimate_tokens
+from app.models.router import ModelRouter
+from app.storage import db
+from app.storage.history import ChatHistory
+
+
+def test_estimate_tokens_is_roughly_chars_over_four():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("kubectl get pods -n prod") == 7
+    text = "The deployment rolled back because the readiness probe failed. " * 20
+    assert 200 <= estimate_tokens(text) <= 300
+
+
+def test_context_stays_within_budget_and_summarizes_old_turns(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_URL", f"sqlite:///{tmp_path / 'chat.db'}")
+    monkeypatch.setattr(db, "_async_engine", None)
+    monkeypatch.setenv("PROVIDER", "none")
+    monkeypatch.setenv("CHAT_CONTEXT_TOKENS", "80")
+    monkeypatch.setenv("CHAT_SUMMARY_TOKENS", "40")
+    monkeypatch.setenv("CHAT_SUMMARY_TRIGGER", "20")
+
+    async def scenario():
+        history = ChatHistory()
+        await history.start()
+        router = ModelRouter()
+        builder = ContextBuilder(history, router)
+        try:
+            cid = await history.create_conversation("long session")
+            for i in range(30):
+                await history.append(cid, "user" if i % 2 == 0 else "assistant", f"turn {i} about service-{i} rollout")
+            prompt = (await builder.build(cid, "what next?")).text()
+            assert "turn 29" in prompt and "turn 0 " not in prompt
+            assert prompt.endswith("User: what next?\nAssistant:")
+            assert estimate_tokens(prompt) < 80 + 40
+            await asyncio.gather(*builder._tasks)
+
+            # The summary is cached, persisted and included in the next prompt
+            summary, until_id = builder._summaries[cid]
+            assert summary and until_id > 0 and estimate_tokens(summary) <= 40
+            assert (await history.get_summary(cid)).summary == summary
+            built = await builder.build(cid, "and then?")
+            assert built.context.startswith("Summary of the earlier conversation")  # part of the cached prefix
+            prompt = built.text()
+            assert "Summary of the earlier conversation" in prompt
+            assert estimate_tokens(prompt) < 80 + 40
+        finally:
+            await builder.aclose()
+            await router.aclose()
+            await history.aclose()
+
+    asyncio.run(scenario())
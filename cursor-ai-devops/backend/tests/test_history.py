@@ -0,0 +1,77 @@
+import asyncio
+import sqlite3
+
+from app.storage import db
+from app.storage.history import ChatHistory
+
+
+def test_history_batches_writes_and_reads_back(tmp_path, monkeypatch):
+    path = tmp_path / "chat.db"
+    monkeypatch.setattr(db, "DATABASE_URL", f"sqlite:///{path}")
+    monkeypatch.setattr(db, "_async_engine", None)
+
+    async def scenario():
+        history = ChatHistory()
+        await history.start()
+        try:
+            cid = await history.create_conversation("hello")
+            for i in range(10):
+                await history.append(cid, "user" if i % 2 == 0 else "assistant", f"m{i}")
+            messages = await history.messages(cid, limit=4)
+            assert [m.content for m in messages] == ["m6", "m7", "m8", "m9"]
+            # The burst was committed in far fewer transactions than messages
+            assert history.written == 10 and history.batches < 10
+            assert await history.messages(cid + 1) == []
+        finally:
+            await history.aclose()
+
+    asyncio.run(scenario())
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list('message')")}
+    assert "ix_message_conversation_id" in indexes
+    conn.close()
+
+
+def test_reads_wait_only_for_their_own_conversation_and_bad_batches_are_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_URL", f"sqlite:///{tmp_path / 'chat.db'}")
+    monkeypatch.setattr(db, "_async_engine", None)
+    monkeypatch.setenv("HISTORY_FLUSH_INTERVAL", "0")
+
+    async def scenario():
+        history = ChatHistory()
+        await history.start()
+        write = history._write
+        release = asyncio.Event()
+        failures = {"flaky": 1, "broken": 2}
+
+        async def guarded_write(batch):
+            contents = {content for _, _, content in batch}
+            if "slow" in contents:
+                await release.wait()
+            for content in contents & failures.keys():
+                if failures[content]:
+                    failures[content] -= 1
+                    raise RuntimeError(content)
+            await write(batch)
+
+        history._write = guarded_write
+        try:
+            quiet, busy = await history.create_conversation("quiet"), await history.create_conversation("busy")
+            await history.append(quiet, "user", "hi")
+            await history.messages(quiet)
+            await history.append(busy, "user", "slow")
+            # The busy conversation's write is stuck; the quiet one still reads at once
+            assert [m.content for m in await asyncio.wait_for(history.messages(quiet), 1)] == ["hi"]
+            release.set()
+            assert [m.content for m in await history.messages(busy)] == ["slow"]
+
+            await history.append(quiet, "user", "flaky")
+            assert [m.content for m in await history.messages(quiet)] == ["hi", "flaky"]  # retried
+            await history.append(busy, "user", "broken")
+            assert [m.content for m in await history.messages(busy)] == ["slow"]
+            assert history.failed == 1 and not history._last
+        finally:
+            await history.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from app.context.ingestion import WorkspaceIngestor, chunk_lines
+from app.context.workspace_index import WorkspaceIndex
+from app.rag.vectorstore import VectorStore
+
+
+def test_chunk_lines_overlap():
+    text = "\n".join(f"l{i}" for i in range(10))
+    chunks = chunk_lines(text, size=4, overlap=1)
+    assert [(s, e) for s, e, _ in chunks] == [(1, 4), (4, 7), (7, 10)]
+
+
+def test_incremental_sync(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    monkeypatch.setenv("RAG_CHUNK_LINES", "2")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    ws = tmp_path / "ws"
+    (ws / "k8s").mkdir(parents=True)
+    (ws / "node_modules").mkdir()
+    (ws / "node_modules" / "x.js").write_text("ignored")
+    (ws / "k8s" / "deploy.yaml").write_text("kind: Deployment\nname: api\nimage: api:1.2\n")
+    (ws / "README.md").write_text("payments runbook\n")
+
+    store = VectorStore()
+    ingestor = WorkspaceIngestor(str(ws), store)
+    assert ingestor.sync() == {"indexed": 2, "unchanged": 0, "removed": 0, "chunks": 3}
+    assert sorted(store.index.ids) == ["README.md#0", "k8s/deploy.yaml#0", "k8s/deploy.yaml#1"]
+
+    # A fresh ingestor reuses the persisted manifest: nothing to do
+    again = WorkspaceIngestor(str(ws), VectorStore())
+    assert again.sync()["unchanged"] == 2
+
+    (ws / "k8s" / "deploy.yaml").write_text("kind: Deployment\n")
+    (ws / "README.md").unlink()
+    stats = again.sync_paths([str(ws / "k8s" / "deploy.yaml"), str(ws / "README.md")])
+    assert stats == {"indexed": 1, "unchanged": 0, "removed": 1, "chunks": 1}
+    assert VectorStore().index.ids == ["k8s/deploy.yaml#0"]
+
+
+def test_failed_add_is_retried_on_next_sync(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    ws = tmp_path / "ws"
+    ws.mkdir()
+    (ws / "app.py").write_text("print('hi')\n")
+    store = VectorStore()
+    ingestor = WorkspaceIngestor(str(ws), store)
+    add = store.add_documents
+
+    def failing(docs, save=True):
+        raise RuntimeError("embedder down")
+
+    monkeypatch.setattr(store, "add_documents", failing)
+    with pytest.raises(RuntimeError):
+        ingestor.sync()
+    assert "app.py" not in ingestor.manifest
+
+    monkeypatch.setattr(store, "add_documents", add)
+    assert ingestor.sync()["indexed"] == 1
+    assert store.index.ids == ["app.py#0"]
+
+    # Watcher flushes run on a timer thread: a failure keeps the paths queued
+    (ws / "app.py").write_text("print('bye')\n")
+    monkeypatch.setattr(store, "add_documents", failing)
+    ingestor._pending.add(str(ws / "app.py"))
+    ingestor._flush()
+    assert ingestor._pending == {str(ws / "app.py")}
+    monkeypatch.setattr(store, "add_documents", add)
+    ingestor._flush()
+    assert not ingestor._pending and "bye" in store.index.get_text("app.py#0")
+
+
+def test_watcher_keeps_the_symbol_index_current_outside_git(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    monkeypatch.setenv("RAG_WATCH_DEBOUNCE", "0.05")
+    ws = tmp_path / "ws"
+    ws.mkdir()  # not a git checkout
+    ingestor = WorkspaceIngestor(str(ws), VectorStore())
+    symbols = WorkspaceIndex(str(ws))
+    symbols.sync()
+    ingestor.add_listener(symbols.enqueue)
+    assert ingestor.start_watching()
+    try:
+        (ws / "tools.py").write_text("def rollout():\n    pass\n")
+        deadline = time.monotonic() + 5
+        while "tools.py" not in symbols.files and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        ingestor.stop_watching()
+        symbols.close()
+    assert [s[0] for _, s in symbols.related("rollout()")] == ["rollout"]
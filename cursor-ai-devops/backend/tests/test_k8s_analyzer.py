@@ -1,4 +1,5 @@
-from app.integrations.k8s.analyzer import analyze_manifest
+from app.integrations.k8s.analyzer import RuleEngine, analyze_manifest, split_documents
+from app.integrations.k8s.cache import FindingsCache
 
 
 def test_analyzer_flags_latest_and_no_resources():
@@ -26,3 +27,71 @@ spec:
     assert "resources-requests-limits-required" in rules
 
 
+def test_rule_engine_disable_and_severity_override():
+    manifest = """
+apiVersion: v1
+kind: Pod
+metadata:
+  name: p
+spec:
+  hostNetwork: true
+  containers:
+  - name: c
+    image: nginx:latest
+    """
+    engine = RuleEngine(disabled=["image-tag-not-latest"], severity_overrides={"no-host-network": "critical"})
+    findings = analyze_manifest(manifest, engine)
+    rules = {f["rule"]: f["severity"] for f in findings}
+    assert "image-tag-not-latest" not in rules
+    assert rules["no-host-network"] == "critical"
+    assert rules["run-as-non-root"] == "high"
+
+
+def test_parallel_matches_sequential(monkeypatch):
+    doc = """---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app-{i}
+spec:
+  template:
+    spec:
+      containers:
+      - name: c
+        image: nginx:{tag}
+"""
+    manifest = "".join(doc.format(i=i, tag="latest" if i % 2 else "1.25") for i in range(40))
+    monkeypatch.setenv("K8S_BATCH_BYTES", "500")
+    monkeypatch.setenv("K8S_ANALYZE_WORKERS", "2")
+    assert len(split_documents(manifest, 500)) > 1
+    assert analyze_manifest(manifest, parallel=True) == analyze_manifest(manifest, parallel=False)
+
+
+def test_cache_skips_unchanged_documents(tmp_path):
+    base = """---
+kind: Pod
+metadata:
+  name: a
+spec:
+  containers:
+  - name: c
+    image: nginx:latest
+---
+kind: Pod
+metadata:
+  name: b
+spec:
+  containers:
+  - {name: c, image: "nginx:1.25"}
+"""
+    cache = FindingsCache(path=str(tmp_path / "findings.db"))
+    expected = analyze_manifest(base)
+    first: dict = {}
+    assert analyze_manifest(base, cache=cache, stats=first) == expected
+    assert first == {"documents": 2, "cache_hits": 0}
+
+    # Same first doc, second doc reformatted only: both come from cache
+    reformatted = base.replace('  - {name: c, image: "nginx:1.25"}', "  - image: nginx:1.25\n    name: c")
+    second: dict = {}
+    assert analyze_manifest(reformatted, cache=FindingsCache(path=str(tmp_path / "findings.db")), stats=second) == expected
+    assert second == {"documents": 2, "cache_hits": 2}
@@ -0,0 +1,131 @@
+import asyncio
+import io
+import tarfile
+import zipfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import router
+from app.integrations.k8s.analyzer import shutdown_pool
+from app.integrations.k8s.bulk import (
+    ArchiveTooLargeError,
+    _archive_sources,
+    analyze_archive_bytes,
+    analyze_target,
+    collect_sources,
+)
+
+POD = """
+apiVersion: v1
+kind: Pod
+metadata:
+  name: {name}
+spec:
+  hostNetwork: true
+  containers:
+  - name: c
+    image: nginx:latest
+"""
+
+
+def test_bulk_directory_aggregates_per_file(tmp_path):
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "a.yaml").write_text(POD.format(name="a"))
+    (tmp_path / "nested" / "b.yml").write_text(POD.format(name="b") + "---\n" + POD.format(name="c"))
+    (tmp_path / "README.md").write_text("not a manifest")
+    try:
+        result = asyncio.run(analyze_target(str(tmp_path)))
+    finally:
+        shutdown_pool()
+    files = {entry["file"]: entry for entry in result["files"]}
+    assert set(files) == {"a.yaml", "nested/b.yml"}
+    assert files["nested/b.yml"]["count"] == 2 * files["a.yaml"]["count"]
+    summary = result["summary"]
+    assert summary["files"] == 2 and summary["errors"] == 0
+    assert summary["by_rule"]["no-host-network"] == 3
+    assert sum(summary["by_severity"].values()) == summary["findings"]
+
+
+def test_bulk_archive_and_glob(tmp_path):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("k8s/pod.yaml", POD.format(name="z"))
+        zf.writestr("k8s/broken.yaml", "a: [unclosed")
+        zf.writestr("notes.txt", "ignored")
+    try:
+        result = asyncio.run(analyze_archive_bytes(buf.getvalue()))
+    finally:
+        shutdown_pool()
+    files = {entry["file"]: entry for entry in result["files"]}
+    assert set(files) == {"k8s/pod.yaml", "k8s/broken.yaml"}
+    assert "error" in files["k8s/broken.yaml"]
+    assert result["summary"]["errors"] == 1
+
+    (tmp_path / "x.yaml").write_text(POD.format(name="x"))
+    (tmp_path / "y.json").write_text("{}")
+    assert [name for name, _ in collect_sources(str(tmp_path / "*"))] == [(tmp_path / "x.yaml").as_posix()]
+
+
+def test_http_bulk_targets_stay_inside_the_configured_root(tmp_path, monkeypatch):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+    root = tmp_path / "manifests"
+    root.mkdir()
+    (root / "a.yaml").write_text(POD.format(name="a"))
+    (tmp_path / "secret.yaml").write_text(POD.format(name="s"))
+    (root / "escape.yaml").symlink_to(tmp_path / "secret.yaml")
+
+    monkeypatch.delenv("K8S_BULK_ROOT", raising=False)
+    assert client.post("/api/k8s/analyze/bulk", json={"target": str(root)}).status_code == 403
+
+    monkeypatch.setenv("K8S_BULK_ROOT", str(root))
+    for target in (str(tmp_path), "../secret.yaml", "../*.yaml"):
+        assert client.post("/api/k8s/analyze/bulk", json={"target": target}).status_code == 403
+    try:
+        for target in (".", "*.yaml", "**/*.yaml"):
+            files = client.post("/api/k8s/analyze/bulk", json={"target": target}).json()["files"]
+            assert [entry["file"] for entry in files] == ["a.yaml"]  # the symlink out is skipped
+    finally:
+        shutdown_pool()
+
+
+def test_archive_limits_count_decompressed_bytes_and_entries(monkeypatch):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(4):
+            zf.writestr(f"bomb{i}.yaml", "a" * 100_000)  # compresses to a few hundred bytes
+    data = buf.getvalue()
+    assert len(data) < 5_000
+
+    assert len(_archive_sources(data, max_bytes=200_000)) == 4
+    assert _archive_sources(data, max_bytes=50_000) == []  # each member over the per-file cap
+    with pytest.raises(ArchiveTooLargeError):
+        _archive_sources(data, max_bytes=200_000, max_total=250_000)
+    with pytest.raises(ArchiveTooLargeError):
+        _archive_sources(data, max_bytes=200_000, max_members=3)
+
+    # A tar has to be decompressed whole: members that are not manifests count too
+    for compression in ("gz", "bz2", "xz"):
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode=f"w:{compression}") as tf:
+            for name, body in (("pod.yaml", POD.format(name="p").encode()), ("blob.bin", bytes(300_000))):
+                info = tarfile.TarInfo(name)
+                info.size = len(body)
+                tf.addfile(info, io.BytesIO(body))
+        tar = buf.getvalue()
+        assert [name for name, _ in _archive_sources(tar, max_bytes=200_000)] == ["pod.yaml"]
+        with pytest.raises(ArchiveTooLargeError):
+            _archive_sources(tar, max_bytes=200_000, max_total=250_000)
+    with pytest.raises(tarfile.ReadError):
+        _archive_sources(b"\x1f\x8b not really gzip", max_bytes=200_000)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+    monkeypatch.setenv("K8S_BULK_MAX_TOTAL_BYTES", "250000")
+    assert client.post("/api/k8s/analyze/archive", content=data).status_code == 413
+    monkeypatch.setenv("K8S_BULK_MAX_UPLOAD_BYTES", "1000")
+    assert client.post("/api/k8s/analyze/archive", content=data).status_code == 413
@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlmodel import create_engine
+
+from app.models.cache import ResponseCache, cache_key
+import app.storage.db as db
+
+
+def test_cache_key_normalizes_whitespace_but_keeps_indentation():
+    a = cache_key("ollama", "llama3:8b", 0.2, "def f():\r\n    return 1   \n")
+    b = cache_key("ollama", "llama3:8b", 0.2, "def f():\n    return 1")
+    c = cache_key("ollama", "llama3:8b", 0.2, "def f():\nreturn 1")
+    assert a == b
+    assert a != c
+    assert a != cache_key("ollama", "llama3:8b", 0.7, "def f():\n    return 1")
+
+
+def test_memory_lru_eviction_and_ttl(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_MAX_ENTRIES", "2")
+    cache = ResponseCache()
+
+    async def run():
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        assert await cache.get("a") == "1"  # touch a so b is least recent
+        await cache.set("c", "3")
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "1"
+        cache._memory["a"] = ("1", 0.0)  # force expiry
+        assert await cache.get("a") is None
+
+    asyncio.run(run())
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_sqlite_tier_survives_memory_clear(monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "engine", create_engine(f"sqlite:///{tmp_path / 'cache.db'}"))
+    monkeypatch.setenv("LLM_CACHE_SQLITE", "1")
+    monkeypatch.setenv("LLM_CACHE_SQLITE_MAX_ENTRIES", "2")
+    cache = ResponseCache()
+
+    async def run():
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.set("c", "3")
+        cache.clear()
+        assert await cache.get("c") == "3"
+        assert await cache.get("a") is None
+
+    asyncio.run(run())
+    assert cache.sqlite_hits == 1
@@ -0,0 +1,194 @@
+import asyncio
+import sys
+import textwrap
+import time
+
+from prometheus_client import REGISTRY
+
+from app.lsp.client import position_at, text_edit
+from app.lsp.manager import LspManager
+
+# Minimal incremental-sync language server: completes the word before the cursor
+FAKE_SERVER = textwrap.dedent(
+    r'''
+    import json, sys
+
+    docs, stats = {}, {"completions": 0, "changes": []}
+
+    def read():
+        length = None
+        while True:
+            line = sys.stdin.buffer.readline()
+            if not line:
+                sys.exit(0)
+            if not line.strip():
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        return json.loads(sys.stdin.buffer.read(length))
+
+    def send(msg):
+        body = json.dumps(dict(jsonrpc="2.0", **msg)).encode()
+        sys.stdout.buffer.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        sys.stdout.buffer.flush()
+
+    def offset(text, pos):
+        lines = text.split("\n")
+        return sum(len(l) + 1 for l in lines[: pos["line"]]) + pos["character"]
+
+    while True:
+        msg = read()
+        method, params = msg.get("method"), msg.get("params") or {}
+        if method == "initialize":
+            send({"id": "cfg", "method": "workspace/configuration", "params": {"items": [{}]}})
+            send({"id": msg["id"], "result": {"capabilities": {"textDocumentSync": 2, "completionProvider": {}}}})
+        elif method == "textDocument/didOpen":
+            docs[params["textDocument"]["uri"]] = params["textDocument"]["text"]
+        elif method == "textDocument/didChange":
+            uri = params["textDocument"]["uri"]
+            for change in params["contentChanges"]:
+                stats["changes"].append(change["text"])
+                r = change["range"]
+                text = docs[uri]
+                docs[uri] = text[: offset(text, r["start"])] + change["text"] + text[offset(text, r["end"]):]
+        elif method == "textDocument/completion":
+            stats["completions"] += 1
+            text = docs[params["textDocument"]["uri"]]
+            word = text[: offset(text, params["position"])].split()[-1].split(".")[-1]
+            items = [{"label": word + suffix, "sortText": suffix} for suffix in ("_b", "_a")]
+            send({"id": msg["id"], "result": {"isIncomplete": False, "items": items}})
+        elif method == "fake/stats":
+            send({"id": msg["id"], "result": {**stats, "docs": docs}})
+        elif method == "shutdown":
+            send({"id": msg["id"], "result": None})
+        elif method == "exit":
+            sys.exit(0)
+    '''
+)
+
+
+def test_text_edit_is_the_minimal_range():
+    old, new = "import os\nos.pa\n", "import os\nos.path\n"
+    assert text_edit(old, new) == {
+        "range": {"start": {"line": 1, "character": 5}, "end": {"line": 1, "character": 5}},
+        "text": "th",
+    }
+    assert position_at("a\n😀b", 4) == {"line": 1, "character": 3}  # UTF-16 units
+
+
+def test_pooled_server_syncs_incrementally_and_caches(tmp_path, monkeypatch):
+    script = tmp_path / "fake_lsp.py"
+    script.write_text(FAKE_SERVER)
+    monkeypatch.setenv("LSP_SERVER_PYTHON", f"{sys.executable} {script}")
+    monkeypatch.setenv("LSP_SERVER_GO", "no-such-language-server")
+    manager = LspManager(str(tmp_path))
+
+    async def scenario():
+        await manager.start()
+        try:
+            first, other = await asyncio.gather(
+                manager.request_completion("py", "import os\nos.pa", "a.py"),
+                manager.request_completion("python", "x = valu", "b.py"),
+            )
+            assert [i["label"] for i in first] == ["pa_a", "pa_b"]
+            assert other[0]["insert_text"] == "valu_a"
+            assert len(manager.servers) == 1  # both files, one process
+
+            edited = await manager.request_completion("python", "import os\nos.pat", "a.py")
+            assert edited[0]["label"] == "pat_a"
+            again = await manager.request_completion("python", "import os\nos.pat", "a.py")
+            assert again == edited
+
+            client = next(iter(manager.servers.values()))
+            stats = await client.request("fake/stats", None, 5)
+            assert stats["changes"] == ["t"]  # a delta, not the whole document
+            assert stats["completions"] == 3  # the repeat came from the cache
+            assert await manager.request_completion("go", "package main", "main.go") == []
+        finally:
+            await manager.aclose()
+        assert not manager.servers and not client.alive
+
+    asyncio.run(scenario())
+
+
+def test_unknown_languages_and_evicted_documents_leave_no_state(tmp_path, monkeypatch):
+    script = tmp_path / "fake_lsp.py"
+    script.write_text(FAKE_SERVER)
+    monkeypatch.setenv("LSP_SERVER_PYTHON", f"{sys.executable} {script}")
+    monkeypatch.setenv("LSP_MAX_DOCUMENTS", "1")
+    manager = LspManager(str(tmp_path))
+
+    async def scenario():
+        await manager.start()
+        try:
+            assert await manager.request_completion("brainf*ck-{{ random }}", "x") == []
+            assert not manager._unavailable and not manager.servers
+            await manager.request_completion("python", "a = 1\na", "a.py")
+            await manager.request_completion("python", "b = 1\nb", "b.py")  # closes a.py
+            assert [uri.rsplit("/", 1)[-1] for uri in manager._document_locks] == ["b.py"]
+        finally:
+            await manager.aclose()
+        assert not manager._document_locks
+
+    asyncio.run(scenario())
+    labels = {"language": "brainf*ck-{{ random }}", "outcome": "unavailable"}
+    assert REGISTRY.get_sample_value("lsp_completions_total", labels) is None
+
+
+def test_cold_start_is_bounded_by_the_completion_timeout_and_failures_retry(tmp_path, monkeypatch):
+    script = tmp_path / "fake_lsp.py"
+    script.write_text(FAKE_SERVER)
+    slow = tmp_path / "slow_lsp.py"
+    slow.write_text("import runpy, sys, time\ntime.sleep(1)\nrunpy.run_path(sys.argv[1], run_name='__main__')\n")
+    monkeypatch.setenv("LSP_SERVER_PYTHON", f"{sys.executable} {slow} {script}")
+    monkeypatch.setenv("LSP_SERVER_GO", "no-such-language-server")
+    monkeypatch.setenv("LSP_TIMEOUT", "0.3")
+    monkeypatch.setenv("LSP_RETRY_SECONDS", "0.2")
+    manager = LspManager(str(tmp_path))
+
+    async def until_ready(language, code):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            items = await manager.request_completion(language, code, "a.py")
+            if items:
+                return items
+            await asyncio.sleep(0.05)
+        return []
+
+    async def scenario():
+        await manager.start()
+        try:
+            started = time.monotonic()
+            assert await manager.request_completion("python", "x = val", "a.py", wait_for_start=False) == []
+            assert time.monotonic() - started < 0.2  # only a running server is asked
+            assert len(manager._starting) == 1
+            started = time.monotonic()
+            assert await manager.request_completion("python", "x = valu", "a.py") == []
+            assert time.monotonic() - started < 0.9  # did not wait for the server
+            assert (await until_ready("python", "x = valu"))[0]["label"] == "valu_a"
+
+            assert await manager.request_completion("go", "package main") == []
+            assert "go" in manager._unavailable
+            monkeypatch.setenv("LSP_SERVER_GO", f"{sys.executable} {script}")
+            assert await manager.request_completion("go", "package ma") == []  # still cooling down
+            await asyncio.sleep(0.3)
+            assert (await until_ready("go", "package ma"))[0]["label"] == "ma_a"
+            assert "go" not in manager._unavailable
+        finally:
+            await manager.aclose()
+        assert not manager._starting
+
+    asyncio.run(scenario())
+    assert not LspManager().enabled  # no workspace: never rooted at the CWD
+
+
+def test_documents_outside_the_workspace_never_root_a_server(tmp_path):
+    workspace = tmp_path / "ws"
+    (workspace / "src").mkdir(parents=True)
+    (workspace / "escape").symlink_to(tmp_path)
+    manager = LspManager(str(workspace))
+    untitled = (workspace / ".untitled.py").as_uri()
+
+    assert manager._document("python", "src/a.py") == (workspace, (workspace / "src" / "a.py").as_uri())
+    for outside in ("/etc/passwd", str(tmp_path / "b.py"), "../b.py", "src/../../b.py", "escape/b.py"):
+        assert manager._document("python", outside) == (workspace, untitled)
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.models.router import ModelRouter
+from app.observability.middleware import MetricsMiddleware
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    path = "/metrics-test/items/{item_id}"
+    before = _sample("http_requests_total", method="GET", path=path, status="200")
+    client.get("/metrics-test/items/1")
+    client.get("/metrics-test/items/2")
+    assert _sample("http_requests_total", method="GET", path=path, status="200") == before + 2
+    assert _sample("http_request_duration_seconds_count", method="GET", path=path) >= 2
+    unmatched = _sample("http_requests_total", method="GET", path="unmatched", status="404")
+    client.get("/metrics-test/nowhere")
+    assert _sample("http_requests_total", method="GET", path="unmatched", status="404") == unmatched + 1
+
+
+def test_router_records_latency_ttft_tokens_and_errors(monkeypatch):
+    monkeypatch.setenv("PROVIDER", "ollama")
+    monkeypatch.setenv("OLLAMA_MODEL", "metrics-test")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    fail = {"on": False}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if fail["on"]:
+            return httpx.Response(500)
+        if json.loads(request.content)["stream"]:
+            lines = [
+                {"message": {"role": "assistant", "content": "a"}, "done": False},
+                {"message": {"role": "assistant", "content": ""}, "done": True, "prompt_eval_count": 7, "eval_count": 3},
+            ]
+            return httpx.Response(200, text="\n".join(json.dumps(line) for line in lines) + "\n")
+        message = {"role": "assistant", "content": "ok"}
+        return httpx.Response(200, json={"message": message, "prompt_eval_count": 5, "eval_count": 2})
+
+    router = ModelRouter()
+    router._ollama_client = httpx.AsyncClient(base_url=router.ollama_host, transport=httpx.MockTransport(handler))
+    labels = {"provider": "ollama", "model": "metrics-test"}
+
+    async def run():
+        await router.complete("one")
+        assert [c async for c in router.stream("two")] == ["a"]
+        fail["on"] = True
+        try:
+            await router.complete("three")
+        except httpx.HTTPStatusError:
+            pass
+        await router.aclose()
+
+    asyncio.run(run())
+    assert _sample("llm_latency_seconds_count", mode="complete", **labels) == 1
+    assert _sample("llm_latency_seconds_count", mode="stream", **labels) == 1
+    assert _sample("llm_ttft_seconds_count", **labels) == 1
+    assert _sample("llm_tokens_total", kind="prompt", **labels) == 12
+    assert _sample("llm_tokens_total", kind="completion", **labels) == 5
+    assert _sample("llm_errors_total", error="HTTPStatusError", **labels) == 1
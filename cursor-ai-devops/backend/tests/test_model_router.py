@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import httpx
+
+from app.models.router import ModelRouter
+
+
+def _ollama_router(monkeypatch, handler) -> ModelRouter:
+    monkeypatch.setenv("PROVIDER", "ollama")
+    router = ModelRouter()
+    router._ollama_client = httpx.AsyncClient(
+        base_url=router.ollama_host, transport=httpx.MockTransport(handler)
+    )
+    return router
+
+
+def test_ollama_client_is_reused_and_closed(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": "ok"}})
+
+    router = _ollama_router(monkeypatch, handler)
+
+    async def run():
+        client = router._get_ollama()
+        assert await router.complete("a") == "ok"
+        assert await router.complete("b") == "ok"
+        assert router._get_ollama() is client
+        await router.aclose()
+        assert client.is_closed
+        assert router._ollama_client is None
+
+    asyncio.run(run())
+    assert calls == ["/api/chat", "/api/chat"]
+
+
+def test_ollama_stream_yields_chunks(monkeypatch):
+    lines = [
+        {"message": {"role": "assistant", "content": "Hel"}, "done": False},
+        {"message": {"role": "assistant", "content": "lo"}, "done": False},
+        {"message": {"role": "assistant", "content": ""}, "done": True},
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert b'"stream": true' in request.content or b'"stream":true' in request.content
+        body = "\n".join(json.dumps(line) for line in lines) + "\n"
+        return httpx.Response(200, text=body)
+
+    router = _ollama_router(monkeypatch, handler)
+
+    async def run():
+        return [chunk async for chunk in router.stream("hi")]
+
+    assert asyncio.run(run()) == ["Hel", "lo"]
+
+
+def test_complete_serves_repeats_from_cache(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": "cached"}})
+
+    router = _ollama_router(monkeypatch, handler)
+
+    async def run():
+        assert await router.complete("same prompt") == "cached"
+        assert await router.complete("same prompt\n") == "cached"
+
+    asyncio.run(run())
+    assert len(calls) == 1
+    assert router.cache.hits == 1
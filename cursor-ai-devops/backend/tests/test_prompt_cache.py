@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from prometheus_client import REGISTRY
+
+from app.agents.orchestrator import SUGGEST_SYSTEM_PROMPT, AgentsOrchestrator
+from app.models.prompt import Prompt
+from app.models.router import ModelRouter
+from benchmarks.fake_ollama import create_app
+
+CHAT = Prompt(
+    "You are a DevOps assistant.",
+    "Summary of the earlier conversation:\nrolled out v2",
+    (("assistant", "stray"), ("user", "why did it fail?"), ("assistant", "probe timeout"), ("user", "fix it")),
+)
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_anthropic_gets_cache_breakpoints_and_reports_cached_tokens(monkeypatch):
+    monkeypatch.setenv("PROVIDER", "anthropic")
+    monkeypatch.setenv("ANTHROPIC_MODEL", "cache-test")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        usage = SimpleNamespace(input_tokens=12, output_tokens=3, cache_read_input_tokens=900, cache_creation_input_tokens=0)
+        return SimpleNamespace(content=[SimpleNamespace(text="done")], usage=usage)
+
+    router = ModelRouter()
+    router._anthropic_client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    before = _sample("llm_tokens_total", provider="anthropic", model="cache-test", kind="cached")
+    assert asyncio.run(router.complete(CHAT)) == "done"
+
+    request = calls[0]
+    assert [block["cache_control"] for block in request["system"]] == [{"type": "ephemeral"}] * 2
+    assert [m["role"] for m in request["messages"]] == ["user", "assistant", "user"]  # leading assistant dropped
+    assert "cache_control" in request["messages"][1]["content"][0]  # history up to the new turn
+    assert "cache_control" not in request["messages"][2]["content"][0]
+    assert _sample("llm_tokens_total", provider="anthropic", model="cache-test", kind="cached") == before + 900
+
+
+def test_openai_uses_roles_and_a_stable_prompt_cache_key(monkeypatch):
+    monkeypatch.setenv("PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_MODEL", "cache-test")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        usage = SimpleNamespace(prompt_tokens=1500, completion_tokens=4, prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage)
+
+    router = ModelRouter()
+    router._openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    before = _sample("llm_tokens_total", provider="openai", model="cache-test", kind="cached")
+
+    async def run():
+        await router.complete(CHAT)
+        await router.complete(CHAT._replace(messages=(("user", "something else"),)))
+
+    asyncio.run(run())
+    first, second = calls
+    assert first["messages"][0] == {"role": "system", "content": f"{CHAT.system}\n\n{CHAT.context}"}
+    assert [m["role"] for m in first["messages"][1:]] == ["assistant", "user", "assistant", "user"]
+    assert first["extra_body"]["prompt_cache_key"] == second["extra_body"]["prompt_cache_key"]
+    assert _sample("llm_tokens_total", provider="openai", model="cache-test", kind="cached") == before + 2048
+
+
+def test_suggestions_share_a_prefix_that_ollama_reuses(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROVIDER", "ollama")
+    monkeypatch.setenv("OLLAMA_MODEL", "prefix-test")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    fake = create_app(latency=0.0, tokens_per_second=0, tokens=2)
+    orchestrator = AgentsOrchestrator()
+    router = orchestrator.model_router
+    router._ollama_client = httpx.AsyncClient(base_url="http://fake", transport=httpx.ASGITransport(app=fake))
+
+    async def run():
+        first = await orchestrator._suggest_prompt("python", "import os", "a.py", None)
+        second = await orchestrator._suggest_prompt("python", "import sys", "b.py", None)
+        await orchestrator.suggest_code("python", "x = 1" * 400, "a.py")
+        evaluated = _sample("llm_tokens_total", provider="ollama", model="prefix-test", kind="prompt")
+        await orchestrator.suggest_code("python", "x = 1" * 400 + "\ny = 2", "a.py")
+        await orchestrator.aclose()
+        return first, second, _sample("llm_tokens_total", provider="ollama", model="prefix-test", kind="prompt") - evaluated
+
+    first, second, evaluated = asyncio.run(run())
+    assert first.system == second.system == SUGGEST_SYSTEM_PROMPT and first.context == second.context
+    assert first.messages != second.messages
+    assert first.chat_messages()[0]["role"] == "system" and first.chat_messages()[-1]["role"] == "user"
+    assert fake.state.requests == 2
+    assert evaluated < 10  # the repeated prefix was not evaluated again
+
+
+def test_uncommitted_changes_stay_out_of_the_cached_prefix(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    saves = iter(["Uncommitted changes: a.py (M)", "Uncommitted changes: a.py (M), b.py (??)"])
+
+    async def prompt_parts():
+        return "Repository: branch main at abc123", next(saves)
+
+    orchestrator = AgentsOrchestrator()
+    orchestrator.project_context = SimpleNamespace(prompt_parts=prompt_parts)
+
+    async def run():
+        prompts = [await orchestrator._suggest_prompt("python", "x", "a.py", None) for _ in range(2)]
+        await orchestrator.aclose()
+        return prompts
+
+    first, second = asyncio.run(run())
+    assert first.context == second.context == "Repository: branch main at abc123"
+    assert second.messages[0][1].startswith("Uncommitted changes: a.py (M), b.py (??)\n\n")
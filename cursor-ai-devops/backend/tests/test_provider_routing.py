@@ -0,0 +1,84 @@
+import asyncio
+
+from app.models.router import ModelRouter
+
+
+def _router(monkeypatch, fake, **env) -> ModelRouter:
+    monkeypatch.setenv("PROVIDERS", "ollama,openai")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    router = ModelRouter()
+    monkeypatch.setattr(router, "_complete_uncached", fake)
+    return router
+
+
+def test_falls_back_and_opens_circuit(monkeypatch):
+    calls = []
+
+    async def fake(provider: str, prompt: str) -> str:
+        calls.append(provider)
+        if provider == "ollama":
+            raise RuntimeError("cold start")
+        return "from openai"
+
+    router = _router(monkeypatch, fake, MODEL_BREAKER_FAILURES="2")
+
+    async def run():
+        for i in range(3):
+            assert await router.complete(f"q{i}") == "from openai"
+
+    asyncio.run(run())
+    # The third request skips ollama because its circuit is open
+    assert calls == ["ollama", "openai", "ollama", "openai", "openai"]
+    assert router.health["ollama"].state == "open"
+
+
+def test_per_provider_timeout(monkeypatch):
+    async def fake(provider: str, prompt: str) -> str:
+        if provider == "ollama":
+            await asyncio.sleep(1)
+        return provider
+
+    router = _router(monkeypatch, fake, MODEL_TIMEOUT_OLLAMA="0.01")
+    assert asyncio.run(router.complete("q")) == "openai"
+
+
+def test_hedges_after_primary_p95(monkeypatch):
+    slow = False
+
+    async def fake(provider: str, prompt: str) -> str:
+        if provider == "ollama":
+            await asyncio.sleep(0.5 if slow else 0.001)
+        return provider
+
+    router = _router(monkeypatch, fake, MODEL_HEDGE="1")
+
+    async def run():
+        nonlocal slow
+        for i in range(5):
+            assert await router.complete(f"warm{i}") == "ollama"
+        slow = True
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await router.complete("hedged") == "openai"
+        assert loop.time() - started < 0.4
+
+    asyncio.run(run())
+
+
+def test_stream_falls_back_when_a_provider_queue_is_full(monkeypatch):
+    async def fake_stream(provider: str, prompt: str):
+        yield f"from {provider}"
+
+    router = _router(monkeypatch, None, MODEL_CONCURRENCY_OLLAMA="1", MODEL_QUEUE_DEPTH="0")
+    monkeypatch.setattr(router, "_stream_uncached", fake_stream)
+
+    async def run():
+        await router.scheduler.acquire("ollama")  # ollama busy, no room to wait
+        chunks = [chunk async for chunk in router.stream("q")]
+        router.scheduler.release("ollama")
+        return chunks
+
+    assert asyncio.run(run()) == ["from openai"]
+    assert router.scheduler.stats()["openai"]["active"] == 0
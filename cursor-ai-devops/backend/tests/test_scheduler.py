@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from app.models.scheduler import Priority, ProviderScheduler, QueueFullError
+
+
+def test_priority_order_and_queue_limit(monkeypatch):
+    monkeypatch.setenv("MODEL_CONCURRENCY_OLLAMA", "1")
+    monkeypatch.setenv("MODEL_QUEUE_DEPTH", "2")
+    scheduler = ProviderScheduler()
+    order = []
+
+    async def job(name: str, priority: Priority) -> None:
+        async with scheduler.slot("ollama", priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        holder = asyncio.create_task(job("first", Priority.SUGGEST))
+        await asyncio.sleep(0)
+        background = asyncio.create_task(job("background", Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        chat = asyncio.create_task(job("chat", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await scheduler.acquire("ollama", Priority.SUGGEST)
+        await asyncio.gather(holder, background, chat)
+
+    asyncio.run(run())
+    assert order == ["first", "chat", "background"]
+    assert scheduler.stats()["ollama"] == {"active": 0, "waiting": 0, "limit": 1}
+
+
+def test_cancelled_waiter_leaves_queue(monkeypatch):
+    monkeypatch.setenv("MODEL_CONCURRENCY_OLLAMA", "1")
+    scheduler = ProviderScheduler()
+
+    async def run():
+        await scheduler.acquire("ollama")
+        waiter = asyncio.create_task(scheduler.acquire("ollama"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.stats()["ollama"]["waiting"] == 0
+        scheduler.release("ollama")
+        assert scheduler.stats()["ollama"]["active"] == 0
+
+    asyncio.run(run())
+
+
+def test_release_before_cancelled_waiter_resumes(monkeypatch):
+    monkeypatch.setenv("MODEL_CONCURRENCY_OLLAMA", "1")
+    scheduler = ProviderScheduler()
+
+    async def run():
+        await scheduler.acquire("ollama")
+        waiter = asyncio.create_task(scheduler.acquire("ollama"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        scheduler.release("ollama")  # pops the cancelled entry before the waiter runs
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.stats()["ollama"] == {"active": 0, "waiting": 0, "limit": 1}
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import asyncio
+
+from app.models.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_future():
+    flights = SingleFlight()
+    calls = 0
+
+    async def slow() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", slow) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["done"] * 5
+    assert calls == 1
+    assert flights.coalesced == 4
+
+
+def test_stream_fans_out_and_cancels_when_abandoned():
+    flights = SingleFlight()
+    started = 0
+
+    async def source():
+        nonlocal started
+        started += 1
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0.005)
+            yield chunk
+
+    async def consume():
+        return [c async for c in flights.stream("k", source)]
+
+    async def run():
+        results = await asyncio.gather(consume(), consume())
+        assert results == [["a", "b", "c"], ["a", "b", "c"]]
+
+        gen = flights.stream("k2", source)
+        assert await gen.__anext__() == "a"
+        await gen.aclose()
+        await asyncio.sleep(0.01)
+        assert "k2" not in flights._streams
+
+    asyncio.run(run())
+    assert started == 2
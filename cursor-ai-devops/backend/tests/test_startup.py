@@ -0,0 +1,78 @@
+import asyncio
+import sys
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.agents.orchestrator import AgentsOrchestrator
+from app.storage import db
+from benchmarks.fake_ollama import create_app
+
+
+def test_lifespan_shares_one_orchestrator_and_reports_startup(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(db, "_async_engine", None)
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path / "rag"))
+    monkeypatch.setenv("MODEL_WARMUP", "0")
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    from app.main import app
+
+    with TestClient(app) as client:
+        orchestrator = app.state.orchestrator
+        assert orchestrator.history is app.state.history
+        assert client.get("/api/conversations/1/messages").json() == {"messages": []}
+        report = client.get("/debug/startup", headers={"X-Profile-Token": "secret"}).json()
+    assert {"import", "services", "history", "plugins"} <= set(report["phases"])
+    assert report["ready_seconds"] >= report["phases"]["import"]
+    # chromadb is only imported for RAG_BACKEND=chroma
+    assert "chromadb" not in sys.modules
+
+
+def test_warmup_preloads_ollama_model_and_rag_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROVIDER", "ollama")
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "30m")
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    fake = create_app(latency=0.0, tokens_per_second=0, tokens=1)
+    orchestrator = AgentsOrchestrator()
+    router = orchestrator.model_router
+    router._ollama_client = httpx.AsyncClient(base_url="http://fake", transport=httpx.ASGITransport(app=fake))
+
+    async def run():
+        try:
+            idle = await orchestrator.warmup()
+            assert "retrieval" not in idle and orchestrator.vector_store._embedder is None  # nothing feeds the store
+            orchestrator.retrieval = orchestrator.vector_store
+            return await orchestrator.warmup()
+        finally:
+            await orchestrator.aclose()
+
+    results = asyncio.run(run())
+    assert results["ollama"]["ok"] and results["retrieval"]["ok"]
+    assert fake.state.requests == 0  # a load-only call, no generation
+    assert orchestrator.vector_store._index is not None
+    assert router._ollama_extra() == {"keep_alive": "30m"}
+
+
+def test_startup_sync_failures_are_reported_and_awaited(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(db, "_async_engine", None)
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path / "rag"))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    monkeypatch.setenv("MODEL_WARMUP", "0")
+    monkeypatch.setenv("WORKSPACE_DIR", str(tmp_path))
+    from app.context.ingestion import WorkspaceIngestor
+    from app.main import app
+    from app.observability.startup import startup_report
+
+    def broken(self):
+        raise RuntimeError("disk gone")
+
+    monkeypatch.setattr(WorkspaceIngestor, "sync", broken)
+    (tmp_path / "main.py").write_text("def handler():\n    pass\n")
+    with TestClient(app):
+        pass  # shutdown waits for the syncs
+    assert startup_report.warmup["ingestion"]["ok"] is False
+    assert "disk gone" in startup_report.warmup["ingestion"]["error"]
+    assert startup_report.warmup["workspace_index"]["ok"] is True
+    assert "main.py" in app.state.orchestrator.workspace_index.files  # synced before shutdown returned
@@ -0,0 +1,59 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.agents.orchestrator import AgentsOrchestrator
+from app.api.suggest_ws import ws_router
+from app.lsp.manager import LspManager
+from benchmarks.fake_ollama import create_app, serve_in_thread
+
+
+def test_newer_request_for_a_document_aborts_the_stale_stream(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROVIDER", "ollama")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    monkeypatch.setenv("LSP_ENABLED", "0")
+    monkeypatch.setenv("SUGGEST_DEBOUNCE_MS", "50")
+    fake = create_app(latency=0.0, tokens_per_second=20, tokens=6)  # ~0.25s per suggestion
+
+    with serve_in_thread(fake) as url:
+        monkeypatch.setenv("OLLAMA_HOST", url)
+        app = FastAPI()
+        app.include_router(ws_router)
+        app.state.orchestrator = AgentsOrchestrator()
+        app.state.lsp = LspManager(str(tmp_path))
+        scheduler = app.state.orchestrator.model_router.scheduler
+
+        with TestClient(app) as client, client.websocket_connect("/ws/suggest") as ws:
+            # Debounced: superseded before it ever reaches the model
+            ws.send_json({"type": "suggest", "id": "a", "document": "main.py", "language": "python", "code": "de"})
+            ws.send_json({"type": "suggest", "id": "b", "document": "main.py", "language": "python", "code": "def"})
+            assert ws.receive_json() == {"type": "cancelled", "id": "a", "reason": "superseded"}
+            assert ws.receive_json() == {"type": "delta", "id": "b", "content": "tok0 "}
+
+            # In flight: the provider stream is aborted and its slot freed
+            ws.send_json({"type": "suggest", "id": "c", "document": "main.py", "language": "python", "code": "def f"})
+            frames = [ws.receive_json()]
+            while frames[-1]["type"] not in ("end", "error"):
+                frames.append(ws.receive_json())
+            assert {"type": "cancelled", "id": "b", "reason": "superseded"} in frames
+            assert [f["content"] for f in frames if f["type"] == "delta" and f["id"] == "c"][0] == "tok0 "
+            assert frames[-1] == {"type": "end", "id": "c"}
+
+            # Malformed frames are answered, not fatal
+            ws.send_text("{not json")
+            assert ws.receive_json() == {"type": "error", "id": None, "status": 400, "message": "invalid JSON frame"}
+            ws.send_text("[1, 2]")
+            assert ws.receive_json()["message"] == "invalid JSON frame"
+
+            ws.send_json({"type": "suggest", "id": "d", "document": "other.py", "language": "python", "code": "x"})
+            ws.send_json({"type": "cancel", "id": "d"})
+            assert ws.receive_json() == {"type": "cancelled", "id": "d", "reason": "cancelled"}
+
+        deadline = time.monotonic() + 5
+        while fake.state.aborted < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert fake.state.requests == 2  # "a" and "d" never reached the model
+        assert fake.state.aborted == 1
+        assert scheduler.stats()["ollama"]["active"] == 0
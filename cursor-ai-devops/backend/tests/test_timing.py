@@ -0,0 +1,60 @@
+import asyncio
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.observability.middleware import TimedRoute, TimingMiddleware
+from app.observability.profiling import ProfilingMiddleware, debug_router
+from app.observability.timing import record, slow_requests, span
+
+
+def _app() -> FastAPI:
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/work")
+    async def work():
+        with span("retrieval"):
+            await asyncio.sleep(0.01)
+        record("queue", 0.002)
+        record("queue", 0.003)
+        return {"ok": True}
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(TimingMiddleware)
+    app.include_router(router, prefix="/api")
+    app.include_router(debug_router, prefix="/debug")
+    return app
+
+
+def _timing(header: str) -> dict:
+    parts = (item.split(";dur=") for item in header.split(", "))
+    return {name: float(ms) for name, ms in parts}
+
+
+def test_server_timing_header_and_slow_log(monkeypatch):
+    monkeypatch.setattr(slow_requests, "threshold", 0.0)
+    client = TestClient(_app())
+    timing = _timing(client.get("/api/work").headers["server-timing"])
+    assert timing["retrieval"] >= 10
+    assert timing["queue"] == 5.0
+    # Spans are recorded once even though include_router re-creates the route
+    assert timing["retrieval"] <= timing["handler"] <= timing["total"]
+    entry = slow_requests.recent()[0]
+    assert entry["path"] == "/api/work" and entry["spans"]["queue"]["count"] == 2
+
+
+def test_profiling_is_off_without_token_and_guarded_with_it(monkeypatch):
+    client = TestClient(_app())
+    monkeypatch.delenv("PROFILE_TOKEN", raising=False)
+    assert client.get("/debug/slow").status_code == 404
+    assert "x-profile-id" not in client.get("/api/work", headers={"X-Profile": "x"}).headers
+
+    monkeypatch.setenv("PROFILE_TOKEN", "s3cret")
+    assert client.get("/debug/slow", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    assert "x-profile-id" not in client.get("/api/work", headers={"X-Profile": "wrong"}).headers
+    profile_id = client.get("/api/work", headers={"X-Profile": "s3cret"}).headers["x-profile-id"]
+    auth = {"X-Profile-Token": "s3cret"}
+    assert profile_id in [p["id"] for p in client.get("/debug/profiles", headers=auth).json()]
+    assert client.get(f"/debug/profiles/{profile_id}", headers=auth).text
+    assert client.post("/debug/profile?seconds=0.1", headers=auth).status_code == 200
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from app.agents.orchestrator import AgentsOrchestrator
+from app.rag.embeddings import EmbeddingService, HashingEmbedder
+from app.rag.index import NumpyIndex
+from app.rag.vectorstore import VectorStore
+
+
+def test_flat_topk_matches_bruteforce():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    index = NumpyIndex(16)
+    index.add([str(i) for i in range(500)], vectors, [""] * 500)
+    query = rng.normal(size=16).astype(np.float32)
+
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = [str(i) for i in np.argsort(-(normed @ query))[:5]]
+    assert [doc_id for doc_id, _ in index.search(query, 5)] == expected
+
+
+def test_ivf_mode_finds_near_duplicate(monkeypatch):
+    monkeypatch.setenv("RAG_IVF_MIN_VECTORS", "100")
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(2000, 32)).astype(np.float32)
+    index = NumpyIndex(32)
+    index.add([str(i) for i in range(2000)], vectors, [""] * 2000)
+    hits = index.search(vectors[1234] + 0.01, 3)
+    assert hits[0][0] == "1234"
+
+
+def test_vectorstore_persists_and_reloads(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    store = VectorStore()
+    store.add_documents([
+        ("a", "kubectl rollout restart deployment api"),
+        ("b", "terraform plan shows drift in s3 bucket"),
+    ])
+
+    reloaded = VectorStore()
+    assert reloaded.search("rollout restart deployment", k=1) == ["kubectl rollout restart deployment api"]
+    reloaded.add_documents([("c", "helm upgrade install chart")])
+    reloaded.delete_documents(["a"])
+    assert len(VectorStore().index) == 2
+
+
+def test_embedding_service_reuses_cached_vectors(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_EMBED_CACHE_PATH", str(tmp_path / "emb.sqlite"))
+    monkeypatch.setenv("RAG_EMBED_BATCH", "2")
+    calls = []
+
+    class CountingEmbedder(HashingEmbedder):
+        def embed(self, texts):
+            calls.append(list(texts))
+            return super().embed(texts)
+
+    service = EmbeddingService(CountingEmbedder())
+    first = service.embed(["a b", "c d", "e f", "a b"])
+    assert calls == [["a b", "c d"], ["e f"]]
+    second = EmbeddingService(CountingEmbedder()).embed(["e f", "a b"])
+    assert len(calls) == 2
+    np.testing.assert_array_equal(second, first[[2, 0]])
+
+
+def test_hybrid_search_ranks_exact_identifier_first(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    store = VectorStore()
+    store.add_documents([
+        ("crash", "Pod payments-api-7d9f is in CrashLoopBackOff after OOMKilled"),
+        ("pending", "Pod stuck Pending because no node matches the nodeSelector"),
+        ("image", "ImagePullBackOff: registry credentials missing for pod"),
+    ])
+    assert store.search_with_scores("crashloopbackoff payments-api", k=1)[0][0] == "crash"
+    assert store.keyword_search("payments", k=3)[0][0] == "crash"
+
+    store.delete_documents(["crash"])
+    assert store.keyword_search("crashloopbackoff") == []
+
+
+def test_concurrent_first_use_builds_one_index(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    load = NumpyIndex.load
+
+    def slow_load(path):
+        time.sleep(0.05)  # widen the window between the check and the assignment
+        return load(path)
+
+    monkeypatch.setattr(NumpyIndex, "load", staticmethod(slow_load))
+    store = VectorStore()
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append((store.index, store.keywords))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(index) for index, _ in seen}) == 1
+    assert len({id(keywords) for _, keywords in seen}) == 1
+
+
+def test_retrieved_chunks_go_into_suggestion_and_chat_prompts(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_INDEX_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_EMBEDDER", "hash")
+    orchestrator = AgentsOrchestrator()
+    store = orchestrator.vector_store
+    store.add_documents([
+        ("runbook.md#0", "runbook.md:1-2\nRestart payments-api with kubectl rollout restart"),
+        ("terraform.tf#0", "terraform.tf:1-1\nresource aws_s3_bucket logs {}"),
+    ])
+
+    async def prompts():
+        suggestion = await orchestrator._suggest_prompt("bash", "kubectl rollout restart payments-api", None, None)
+        chat = await orchestrator._chat_prompt(None, "how do I restart payments-api?")
+        return suggestion, chat
+
+    suggestion, chat = asyncio.run(prompts())
+    assert "runbook.md:1-2" not in suggestion.messages[0][1]  # nothing feeds the store yet
+
+    orchestrator.retrieval = store
+    orchestrator.retrieval_chunks = 1
+    suggestion, chat = asyncio.run(prompts())
+    assert suggestion.messages[0][1].startswith("Relevant workspace excerpts:\nrunbook.md:1-2\n")
+    assert "runbook.md:1-2" not in suggestion.context  # per-request, not in the cached prefix
+    assert chat.messages[-1][1].startswith("Relevant workspace excerpts:\nrunbook.md:1-2\n")
+    assert chat.messages[-1][1].endswith("how do I restart payments-api?")
+    assert "terraform" not in chat.messages[-1][1]
@@ -0,0 +1,46 @@
+from app.context.workspace_index import WorkspaceIndex
+
+
+def _workspace(root):
+    (root / "pkg").mkdir()
+    (root / "web").mkdir()
+    (root / "pkg" / "__init__.py").write_text("")
+    (root / "pkg" / "util.py").write_text(
+        'def helper(x: int) -> int:\n    """Double it."""\n    return x * 2\n\n\n'
+        "class Tool:\n    def run(self) -> None:\n        pass\n"
+    )
+    (root / "pkg" / "main.py").write_text("from pkg.util import helper\nfrom .util import Tool\n\nprint(helper(2))\n")
+    (root / "web" / "lib.ts").write_text("export function render(el: Element) {\n  return el;\n}\n")
+    (root / "web" / "app.ts").write_text("import { render } from './lib';\nrender(document.body);\n")
+
+
+def test_workspace_index_symbols_graph_and_prompt_context(tmp_path, monkeypatch):
+    root = tmp_path / "ws"
+    root.mkdir()
+    _workspace(root)
+    monkeypatch.setenv("WORKSPACE_INDEX_PATH", str(tmp_path / "index.json"))
+
+    index = WorkspaceIndex(str(root))
+    assert index.sync() == {"parsed": 5, "unchanged": 0, "removed": 0}
+    assert index.languages()["python"]["files"] == 3
+    assert index.tree() == ["pkg/", "web/"]
+    assert index.imports["pkg/main.py"] == {"pkg/util.py"}
+    assert index.importers["web/lib.ts"] == {"web/app.ts"}
+
+    code = "value = helper(3)\nTool().run()\n"
+    assert [s[0] for _, s in index.related(code, "pkg/main.py")] == ["helper", "Tool", "run"]
+    context = index.prompt_context(code, str(root / "pkg" / "main.py"))
+    assert context.startswith("# pkg/util.py:1\ndef helper(x: int) -> int:")
+
+    # Reloaded from disk: nothing is re-parsed
+    reloaded = WorkspaceIndex(str(root))
+    assert reloaded.sync()["unchanged"] == 5 and reloaded.imports == index.imports
+
+    # Incremental: an edit re-parses one file, a deletion drops its edges
+    (root / "pkg" / "util.py").write_text("def helper2():\n    return 1\n")
+    (root / "pkg" / "main.py").unlink()
+    reloaded.sync_paths(["pkg/util.py", "pkg/main.py"])
+    assert "pkg/main.py" not in reloaded.files
+    assert not reloaded.importers.get("pkg/util.py")
+    assert [s[0] for _, s in reloaded.related("helper2()")] == ["helper2"]
+    assert reloaded.related("helper(1)") == []
@@ -9,7 +9,24 @@ const Chat: React.FC<{ backendUrl: string }> = ({ backendUrl }) => {
     const wsUrl = backendUrl.replace('http', 'ws') + '/ws/chat'
     const ws = new WebSocket(wsUrl)
     wsRef.current = ws
-    ws.onmessage = (ev) => setMessages((m) => [...m, { role: 'assistant', content: ev.data }])
+    let streaming = false
+    ws.onmessage = (ev) => {
+      const frame = JSON.parse(ev.data) as { type: 'delta' | 'error' | 'end'; content?: string; message?: string }
+      if (frame.type === 'end') {
+        streaming = false
+        return
+      }
+      const chunk = frame.type === 'error' ? `[busy] ${frame.message ?? ''}` : frame.content ?? ''
+      if (!streaming) {
+        streaming = true
+        setMessages((m) => [...m, { role: 'assistant', content: chunk }])
+        return
+      }
+      setMessages((m) => {
+        const last = m[m.length - 1]
+        return [...m.slice(0, -1), { ...last, content: last.content + chunk }]
+      })
+    }
     return () => ws.close()
   }, [backendUrl])
 